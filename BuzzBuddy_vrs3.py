@@ -2,6 +2,24 @@ import pygame
 import sys
 import random
 import math
+import collections
+import os
+import struct
+import threading
+import time
+import zlib
+import atexit
+import argparse
+import fractions
+import re
+import abc
+import numpy as np
+
+from buzz_alloc import AllocationTracker
+from buzz_assets import ASSET_PACK_VERSION, AssetPack
+from buzz_profiler import PROFILER_OVERLAY_REFRESH_MS, FrameProfiler
+from buzz_replay import (RECORD_END, RECORD_FLAPPY_END, RECORD_FLAPPY_START, RECORD_FRAME, RECORD_JUMP,
+                         SessionRecorder, read_recording)
 
 # --- Constants ---
 SCREEN_WIDTH = 400
@@ -42,6 +60,14 @@ OBSTACLE_SPEED = 3
 GRAVITY = 0.25
 JUMP_STRENGTH = -6
 FLAPPY_BEE_SCALE = 0.6
+# Fixed-timestep simulation: physics constants above are per simulation tick, and the
+# render rate can differ from the tick rate without changing gameplay.
+FLAPPY_TICK_RATE = 60 # Simulation ticks per second
+FLAPPY_TICK_MS = 1000 / FLAPPY_TICK_RATE
+FLAPPY_SPAWN_INTERVAL_TICKS = max(1, round(OBSTACLE_FREQUENCY / FLAPPY_TICK_MS)) # Flowers spawn on simulation time
+FLAPPY_RENDER_FPS = 60 # e.g. 30, 60 or 144
+FLAPPY_MAX_FRAME_MS = 250 # Longer stalls are not caught up (the game pauses instead of jumping ahead)
+FLAPPY_SWARM_SPAWN_INTERVAL_TICKS = FLAPPY_SPAWN_INTERVAL_TICKS // 4 # "Swarm" variant: many more flowers on screen
 
 # --- Bee Facts ---
 BEE_FACTS = [
@@ -75,6 +101,11 @@ max_level = 100
 
 last_stat_decrease_time = 0
 stat_decrease_interval = 5000 # 5 seconds
+# Each decrease: cleanliness and honey drop by these, happiness by 1 per
+# happiness_deficit_step points missing from the two (at least 1)
+cleanliness_decrease = 2
+hunger_decrease = 4
+happiness_deficit_step = 20
 
 # --- XP and Leveling Variables ---
 bee_level = 1 # Start at level 1 (1 bee)
@@ -89,30 +120,151 @@ xp_levels = {
 xp_next_level = xp_levels.get(bee_level, float('inf')) # Get XP for next level, infinity if max
 
 # --- Pygame Setup ---
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("BuzzBuddy Pet")
-clock = pygame.time.Clock()
+# Pygame, the window and the clock are set up in main(), and fonts and surfaces are
+# created on first use, so importing this module (for tools, benchmarks or tests)
+# doesn't open a window.
+screen = None
+clock = None
+
+# --- Startup Timing ---
+# Time from main() being called to the first frame on screen, split by phase.
+startup_start_time = None
+startup_timings = [] # (phase name, milliseconds)
+startup_reported = False
+
+def record_startup_phase(name, phase_start):
+    """Records how long a phase took since phase_start (a time.perf_counter value), until the first frame."""
+    if startup_start_time is not None and not startup_reported:
+        startup_timings.append((name, (time.perf_counter() - phase_start) * 1000))
+
+def report_startup_timings():
+    global startup_reported
+    if startup_start_time is None or startup_reported:
+        return
+    startup_reported = True
+    total_ms = (time.perf_counter() - startup_start_time) * 1000
+    phases = ", ".join(f"{name} {ms:.1f} ms" for name, ms in startup_timings)
+    print(f"Startup: {phases}")
+    print(f"Time to first frame: {total_ms:.1f} ms")
 
 # --- Font Loading ---
 FONT_NAME = "hangyaboly.ttf" # <<<--- MAKE SURE THIS MATCHES YOUR FONT FILE NAME
-try:
-    # Adjust sizes as needed for the new font's appearance
-    font_large = pygame.font.Font(FONT_NAME, 55)
-    font_medium = pygame.font.Font(FONT_NAME, 40)
-    font_small = pygame.font.Font(FONT_NAME, 30)
-    font_game_score = pygame.font.Font(FONT_NAME, 60)
-    print(f"Successfully loaded font: {FONT_NAME}")
-except pygame.error as e:
-    print(f"Error loading font '{FONT_NAME}': {e}")
-    print("Using default Pygame font instead.")
-    # Fallback to default font if custom font fails
-    font_large = pygame.font.Font(None, 40)
-    font_medium = pygame.font.Font(None, 32)
-    font_small = pygame.font.Font(None, 24)
-    font_game_score = pygame.font.Font(None, 50)
+# Adjust sizes as needed for the new font's appearance: (size with FONT_NAME, size with the default font)
+FONT_SIZES = {
+    "large": (55, 40),
+    "medium": (40, 32),
+    "small": (30, 24),
+    "game_score": (60, 50),
+    "overlay": (20, 18), # Profiler overlay
+}
+loaded_fonts = {} # Font registry: name -> pygame Font (or BakedFont from the asset pack), filled on first use
+use_default_font = False # Set once FONT_NAME failed to load
+
+def get_font_path():
+    """FONT_NAME in the game's folder, matched case-insensitively, so the font is found
+    whatever the working directory (falls back to FONT_NAME itself)."""
+    game_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in os.listdir(game_dir):
+        if file_name.lower() == FONT_NAME.lower():
+            return os.path.join(game_dir, file_name)
+    return FONT_NAME
+
+def get_font(name):
+    """Returns the named font from FONT_SIZES, loading it the first time it is asked for."""
+    global use_default_font
+    font = loaded_fonts.get(name)
+    if font is not None:
+        return font
+    load_start = time.perf_counter()
+    if asset_pack is not None:
+        font = asset_pack.get_font(name, get_font_path())
+        if font is not None:
+            loaded_fonts[name] = font
+            record_startup_phase(f"font {name} (pack)", load_start)
+            return font
+    if not pygame.font.get_init():
+        pygame.font.init()
+    custom_size, default_size = FONT_SIZES[name]
+    if not use_default_font:
+        try:
+            font = pygame.font.Font(get_font_path(), custom_size)
+            if not loaded_fonts:
+                print(f"Successfully loaded font: {FONT_NAME}")
+        except (pygame.error, OSError) as e: # A missing file raises FileNotFoundError
+            print(f"Error loading font '{FONT_NAME}': {e}")
+            print("Using default Pygame font instead.")
+            use_default_font = True
+    if font is None:
+        # Fallback to default font if custom font fails
+        font = pygame.font.Font(None, default_size)
+    loaded_fonts[name] = font
+    record_startup_phase(f"font {name}", load_start)
+    return font
 # --- End Font Loading ---
 
+# --- Asset Pack ---
+# buzz_bake.py pre-renders the fixed UI strings (whole, per size in FONT_SIZES) and the
+# brush, bee and flower sprites into one file (see buzz_assets.py). main() memory-maps
+# it, so a cold start only rasterizes the text that changes (numbers, facts), with the
+# TTF loaded when it's first needed. The pack holds the CRC32 of the TTF it was baked
+# from and of the settings and drawing code the sprites come from; a stale or missing
+# pack (or a missing TTF) is ignored and everything renders as before.
+ASSET_PACK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "buzzbuddy_assets.pack")
+# Fixed strings baked whole, exactly as FreeType lays them out. Other text is rendered
+# by the TTF, so it keeps the font's kerning.
+BAKED_TEXTS = {
+    "large": ["Hive", "Game Over!"],
+    "medium": ["Bathroom", "Pollen", "Nest", "Play!", "Make"],
+    "small": ["Clean", "Honey", "Happy", "MAX LEVEL", "Bathroom", "Pollen Storage", "Nest", "Click or Space to Exit"],
+    "game_score": [],
+    "overlay": [],
+}
+asset_pack = None # The loaded AssetPack, if any
+
+def get_asset_recipe_crc():
+    """CRC32 of everything the baked pixels depend on besides the TTF: the settings and
+    the drawing code (bytecode only, so edits elsewhere in the file don't matter)."""
+    drawing_code = [function.__code__ for function in (
+        create_brush_surface, get_bee_dimensions, draw_bee_body, draw_bee_pupil, get_bee_sprite,
+        draw_flower_head, build_flower_atlas)]
+    recipe = (
+        ASSET_PACK_VERSION, FONT_SIZES, BAKED_TEXTS, pygame.version.ver,
+        get_baked_bee_scales(), BEE_YELLOW, WING_COLOR,
+        BRUSH_WIDTH, BRUSH_HEIGHT, BRUSH_HANDLE_HEIGHT, BRUSH_HANDLE_COLOR, BRUSH_BRISTLE_COLOR,
+        FLOWER_PETAL_COLORS, FLOWER_CENTER_COLOR, FLOWER_HEAD_RADIUS, PETAL_RADIUS, FLOWER_PETAL_OFFSETS, FLOWER_ATLAS_COLORKEY,
+        [(code.co_code, code.co_names, [const for const in code.co_consts if not hasattr(const, "co_code")]) for code in drawing_code],
+    )
+    return zlib.crc32(repr(recipe).encode())
+
+def get_baked_bee_scales():
+    return (1.0, FLAPPY_BEE_SCALE, COLONY_BEE_SCALE) # Pet, Flappy and colony bees
+
+def get_ttf_crc():
+    """CRC32 of the font file, or None if it can't be found."""
+    try:
+        with open(get_font_path(), "rb") as font_file:
+            return zlib.crc32(font_file.read())
+    except OSError:
+        return None
+
+def load_asset_pack(path=ASSET_PACK_FILE):
+    """Maps the asset pack if it exists and is up to date, otherwise leaves asset_pack as None."""
+    global asset_pack
+    load_start = time.perf_counter()
+    if not os.path.exists(path):
+        return
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error loading asset pack '{path}': {e}")
+        return
+    ttf_crc = get_ttf_crc()
+    if ttf_crc != pack.ttf_crc or pack.recipe_crc != get_asset_recipe_crc(): # Unbaked text needs the TTF
+        print(f"Asset pack '{os.path.basename(path)}' is out of date, rendering assets instead (run python buzz_bake.py)")
+        return
+    asset_pack = pack
+    record_startup_phase("asset pack", load_start)
+
 # --- Brush Creation ---
 BRUSH_WIDTH = 35
 BRUSH_HEIGHT = 45
@@ -138,12 +290,20 @@ def create_brush_surface(width, height, handle_height, handle_color, bristle_col
 
     return brush_surf
 
-# Create the brush surface instance
-brush_image = create_brush_surface(
-    BRUSH_WIDTH, BRUSH_HEIGHT, BRUSH_HANDLE_HEIGHT,
-    BRUSH_HANDLE_COLOR, BRUSH_BRISTLE_COLOR
-)
-brush_rect = brush_image.get_rect()
+# The brush surface instance is created the first time the Bathroom is drawn
+brush_image = None
+brush_rect = pygame.Rect(0, 0, BRUSH_WIDTH, BRUSH_HEIGHT)
+
+def get_brush_image():
+    global brush_image
+    if brush_image is None and asset_pack is not None:
+        brush_image = asset_pack.get_sprite("brush")[0]
+    if brush_image is None:
+        brush_image = create_brush_surface(
+            BRUSH_WIDTH, BRUSH_HEIGHT, BRUSH_HANDLE_HEIGHT,
+            BRUSH_HANDLE_COLOR, BRUSH_BRISTLE_COLOR
+        )
+    return brush_image
 show_custom_cursor = False # Flag to control custom cursor visibility
 
 # --- Pet Representation ---
@@ -188,16 +348,12 @@ play_btn_width = 150
 play_btn_height = 50
 play_btn_rect = pygame.Rect(0, 0, play_btn_width, play_btn_height)
 play_btn_rect.center = (pet_center_x, pet_center_y + button_y_offset)
-play_text_surf = font_medium.render("Play!", True, BLACK) # Re-render text with new font
-play_text_rect = play_text_surf.get_rect(center=play_btn_rect.center)
 
 # Honey Storage "Feed" Button
 feed_btn_width = 150
 feed_btn_height = 50
 feed_btn_rect = pygame.Rect(0, 0, feed_btn_width, feed_btn_height)
 feed_btn_rect.center = (pet_center_x, pet_center_y + button_y_offset) # Use same offset
-feed_text_surf = font_medium.render("Make", True, BLACK) # Re-render text with new font
-feed_text_rect = feed_text_surf.get_rect(center=feed_btn_rect.center)
 
 # Room Navigation Buttons
 nav_btn_width = 110
@@ -207,30 +363,184 @@ nav_btn_spacing = (SCREEN_WIDTH - (nav_btn_width * 3)) // 4
 bathroom_btn_rect = pygame.Rect(nav_btn_spacing, nav_btn_y, nav_btn_width, nav_btn_height)
 honey_storage_btn_rect = pygame.Rect(nav_btn_spacing * 2 + nav_btn_width, nav_btn_y, nav_btn_width, nav_btn_height)
 nest_btn_rect = pygame.Rect(nav_btn_spacing * 3 + nav_btn_width * 2, nav_btn_y, nav_btn_width, nav_btn_height)
-# Re-render navigation text with new font
-bathroom_text_surf = font_medium.render("Bathroom", True, BLACK)
-honey_storage_text_surf = font_medium.render("Pollen", True, BLACK)
-nest_text_surf = font_medium.render("Nest", True, BLACK)
-bathroom_text_rect = bathroom_text_surf.get_rect(center=bathroom_btn_rect.center)
-honey_storage_text_rect = honey_storage_text_surf.get_rect(center=honey_storage_btn_rect.center)
-nest_text_rect = nest_text_surf.get_rect(center=nest_btn_rect.center)
-
+# Button labels are drawn with draw_text, whose text cache renders each one only once
+
+
+# --- Dirty Rectangle Rendering (Pet Mode) ---
+# When enabled, the pet screen still redraws its back buffer every frame, but only
+# the regions that actually changed (pupils, brush, bars) are pushed to the window
+# with pygame.display.update(rects). Room switches, window exposes and returning
+# from the mini-game fall back to a full flip.
+USE_DIRTY_RECTS = False # Opt-in; helps most on software-rendered displays
+dirty_rects = [] # Regions changed this frame
+full_redraw_needed = True # First frame is always a full flip
+last_drawn_room_name = None
+last_brush_rect = pygame.Rect(0, 0, 0, 0)
+last_pupil_positions = {} # eye center -> pupil position drawn last frame
+bar_last_state = {} # bar rect -> (color, fill width, label) drawn last frame
+
+def mark_dirty(rect):
+    if USE_DIRTY_RECTS:
+        dirty_rects.append(pygame.Rect(rect))
+
+def request_full_redraw():
+    global full_redraw_needed
+    full_redraw_needed = True
+
+def present_frame():
+    """Pushes the frame to the window: a full flip, or just the dirty regions in dirty-rect mode."""
+    global full_redraw_needed
+    if window is not None:
+        scale_frame_to_window()
+    if not USE_DIRTY_RECTS or full_redraw_needed:
+        pygame.display.flip()
+        full_redraw_needed = False
+    elif dirty_rects:
+        pygame.display.update([logical_to_window_rect(rect) for rect in dirty_rects] if window is not None else dirty_rects)
+    dirty_rects.clear()
+
+def present_full_frame():
+    """Pushes the whole frame to the window (the mini-game redraws everything each frame)."""
+    if window is not None:
+        scale_frame_to_window()
+    pygame.display.flip()
+
+# --- Scaled Presentation ---
+# Everything is laid out for a SCREEN_WIDTH x SCREEN_HEIGHT (400x600) frame. With
+# --window or --fullscreen that logical frame is drawn into an offscreen surface
+# and presented with one scaled blit, letterboxed to keep its aspect ratio, and
+# mouse positions are mapped back to logical coordinates. Without them the window
+# is the logical frame and nothing is scaled.
+SCALE_FILTERS = ("smooth", "nearest") # smoothscale (bilinear) or scale (nearest neighbor)
+window = None # The display surface while presenting scaled, otherwise None
+window_scale_filter = "smooth"
+present_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT) # Where the logical frame lands in the window
+present_surface = None # Subsurface of the window at present_rect, scaled into directly
+# Sprites (bees, flower heads) are drawn at SPRITE_DETAIL times their size and
+# smoothscaled down once when cached, for smoother edges in a large window (--hidpi)
+SPRITE_DETAIL = 1
+
+def update_present_rect():
+    """Fits the logical frame into the current window size, centered, keeping its aspect ratio."""
+    global window, present_rect, present_surface
+    window = pygame.display.get_surface()
+    window_width, window_height = window.get_size()
+    scale = min(window_width / SCREEN_WIDTH, window_height / SCREEN_HEIGHT)
+    present_rect = pygame.Rect(0, 0, max(1, int(SCREEN_WIDTH * scale)), max(1, int(SCREEN_HEIGHT * scale)))
+    present_rect.center = (window_width // 2, window_height // 2)
+    present_surface = window.subsurface(present_rect)
+    window.fill(BLACK) # Letterbox bars
+    request_full_redraw()
+
+def scale_frame_to_window():
+    if window_scale_filter == "smooth":
+        pygame.transform.smoothscale(screen, present_rect.size, present_surface)
+    else:
+        pygame.transform.scale(screen, present_rect.size, present_surface)
+
+def window_to_logical(pos):
+    """Maps a window position (mouse, click) to logical frame coordinates."""
+    if window is None:
+        return pos
+    x = (pos[0] - present_rect.x) * SCREEN_WIDTH // present_rect.width
+    y = (pos[1] - present_rect.y) * SCREEN_HEIGHT // present_rect.height
+    return (min(max(x, 0), SCREEN_WIDTH - 1), min(max(y, 0), SCREEN_HEIGHT - 1))
+
+def logical_to_window_rect(rect):
+    """The window area showing a logical rect (a pixel wider on each side for filtering)."""
+    rect = pygame.Rect(rect)
+    left = present_rect.x + rect.left * present_rect.width // SCREEN_WIDTH - 1
+    top = present_rect.y + rect.top * present_rect.height // SCREEN_HEIGHT - 1
+    right = present_rect.x + -(-rect.right * present_rect.width // SCREEN_WIDTH) + 1
+    bottom = present_rect.y + -(-rect.bottom * present_rect.height // SCREEN_HEIGHT) + 1
+    return pygame.Rect(left, top, right - left, bottom - top).clip(present_rect)
+
+def get_mouse_pos():
+    return window_to_logical(pygame.mouse.get_pos())
+
+def handle_window_event(event):
+    """Repaints after the window was exposed or resized."""
+    if event.type == pygame.VIDEOEXPOSE: # Window contents were lost, repaint everything
+        request_full_redraw()
+    elif event.type == pygame.VIDEORESIZE and window is not None:
+        update_present_rect()
+
+# --- Text Surface Cache ---
+# Most text on screen ("Hive", room names, bar labels, game over lines) is the same
+# every frame, so rendered surfaces are kept in a bounded LRU cache.
+USE_TEXT_CACHE = True # Set to False to call font.render on every draw (for benchmarks)
+TEXT_CACHE_SIZE = 128 # Max number of rendered text surfaces kept
+text_surface_cache = collections.OrderedDict() # (text, font, color, antialias) -> surface
+text_cache_hits = 0
+text_cache_misses = 0
+wrapped_text_cache = collections.OrderedDict() # (text, font, max_width) -> list of lines
+
+def render_text_cached(text, font_to_use, color, antialias=True):
+    """Returns the rendered surface for this text, rendering it only on a cache miss."""
+    global text_cache_hits, text_cache_misses
+    if not USE_TEXT_CACHE:
+        return font_to_use.render(text, antialias, color)
+    cache_key = (text, font_to_use, tuple(color), antialias)
+    text_surf = text_surface_cache.get(cache_key)
+    if text_surf is not None:
+        text_surface_cache.move_to_end(cache_key)
+        text_cache_hits += 1
+        return text_surf
+    text_cache_misses += 1
+    text_surf = font_to_use.render(text, antialias, color)
+    text_surface_cache[cache_key] = text_surf
+    while len(text_surface_cache) > TEXT_CACHE_SIZE:
+        text_surface_cache.popitem(last=False)
+    return text_surf
+
+def get_text_cache_stats():
+    """Returns the text cache hit/miss counters and current size."""
+    return {"hits": text_cache_hits, "misses": text_cache_misses, "size": len(text_surface_cache)}
+
+def wrap_text_lines(text, font_to_use, max_width):
+    """Splits text into lines narrower than max_width. The layout is cached per (text, font, width)."""
+    cache_key = (text, font_to_use, max_width)
+    lines = wrapped_text_cache.get(cache_key)
+    if lines is not None:
+        wrapped_text_cache.move_to_end(cache_key)
+    else:
+        words = text.split(' ')
+        lines = []
+        current_line = ""
+        for word in words:
+            test_line = current_line + word + " "
+            # font.size measures without rendering a surface
+            if font_to_use.size(test_line)[0] < max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word + " "
+        lines.append(current_line) # Add the last line
+        wrapped_text_cache[cache_key] = lines
+        while len(wrapped_text_cache) > TEXT_CACHE_SIZE:
+            wrapped_text_cache.popitem(last=False)
+    return lines
 
 # --- Helper Function for Drawing Text ---
 def draw_text(text, font_to_use, color, surface, x, y, center=False):
-    textobj = font_to_use.render(text, True, color)
+    textobj = render_text_cached(text, font_to_use, color)
     textrect = textobj.get_rect()
     if center:
         textrect.center = (x, y)
     else:
         textrect.topleft = (x, y)
     surface.blit(textobj, textrect)
+    return textrect
+
+# --- Helper Function for Drawing Text Ending in a Number ---
+def draw_number_text(prefix, number, font_to_use, color, surface, x, y, center=False):
+    """Draws e.g. "Score: 12" as one string through the text cache, so it keeps the
+    font's kerning. A new surface is only rendered when the number changes."""
+    return draw_text(f"{prefix}{number}", font_to_use, color, surface, x, y, center)
 
 # --- Helper Function to Draw Status/XP Bar ---
-def draw_generic_bar(surface, rect, color, level, max_level, label="", show_percent=False):
-    # Background
-    pygame.draw.rect(surface, GRAY, rect)
-    # Fill
+def bar_fill_width(rect, level, max_level):
+    """Width in pixels of the filled part of a bar."""
     fill_width = 0
     # Ensure max_level is not zero before division
     if max_level > 0 and max_level != float('inf'):
@@ -239,56 +549,264 @@ def draw_generic_bar(surface, rect, color, level, max_level, label="", show_perc
         fill_width = rect.width if level > 0 else 0 # Fill completely if maxed and has some level
     elif level >= max_level: # Handle reaching exactly max level if it's not infinity
          fill_width = rect.width
+    # Ensure fill_width doesn't exceed rect.width
+    return min(fill_width, rect.width)
 
+def bar_label_text(level, max_level, label="", show_percent=False):
+    """The text shown under a bar."""
+    if label:
+        return label
+    elif show_percent:
+         return f"{int(level)}%"
+    elif max_level != float('inf'): # For XP bar, show level/max
+        return f"{int(level)}/{int(max_level)} XP"
+    else: # Max level reached for XP
+        return "MAX LEVEL"
+
+def paint_bar(surface, rect, color, fill_width):
+    # Background
+    pygame.draw.rect(surface, GRAY, rect)
+    # Fill
     if fill_width > 0:
-        # Ensure fill_width doesn't exceed rect.width
-        fill_width = min(fill_width, rect.width)
         fill_rect = pygame.Rect(rect.left, rect.top, fill_width, rect.height)
         pygame.draw.rect(surface, color, fill_rect)
     # Outline
     pygame.draw.rect(surface, BLACK, rect, 2)
-    # Text Label
-    display_text = ""
-    if label:
-        display_text = label
-    elif show_percent:
-         display_text = f"{int(level)}%"
-    elif max_level != float('inf'): # For XP bar, show level/max
-        display_text = f"{int(level)}/{int(max_level)} XP"
-    else: # Max level reached for XP
-        display_text = "MAX LEVEL"
 
+def draw_generic_bar(surface, rect, color, level, max_level, label="", show_percent=False):
+    """Draws a bar from primitives (the pet screen uses the cached Bar widgets below)."""
+    fill_width = bar_fill_width(rect, level, max_level)
+    paint_bar(surface, rect, color, fill_width)
+    # Text Label
+    display_text = bar_label_text(level, max_level, label, show_percent)
+    bar_area = pygame.Rect(rect)
     if display_text:
-        # Use font_small for the bar labels
-        draw_text(display_text, font_small, BLACK, surface, rect.centerx, rect.bottom + 10, center=True) # Adjusted spacing slightly
+        # Use the small font for the bar labels
+        text_rect = draw_text(display_text, get_font("small"), BLACK, surface, rect.centerx, rect.bottom + 10, center=True) # Adjusted spacing slightly
+        bar_area.union_ip(text_rect)
+
+    # Only report the bar as changed when what it shows actually changed
+    if USE_DIRTY_RECTS:
+        bar_state = (color, fill_width, display_text)
+        if bar_last_state.get(tuple(rect)) != bar_state:
+            bar_last_state[tuple(rect)] = bar_state
+            mark_dirty(bar_area)
+
+# --- Retained UI Widgets ---
+# The pet screen's bars, labels and buttons are widgets that keep their last rendered
+# surface and only re-render when what they show changes (a bar's fill width or text,
+# the room name, the active nav button). Other frames just blit the cached surface.
+# Buttons also do the click hit-testing, so what is drawn and what is clickable agree.
+USE_WIDGET_CACHE = True # Set to False to re-render every widget each frame (for benchmarks)
+
+class Widget(abc.ABC):
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+        self.area = pygame.Rect(self.rect) # What the cached surface covers (may be larger than rect)
+        self.surface = None
+        self.state = None # What the cached surface shows
+        self.render_count = 0
+
+    @abc.abstractmethod
+    def get_state(self):
+        """Everything the rendering depends on; the widget re-renders when this changes."""
+
+    @abc.abstractmethod
+    def render(self, state):
+        """Returns (surface, area) showing this state, the surface covering area."""
+
+    def is_shown(self):
+        return True
+
+    def draw(self, surface):
+        if not self.is_shown():
+            return
+        state = self.get_state()
+        changed = self.surface is None or state != self.state
+        if changed or not USE_WIDGET_CACHE:
+            previous_area = self.area
+            self.surface, self.area = self.render(state)
+            self.state = state
+            self.render_count += 1
+            if changed:
+                mark_dirty(self.area.union(previous_area))
+        surface.blit(self.surface, self.area)
+
+def composite_with_text(rect, text_surf, text_rect):
+    """A transparent canvas covering rect and text_rect. Returns (canvas, area, rect and text_rect on the canvas)."""
+    area = rect.union(text_rect)
+    canvas = pygame.Surface(area.size, pygame.SRCALPHA)
+    return canvas, area, rect.move(-area.x, -area.y), text_rect.move(-area.x, -area.y)
+
+class Bar(Widget):
+    """A status/XP bar bound to its level (and max level) through getter functions."""
+    def __init__(self, rect, color, get_level, get_max_level=lambda: max_level, label="", show_percent=False):
+        super().__init__(rect)
+        self.color = color
+        self.get_level = get_level
+        self.get_max_level = get_max_level
+        self.label = label
+        self.show_percent = show_percent
+
+    def get_state(self):
+        level, top_level = self.get_level(), self.get_max_level()
+        return (bar_fill_width(self.rect, level, top_level), bar_label_text(level, top_level, self.label, self.show_percent))
+
+    def render(self, state):
+        fill_width, display_text = state
+        text_surf = render_text_cached(display_text, get_font("small"), BLACK)
+        text_rect = text_surf.get_rect(center=(self.rect.centerx, self.rect.bottom + 10))
+        canvas, area, bar_rect, text_rect = composite_with_text(self.rect, text_surf, text_rect)
+        paint_bar(canvas, bar_rect, self.color, fill_width)
+        canvas.blit(text_surf, text_rect)
+        return canvas, area
+
+class Label(Widget):
+    """Centered text; text is a string or a function returning one."""
+    def __init__(self, center, text, font_name, color=BLACK):
+        super().__init__((center, (0, 0)))
+        self.center = center
+        self.text = text
+        self.font_name = font_name
+        self.color = color
+
+    def get_state(self):
+        return self.text() if callable(self.text) else self.text
+
+    def render(self, text):
+        text_surf = render_text_cached(text, get_font(self.font_name), self.color)
+        return text_surf, text_surf.get_rect(center=self.center)
+
+class Button(Widget):
+    """A labelled button. With room set it is only shown (and clickable) in that room;
+    nav buttons set target_room and are drawn in active_color while in it."""
+    def __init__(self, rect, text, color, active_color=None, room=None, target_room=None):
+        super().__init__(rect)
+        self.text = text
+        self.color = color
+        self.active_color = active_color
+        self.room = room
+        self.target_room = target_room
+
+    def is_shown(self):
+        return self.room is None or current_room_name == self.room
+
+    def is_active(self):
+        return self.target_room is not None and current_room_name == self.target_room
+
+    def hit(self, pos):
+        return self.is_shown() and self.rect.collidepoint(pos)
+
+    def get_state(self):
+        return self.is_active()
+
+    def render(self, active):
+        text_surf = render_text_cached(self.text, get_font("medium"), BLACK)
+        text_rect = text_surf.get_rect(center=self.rect.center)
+        canvas, area, button_rect, text_rect = composite_with_text(self.rect, text_surf, text_rect)
+        pygame.draw.rect(canvas, self.active_color if active else self.color, button_rect)
+        canvas.blit(text_surf, text_rect)
+        pygame.draw.rect(canvas, BLACK, button_rect, 2)
+        return canvas, area
+
+# The pet screen's widgets, bound to the pet stats and the current room
+status_bars = [
+    Bar(cleanliness_bar_rect, LIGHT_BLUE, lambda: pet_cleanliness_level, label="Clean"),
+    Bar(honey_bar_rect, GREEN, lambda: pet_hunger_level, label="Honey"),
+    Bar(happy_bar_rect, YELLOW, lambda: pet_happy_level, label="Happy"),
+]
+xp_bar = Bar(xp_bar_rect, XP_BAR_COLOR, lambda: xp_current, lambda: xp_next_level) # Shows MAX LEVEL at the top level
+title_labels = [
+    Label((SCREEN_WIDTH // 2, title_y), "Hive", "large"), # Using "Hive" title from v3
+    Label((SCREEN_WIDTH // 2, room_name_y), lambda: current_room_name, "small"),
+]
+play_button = Button(play_btn_rect, "Play!", YELLOW, room="Nest")
+feed_button = Button(feed_btn_rect, "Make", GREEN, room="Pollen Storage") # Use Honey color
+nav_buttons = [
+    Button(bathroom_btn_rect, "Bathroom", GRAY, BUTTON_COLOR_ACTIVE, target_room="Bathroom"),
+    Button(honey_storage_btn_rect, "Pollen", GRAY, BUTTON_COLOR_ACTIVE, target_room="Pollen Storage"),
+    Button(nest_btn_rect, "Nest", GRAY, BUTTON_COLOR_ACTIVE, target_room="Nest"),
+]
+# Drawing order of the pet scene, built once instead of concatenated every frame
+scene_top_widgets = status_bars + title_labels
+scene_buttons = [play_button, feed_button] + nav_buttons
 
 
 # --- Helper Function to Draw a Hexagon ---
+# Corner directions (cos, sin) at -30, 30, ..., 270 degrees, computed once
+HEXAGON_CORNERS = [(math.cos(math.pi / 180 * (60 * i - 30)), math.sin(math.pi / 180 * (60 * i - 30))) for i in range(6)]
+
 def draw_hexagon(surface, color_fill, color_outline, center_x, center_y, radius):
-    points = []
-    for i in range(6):
-        angle_deg = 60 * i - 30
-        angle_rad = math.pi / 180 * angle_deg
-        x = center_x + radius * math.cos(angle_rad)
-        y = center_y + radius * math.sin(angle_rad)
-        points.append((int(x), int(y)))
+    points = [(int(center_x + radius * corner_cos), int(center_y + radius * corner_sin))
+              for corner_cos, corner_sin in HEXAGON_CORNERS]
     pygame.draw.polygon(surface, color_fill, points)
     pygame.draw.polygon(surface, color_outline, points, 2)
 
-# --- Helper Function to Draw Bee (With scaling) ---
-def draw_bee(surface, center_x, center_y, mouse_pos, scale=1.0):
-    # Scale dimensions
-    scaled_body_width = int(pet_body_width * scale)
-    scaled_body_height = int(pet_body_height * scale)
-    scaled_eye_radius_outer = int(eye_radius_outer * scale)
-    scaled_pupil_radius = int(pupil_radius * scale)
-    scaled_max_pupil_offset = scaled_eye_radius_outer - scaled_pupil_radius
-
-    # Ensure minimum size for small scales
-    scaled_body_width = max(1, scaled_body_width)
-    scaled_body_height = max(1, scaled_body_height)
-    scaled_eye_radius_outer = max(1, scaled_eye_radius_outer)
-    scaled_pupil_radius = max(1, scaled_pupil_radius)
+# --- Honeycomb Background ---
+def draw_honeycomb(surface):
+    """Draws the full hexagon tiling onto the surface, one hexagon at a time."""
+    surface_width, surface_height = surface.get_size()
+    hex_height = math.sqrt(3) * HEX_RADIUS
+    hex_width = 2 * HEX_RADIUS
+    vert_spacing = hex_height
+    horiz_spacing = hex_width * 3/4
+    current_y = -hex_height / 2
+    row_index = 0
+    while current_y < surface_height + hex_height:
+        if row_index % 2 != 0: current_x = -horiz_spacing / 2
+        else: current_x = -horiz_spacing
+        while current_x < surface_width + horiz_spacing:
+            draw_hexagon(surface, HONEYCOMB_FILL, HONEYCOMB_OUTLINE,
+                         current_x, current_y, HEX_RADIUS)
+            current_x += horiz_spacing
+        current_y += vert_spacing
+        row_index += 1
+
+# The honeycomb never changes, so it is rasterized once into a cached surface and
+# blitted every frame. The cache is rebuilt whenever the screen size, HEX_RADIUS
+# or the honeycomb colors differ from the ones it was built with.
+USE_BACKGROUND_CACHE = True # Set to False to redraw every hexagon each frame (for benchmarks)
+background_cache_key = None
+background_cache_surf = None
+
+def get_honeycomb_background(size):
+    """Returns the cached honeycomb surface for the given size, rebuilding it if stale."""
+    global background_cache_key, background_cache_surf
+    cache_key = (tuple(size), HEX_RADIUS, HONEYCOMB_FILL, HONEYCOMB_OUTLINE)
+    if background_cache_surf is None or cache_key != background_cache_key:
+        background_surf = pygame.Surface(size).convert() # Match the display format for fast blits
+        background_surf.fill(HONEYCOMB_FILL)
+        draw_honeycomb(background_surf)
+        background_cache_surf = background_surf
+        background_cache_key = cache_key
+    return background_cache_surf
+
+def invalidate_background_cache():
+    """Forces the honeycomb to be rebuilt on the next frame."""
+    global background_cache_key, background_cache_surf
+    background_cache_key = None
+    background_cache_surf = None
+
+def draw_background(surface):
+    if USE_BACKGROUND_CACHE:
+        surface.blit(get_honeycomb_background(surface.get_size()), (0, 0))
+    else:
+        surface.fill(HONEYCOMB_FILL) # Fill background first
+        draw_honeycomb(surface)
+
+# --- Helper Functions to Draw Bee (With scaling) ---
+def get_bee_dimensions(scale=1.0):
+    """Returns the scaled (body_width, body_height, eye_radius, pupil_radius) of a bee."""
+    # Scale dimensions, ensuring a minimum size for small scales
+    scaled_body_width = max(1, int(pet_body_width * scale))
+    scaled_body_height = max(1, int(pet_body_height * scale))
+    scaled_eye_radius_outer = max(1, int(eye_radius_outer * scale))
+    scaled_pupil_radius = max(1, int(pupil_radius * scale))
+    return scaled_body_width, scaled_body_height, scaled_eye_radius_outer, scaled_pupil_radius
+
+def draw_bee_body(surface, center_x, center_y, scale=1.0):
+    """Draws the static parts of the bee: wings, body, stripes, stinger, outline and eye white."""
+    scaled_body_width, scaled_body_height, scaled_eye_radius_outer, _ = get_bee_dimensions(scale)
 
     body_rect = pygame.Rect(0, 0, scaled_body_width, scaled_body_height)
     body_rect.center = (center_x, center_y)
@@ -334,14 +852,23 @@ def draw_bee(surface, center_x, center_y, mouse_pos, scale=1.0):
     # --- Body Outline ---
     pygame.draw.ellipse(surface, BLACK, body_rect, max(1, int(2*scale)))
 
-    # --- Eye Drawing ---
+    # --- Eye White ---
     eye_base_x = center_x + scaled_body_width * 0.25
     eye_base_y = center_y - scaled_body_height * 0.10
 
     pygame.draw.circle(surface, WHITE, (int(eye_base_x), int(eye_base_y)), scaled_eye_radius_outer)
     pygame.draw.circle(surface, BLACK, (int(eye_base_x), int(eye_base_y)), scaled_eye_radius_outer, 1)
 
-    # Pupil position (tracks mouse only for full-size bee)
+    return body_rect
+
+def draw_bee_pupil(surface, center_x, center_y, mouse_pos, scale=1.0):
+    """Draws the pupil and eye highlight. The pupil tracks the mouse only for the full-size bee."""
+    scaled_body_width, scaled_body_height, scaled_eye_radius_outer, scaled_pupil_radius = get_bee_dimensions(scale)
+    scaled_max_pupil_offset = scaled_eye_radius_outer - scaled_pupil_radius
+    eye_base_x = center_x + scaled_body_width * 0.25
+    eye_base_y = center_y - scaled_body_height * 0.10
+
+    # Pupil position (tracks mouse only for full size bee)
     pupil_x = eye_base_x
     pupil_y = eye_base_y
     if scale == 1.0: # Only do tracking for full size bee
@@ -369,382 +896,1608 @@ def draw_bee(surface, center_x, center_y, mouse_pos, scale=1.0):
     highlight_y = pupil_y + highlight_y_offset
     pygame.draw.circle(surface, WHITE, (int(highlight_x), int(highlight_y)), highlight_radius)
 
+    # Report the eye as changed if the (mouse-tracking) pupil moved since the last frame
+    if USE_DIRTY_RECTS and scale == 1.0:
+        eye_center = (int(eye_base_x), int(eye_base_y))
+        pupil_position = (int(pupil_x), int(pupil_y))
+        if last_pupil_positions.get(eye_center) != pupil_position:
+            last_pupil_positions[eye_center] = pupil_position
+            eye_dirty_radius = scaled_eye_radius_outer + 2
+            mark_dirty((eye_center[0] - eye_dirty_radius, eye_center[1] - eye_dirty_radius,
+                        eye_dirty_radius * 2, eye_dirty_radius * 2))
+
+# --- Bee Sprite Cache ---
+# The static parts of a bee are pre-rendered once per scale (and colors) into a
+# sprite; only the mouse-tracking pupil is drawn live. Bees that don't track the
+# mouse (scale != 1.0) get the pupil baked into the sprite as well.
+USE_BEE_SPRITE_CACHE = True # Set to False to draw every bee from primitives (for benchmarks)
+BEE_SPRITE_CACHE_SIZE = 8 # Max number of sprites kept; least recently used is evicted
+bee_sprite_cache = collections.OrderedDict() # cache key -> (sprite surface, (origin_x, origin_y))
+
+def get_bee_sprite(scale=1.0, detail=None):
+    """Returns (sprite, origin) for a bee at this scale, where origin is the bee center inside the sprite.
+    The sprite is drawn at detail (default SPRITE_DETAIL) times the size and smoothscaled down."""
+    if detail is None:
+        detail = SPRITE_DETAIL
+    cache_key = (scale, detail, BEE_YELLOW, WING_COLOR)
+    cached = bee_sprite_cache.get(cache_key)
+    if cached is not None:
+        bee_sprite_cache.move_to_end(cache_key)
+        return cached
+    if asset_pack is not None and detail == 1:
+        cached = asset_pack.get_sprite(f"bee:{scale}")
+        if cached is not None:
+            bee_sprite_cache[cache_key] = cached
+            return cached
+
+    # Draw into a generously sized canvas, then crop to the pixels actually used
+    scaled_body_width, scaled_body_height, _, _ = get_bee_dimensions(scale)
+    origin_x = scaled_body_width + 1
+    origin_y = scaled_body_height + 1
+    canvas = pygame.Surface((origin_x * 2 * detail, origin_y * 2 * detail), pygame.SRCALPHA)
+    draw_bee_body(canvas, origin_x * detail, origin_y * detail, scale * detail)
+    if scale != 1.0: # Pupil never moves at this scale, so bake it in too
+        draw_bee_pupil(canvas, origin_x * detail, origin_y * detail, (0, 0), scale * detail)
+    if detail > 1:
+        canvas = pygame.transform.smoothscale(canvas, (origin_x * 2, origin_y * 2))
+    used_rect = canvas.get_bounding_rect()
+    sprite = canvas.subsurface(used_rect).copy().convert_alpha()
+    cached = (sprite, (origin_x - used_rect.x, origin_y - used_rect.y))
+
+    bee_sprite_cache[cache_key] = cached
+    while len(bee_sprite_cache) > BEE_SPRITE_CACHE_SIZE:
+        bee_sprite_cache.popitem(last=False)
+    return cached
+
+def draw_bee(surface, center_x, center_y, mouse_pos, scale=1.0):
+    if not USE_BEE_SPRITE_CACHE:
+        body_rect = draw_bee_body(surface, center_x, center_y, scale)
+        draw_bee_pupil(surface, center_x, center_y, mouse_pos, scale)
+        return body_rect
+
+    sprite, (origin_x, origin_y) = get_bee_sprite(scale)
+    surface.blit(sprite, (int(center_x) - origin_x, int(center_y) - origin_y))
+    if scale == 1.0:
+        draw_bee_pupil(surface, center_x, center_y, mouse_pos, scale)
+
+    scaled_body_width, scaled_body_height, _, _ = get_bee_dimensions(scale)
+    body_rect = pygame.Rect(0, 0, scaled_body_width, scaled_body_height)
+    body_rect.center = (center_x, center_y)
     # Return the body rect for collision detection
     return body_rect
 
+# --- Bee Colony ---
+# Colony mode replaces the 1-3 bees of the bee level with COLONY_SIZE small bees.
+# Their centers are laid out once into a compact int32 array, the whole colony is
+# drawn with a single Surface.blits call over the cached bee sprite, and brush hit
+# tests go through a uniform grid (spatial hash), so only the bees in the grid
+# cells under the brush are checked instead of every bee.
+COLONY_SIZE = 0 # Number of bees in colony mode (e.g. 1000); 0 shows the usual bees for the bee level
+COLONY_BEE_SCALE = 0.3
+COLONY_RADIUS_X = SCREEN_WIDTH // 2 - 20 # The colony fills an ellipse around the pet center
+COLONY_RADIUS_Y = 120
+COLONY_GRID_CELL = 32 # Spatial hash cell size in px, about the size of the brush
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+class BeeColony:
+    """A fixed colony of same-sized bees with a spatial hash over their body rects."""
+
+    def __init__(self, size, center=(pet_center_x, pet_center_y), scale=COLONY_BEE_SCALE, cell_size=COLONY_GRID_CELL):
+        self.size = size
+        self.scale = scale
+        self.cell_size = cell_size
+
+        # Sunflower (phyllotaxis) layout: evenly spread for any size, no two bees on the same spot
+        i = np.arange(size)
+        radius = np.sqrt((i + 0.5) / max(1, size))
+        angle = i * GOLDEN_ANGLE
+        self.centers = np.empty((size, 2), dtype=np.int32)
+        self.centers[:, 0] = np.round(center[0] + COLONY_RADIUS_X * radius * np.cos(angle))
+        self.centers[:, 1] = np.round(center[1] + COLONY_RADIUS_Y * radius * np.sin(angle))
+        self.centers = self.centers[np.argsort(self.centers[:, 1], kind="stable")] # Back to front
+
+        # Body rects, placed like draw_bee's (Rect.center puts the left edge at x - w // 2)
+        body_width, body_height, _, _ = get_bee_dimensions(scale)
+        self.left = self.centers[:, 0] - body_width // 2
+        self.top = self.centers[:, 1] - body_height // 2
+        self.right = self.left + body_width
+        self.bottom = self.top + body_height
+        self.build_grid()
+
+        self.blit_sprite = None # Sprite the blit sequence was built for
+        self.blit_sequence = []
+
+    def build_grid(self):
+        """Buckets every bee into each grid cell its body rect touches.
+
+        Cell assignment is vectorized; each cell then keeps a list of body Rects
+        (and matching bee indices), so a query is one Rect.collidelist per cell.
+        """
+        cell = self.cell_size
+        self.grid_x = int(self.left.min()) if self.size else 0
+        self.grid_y = int(self.top.min()) if self.size else 0
+        first_col = (self.left - self.grid_x) // cell
+        last_col = (self.right - 1 - self.grid_x) // cell
+        first_row = (self.top - self.grid_y) // cell
+        last_row = (self.bottom - 1 - self.grid_y) // cell
+        self.cols = int(last_col.max()) + 1 if self.size else 1
+        self.rows = int(last_row.max()) + 1 if self.size else 1
+
+        self.cell_rects = [[] for _ in range(self.cols * self.rows)]
+        self.cell_bees = [[] for _ in range(self.cols * self.rows)]
+        body_rects = [pygame.Rect(left, top, right - left, bottom - top) for left, top, right, bottom
+                      in zip(self.left.tolist(), self.top.tolist(), self.right.tolist(), self.bottom.tolist())]
+        max_span_cols = int((last_col - first_col).max()) + 1 if self.size else 0
+        max_span_rows = int((last_row - first_row).max()) + 1 if self.size else 0
+        for row_offset in range(max_span_rows):
+            for col_offset in range(max_span_cols):
+                touches = (first_row + row_offset <= last_row) & (first_col + col_offset <= last_col)
+                cell_ids = (first_row + row_offset) * self.cols + first_col + col_offset
+                for bee, cell_id in zip(np.flatnonzero(touches).tolist(), cell_ids[touches].tolist()):
+                    self.cell_rects[cell_id].append(body_rects[bee])
+                    self.cell_bees[cell_id].append(bee)
+
+    def cells_under(self, rect):
+        """Grid cell ids under rect."""
+        cell = self.cell_size
+        first_col = max(0, (rect.left - self.grid_x) // cell)
+        last_col = min(self.cols - 1, (rect.right - 1 - self.grid_x) // cell)
+        first_row = max(0, (rect.top - self.grid_y) // cell)
+        last_row = min(self.rows - 1, (rect.bottom - 1 - self.grid_y) // cell)
+        return [row * self.cols + col for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+    def bees_under(self, rect):
+        """Sorted indices of the bees whose body rect overlaps rect (like Rect.colliderect)."""
+        rect = pygame.Rect(rect)
+        bees = set()
+        for cell_id in self.cells_under(rect):
+            cell_bees = self.cell_bees[cell_id]
+            bees.update(cell_bees[i] for i in rect.collidelistall(self.cell_rects[cell_id]))
+        return sorted(bees)
+
+    def any_under(self, rect):
+        rect = pygame.Rect(rect)
+        for cell_id in self.cells_under(rect):
+            if rect.collidelist(self.cell_rects[cell_id]) != -1:
+                return True
+        return False
+
+    def draw(self, surface):
+        if not USE_BEE_SPRITE_CACHE:
+            for center_x, center_y in self.centers.tolist():
+                draw_bee(surface, center_x, center_y, (0, 0), scale=self.scale)
+            return
+        sprite, (origin_x, origin_y) = get_bee_sprite(self.scale)
+        if sprite is not self.blit_sprite: # First draw, or the sprite was rebuilt
+            self.blit_sprite = sprite
+            self.blit_sequence = [(sprite, (center_x - origin_x, center_y - origin_y))
+                                  for center_x, center_y in self.centers.tolist()]
+        surface.blits(self.blit_sequence, doreturn=False)
+
+bee_colony = None
+
+def get_bee_colony():
+    """Returns the colony for COLONY_SIZE (built on first use), or None outside colony mode."""
+    global bee_colony
+    if COLONY_SIZE <= 0:
+        return None
+    if bee_colony is None or bee_colony.size != COLONY_SIZE:
+        bee_colony = BeeColony(COLONY_SIZE)
+    return bee_colony
+
+
+# --- Flower Head Atlas (Flappy) ---
+# Each flower head looks the same apart from its petal color, so one head per
+# color in FLOWER_PETAL_COLORS is pre-composited at game start and blitted.
+USE_FLOWER_ATLAS = True # Set to False to draw every petal from primitives (for benchmarks)
+FLOWER_NUM_PETALS = 6
+FLOWER_ATLAS_COLORKEY = (255, 0, 255) # Magenta marks transparent atlas pixels (not used by any flower color)
+# Petal centers relative to the head center, floored like int() of the on-screen position.
+# Rounding first drops float noise such as cos(240 deg) * 20 == -10.000000000000004.
+FLOWER_PETAL_OFFSETS = [
+    (math.floor(round((FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.cos(math.radians((360 / FLOWER_NUM_PETALS) * i)), 6)),
+     math.floor(round((FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.sin(math.radians((360 / FLOWER_NUM_PETALS) * i)), 6)))
+    for i in range(FLOWER_NUM_PETALS)
+]
+
+def draw_flower_head(surface, center_x, center_y, petal_color, detail=1):
+    """Draws a flower head (petals around a center) from primitives, detail times the normal size."""
+    for petal_offset_x, petal_offset_y in FLOWER_PETAL_OFFSETS:
+        pygame.draw.circle(surface, petal_color, (center_x + petal_offset_x * detail, center_y + petal_offset_y * detail), PETAL_RADIUS * detail)
+    pygame.draw.circle(surface, FLOWER_CENTER_COLOR, (center_x, center_y), PETAL_RADIUS * detail)
+
+def build_flower_atlas(detail=None):
+    """Pre-renders one flower head per petal color. Returns a list of (sprite, origin) by color index.
+    With detail (default SPRITE_DETAIL) above 1, heads are drawn that many times larger and
+    smoothscaled down into per-pixel alpha sprites."""
+    if detail is None:
+        detail = SPRITE_DETAIL
+    if asset_pack is not None and detail == 1:
+        atlas = [asset_pack.get_sprite(f"flower:{color_index}") for color_index in range(len(FLOWER_PETAL_COLORS))]
+        if None not in atlas:
+            return atlas
+    atlas = []
+    canvas_origin = FLOWER_HEAD_RADIUS + 1
+    for petal_color in FLOWER_PETAL_COLORS:
+        if detail > 1: # Smoothed edges are partly transparent, which a colorkey can't hold
+            canvas = pygame.Surface((canvas_origin * 2 * detail, canvas_origin * 2 * detail), pygame.SRCALPHA)
+            draw_flower_head(canvas, canvas_origin * detail, canvas_origin * detail, petal_color, detail)
+            canvas = pygame.transform.smoothscale(canvas, (canvas_origin * 2, canvas_origin * 2))
+            used_rect = canvas.get_bounding_rect()
+            atlas.append((canvas.subsurface(used_rect).copy().convert_alpha(), (canvas_origin - used_rect.x, canvas_origin - used_rect.y)))
+            continue
+        # Heads are fully opaque, so a colorkeyed, RLE-accelerated sprite blits
+        # much faster than a per-pixel alpha one
+        canvas = pygame.Surface((canvas_origin * 2, canvas_origin * 2))
+        canvas.fill(FLOWER_ATLAS_COLORKEY)
+        canvas.set_colorkey(FLOWER_ATLAS_COLORKEY)
+        draw_flower_head(canvas, canvas_origin, canvas_origin, petal_color)
+        used_rect = canvas.get_bounding_rect()
+        sprite = canvas.subsurface(used_rect).copy().convert()
+        sprite.set_colorkey(FLOWER_ATLAS_COLORKEY, pygame.RLEACCEL)
+        atlas.append((sprite, (canvas_origin - used_rect.x, canvas_origin - used_rect.y)))
+    return atlas
+
+# --- Flower Pool (Flappy) ---
+class FlowerPool:
+    """Fixed-capacity ring buffer of flower pairs stored in parallel arrays.
+
+    Flowers spawn at the right edge and all move at the same speed, so the oldest
+    flower is always the first to leave the screen: spawning writes over the slot
+    after the newest flower, expiring just advances past the oldest one, and
+    nothing is allocated or removed from a list while the game runs.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.int32) # Stem left edge (both stems share it)
+        self.gap_top = np.zeros(capacity, dtype=np.int32) # Bottom of the top stem
+        self.scored = np.zeros(capacity, dtype=bool)
+        self.color = np.zeros(capacity, dtype=np.int8) # Index into FLOWER_PETAL_COLORS
+        self.start = 0 # Slot of the oldest flower
+        self.count = 0
+
+    def spawn(self, x, gap_top, color_index):
+        if self.count == self.capacity: # Should not happen with a capacity from flower_pool_capacity
+            self.expire_oldest()
+        slot = (self.start + self.count) % self.capacity
+        self.x[slot] = x
+        self.gap_top[slot] = gap_top
+        self.scored[slot] = False
+        self.color[slot] = color_index
+        self.count += 1
+
+    def expire_oldest(self):
+        self.start = (self.start + 1) % self.capacity
+        self.count -= 1
+
+    def active_slices(self):
+        """The occupied slots as at most two slices (the ring may wrap around)."""
+        end = self.start + self.count
+        if end <= self.capacity:
+            return (slice(self.start, end),)
+        return (slice(self.start, self.capacity), slice(0, end - self.capacity))
+
+    def active_indices(self):
+        """Occupied slots from oldest to newest."""
+        return [(self.start + i) % self.capacity for i in range(self.count)]
+
+    def move(self, dx):
+        for active in self.active_slices():
+            self.x[active] += dx
+
+    def score_passed(self, bee_x):
+        """Marks flowers whose stem center is now left of bee_x as scored. Returns how many were newly scored."""
+        newly_scored = 0
+        for active in self.active_slices():
+            passed = ~self.scored[active] & (self.x[active] + STEM_WIDTH // 2 < bee_x)
+            newly_scored += int(passed.sum())
+            self.scored[active] |= passed
+        return newly_scored
+
+    def indices_overlapping(self, left, right, extent_left, extent_right):
+        """Occupied slots whose flower spans [x + extent_left, x + extent_right) overlap [left, right).
+
+        Flowers are stored left to right, so the walk stops at the first flower past
+        `right`; only the few flowers near the left edge are ever looked at.
+        """
+        overlapping = []
+        for i in range(self.count):
+            slot = (self.start + i) % self.capacity
+            flower_x = int(self.x[slot])
+            if flower_x + extent_left >= right:
+                break
+            if flower_x + extent_right > left:
+                overlapping.append(slot)
+        return overlapping
+
+    def expire_offscreen(self, min_right):
+        """Drops flowers whose stems ended up entirely left of min_right."""
+        while self.count and self.x[self.start] + STEM_WIDTH < min_right:
+            self.expire_oldest()
+
+def flower_pool_capacity(spawn_interval_ticks):
+    """Most flowers that can be alive at once for a given spawn interval."""
+    travel = SCREEN_WIDTH + STEM_WIDTH // 2 + STEM_WIDTH + FLOWER_HEAD_RADIUS
+    lifetime_ticks = math.ceil(travel / OBSTACLE_SPEED) + 1
+    return lifetime_ticks // spawn_interval_ticks + 2
+
+# --- Flappy Collision Shapes ---
+# Collision runs in two phases: a broad phase that only picks flowers overlapping the
+# bee's column (FlowerPool.indices_overlapping), and a narrow phase that tests the
+# drawn pixels. Masks are built once per bee scale; every flower head has the same shape.
+class FlappyCollisionShapes:
+    """Pixel masks for the Flappy bee and flower head, plus per-column extents of the bee for stem tests."""
+
+    def __init__(self, bee_sprite, bee_origin, head_sprite, head_origin):
+        self.bee_mask = pygame.mask.from_surface(bee_sprite)
+        self.bee_origin = bee_origin # Bee center inside the mask
+        self.head_mask = pygame.mask.from_surface(head_sprite)
+        self.head_origin = head_origin # Head center inside the mask
+
+        # Topmost/bottommost set pixel of every bee column (-1 if the column is empty).
+        # A stem reaches the screen edge, so it hits the bee exactly when one of these does.
+        bee_width, bee_height = self.bee_mask.get_size()
+        self.column_top = [-1] * bee_width
+        self.column_bottom = [-1] * bee_width
+        for column in range(bee_width):
+            for row in range(bee_height):
+                if self.bee_mask.get_at((column, row)):
+                    if self.column_top[column] < 0:
+                        self.column_top[column] = row
+                    self.column_bottom[column] = row
+
+        # Horizontal span of a whole flower (stems and heads) relative to its stem x
+        head_width = self.head_mask.get_size()[0]
+        head_left = STEM_WIDTH // 2 - head_origin[0]
+        self.flower_extent = (min(0, head_left), max(STEM_WIDTH, head_left + head_width))
+
+    def bee_bounds(self, bee_center_x, bee_center_y):
+        """(left, top, right) of the bee mask when the bee is centered at this point."""
+        bee_left = bee_center_x - self.bee_origin[0]
+        return bee_left, bee_center_y - self.bee_origin[1], bee_left + self.bee_mask.get_size()[0]
+
+    def bee_hits_flower(self, bee_left, bee_top, stem_x, gap_top_y, gap_bottom_y):
+        """Pixel-accurate test of the bee (mask top-left at bee_left, bee_top) against one flower pair."""
+        # Stems: only the bee columns the stem covers can touch it
+        first_column = max(0, stem_x - bee_left)
+        last_column = min(len(self.column_top), stem_x + STEM_WIDTH - bee_left)
+        for column in range(first_column, last_column):
+            if self.column_top[column] >= 0 and (bee_top + self.column_top[column] < gap_top_y or
+                                                 bee_top + self.column_bottom[column] >= gap_bottom_y):
+                return True
+        # Heads
+        head_left = stem_x + STEM_WIDTH // 2 - self.head_origin[0] - bee_left
+        for head_center_y in (gap_top_y, gap_bottom_y):
+            if self.bee_mask.overlap(self.head_mask, (head_left, head_center_y - self.head_origin[1] - bee_top)):
+                return True
+        return False
+
+collision_shape_cache = {} # bee scale -> FlappyCollisionShapes
+
+def get_flappy_collision_shapes(scale=FLAPPY_BEE_SCALE):
+    shapes = collision_shape_cache.get(scale)
+    if shapes is None:
+        # Always from the normal-detail sprites, so hits don't depend on --hidpi
+        bee_sprite, bee_origin = get_bee_sprite(scale, detail=1)
+        head_sprite, head_origin = build_flower_atlas(detail=1)[0] # Petal color doesn't change the shape
+        shapes = FlappyCollisionShapes(bee_sprite, bee_origin, head_sprite, head_origin)
+        collision_shape_cache[scale] = shapes
+    return shapes
+
+# --- Flappy Parallax Background ---
+# Scenery behind the flowers in horizontal bands that move slower the further away
+# they are. Every band has a pre-rendered strip that tiles horizontally, and all
+# bands live in one screen-sized background surface. When the world moves, each band
+# is scrolled in place with Surface.scroll and only the columns that came into view
+# on the right are copied in from its strip; the finished background is then one
+# blit, about what the flat fill cost.
+USE_PARALLAX_BACKGROUND = True # Set to False for the flat sky fill (for benchmarks)
+PARALLAX_STRIP_WIDTH = 600 # Strips repeat every this many px
+PARALLAX_SEED = 7 # Cloud and grass placement; never touches the game's random numbers
+# (layer, band top y, band height, speed as a fraction of the flowers' speed), far to near
+PARALLAX_LAYERS = [
+    ("clouds", 40, 160, 0.2),
+    ("hills", 410, 120, 0.5),
+    ("meadow", 530, 70, 1.0), # Moves with the flowers
+]
+CLOUD_COLOR = (245, 250, 255)
+HILL_COLOR = (126, 184, 122)
+MEADOW_COLOR = (86, 170, 64)
+GRASS_COLOR = (60, 140, 48)
+MEADOW_EDGE = 10 # Top rows of the meadow band that show the hills behind the grass tips
+
+def draw_wrapped(draw, x, strip_width):
+    """Calls draw(x) at x and one strip width to either side, so shapes crossing an edge tile seamlessly."""
+    for shift in (-strip_width, 0, strip_width):
+        draw(x + shift)
+
+def render_parallax_strip(layer, width, height):
+    """Pre-renders one horizontally tileable scenery strip."""
+    strip = pygame.Surface((width, height)).convert()
+    rng = random.Random(f"{PARALLAX_SEED}-{layer}")
+    if layer == "clouds":
+        strip.fill(LIGHT_BLUE)
+        for _ in range(5):
+            cloud_x = rng.randrange(width)
+            cloud_y = rng.randrange(20, height - 45) # Puffs stay inside the band
+            puffs = [(rng.randint(-40, 30), rng.randint(-12, 8), rng.randint(40, 70), rng.randint(22, 34)) for _ in range(4)]
+            for puff_x, puff_y, puff_width, puff_height in puffs:
+                draw_wrapped(lambda x: pygame.draw.ellipse(strip, CLOUD_COLOR, (x + puff_x, cloud_y + puff_y, puff_width, puff_height)),
+                             cloud_x, width)
+    elif layer == "hills":
+        strip.fill(LIGHT_BLUE)
+        # Whole numbers of waves per strip, so the ridge line meets itself at the seam
+        waves = [(rng.randint(1, 3), rng.uniform(0, 2 * math.pi), rng.uniform(10, 22)) for _ in range(3)]
+        ridge = [(x, height * 0.45 + sum(amplitude * math.sin(2 * math.pi * count * x / width + phase)
+                                        for count, phase, amplitude in waves)) for x in range(width + 1)]
+        pygame.draw.polygon(strip, HILL_COLOR, ridge + [(width, height), (0, height)])
+    else: # meadow
+        strip.fill(HILL_COLOR, (0, 0, width, MEADOW_EDGE))
+        strip.fill(MEADOW_COLOR, (0, MEADOW_EDGE, width, height - MEADOW_EDGE))
+        for _ in range(width // 4):
+            blade_x = rng.randrange(width)
+            blade_y = rng.randint(MEADOW_EDGE, height - 4)
+            blade_height = rng.randint(4, MEADOW_EDGE if blade_y == MEADOW_EDGE else 8)
+            lean = rng.randint(-2, 2)
+            draw_wrapped(lambda x: pygame.draw.line(strip, GRASS_COLOR, (x, blade_y), (x + lean, blade_y - blade_height)), blade_x, width)
+        for _ in range(12): # A few small flowers in the grass
+            dot_x = rng.randrange(width)
+            dot_y = rng.randint(MEADOW_EDGE + 8, height - 8)
+            dot_color = FLOWER_PETAL_COLORS[rng.randrange(len(FLOWER_PETAL_COLORS))]
+            draw_wrapped(lambda x: pygame.draw.circle(strip, dot_color, (x, dot_y), 3), dot_x, width)
+    return strip
+
+class ParallaxBackground:
+    """The Flappy sky and scenery, kept in a background surface that is scrolled band by band."""
+
+    def __init__(self, size):
+        self.surface = pygame.Surface(size).convert()
+        self.surface.fill(LIGHT_BLUE)
+        self.layers = [] # [band rect, strip, speed, scroll offset the band shows (None before the first draw)]
+        for layer, top, height, speed in PARALLAX_LAYERS:
+            strip = render_parallax_strip(layer, PARALLAX_STRIP_WIDTH, height)
+            self.layers.append([pygame.Rect(0, top, size[0], height), strip, speed, None])
+
+    def copy_strip(self, band, strip, dest_x, strip_x, width):
+        """Copies width columns of the strip, starting at strip column strip_x (wrapping around), into the band at dest_x."""
+        strip_x %= strip.get_width()
+        while width > 0:
+            part = min(width, strip.get_width() - strip_x)
+            self.surface.blit(strip, (dest_x, band.top), (strip_x, 0, part, band.height))
+            dest_x += part
+            width -= part
+            strip_x = 0
+
+    def draw(self, surface, scroll_x):
+        """Draws the background as seen after the world moved scroll_x px to the left."""
+        for layer in self.layers:
+            band, strip, speed, shown_offset = layer
+            offset = int(scroll_x * speed)
+            if offset == shown_offset:
+                continue
+            moved = offset - shown_offset if shown_offset is not None else 0
+            if 0 < moved < band.width:
+                # Slide what is already there and fill in just the newly exposed columns
+                self.surface.set_clip(band)
+                self.surface.scroll(-moved, 0)
+                self.surface.set_clip(None)
+                self.copy_strip(band, strip, band.width - moved, offset + band.width - moved, moved)
+            else: # First draw, a new game or a jump of a whole screen: redraw the band
+                self.copy_strip(band, strip, 0, offset, band.width)
+            layer[3] = offset
+        surface.blit(self.surface, (0, 0))
+
+parallax_background = None
+
+def get_parallax_background(size):
+    """Returns the background for this screen size, building the strips on first use."""
+    global parallax_background
+    if parallax_background is None or parallax_background.surface.get_size() != tuple(size):
+        parallax_background = ParallaxBackground(size)
+    return parallax_background
 
 # --- Flappy Bird Game Function --- <--- MODIFIED FUNCTION
-def run_flappy_game(surface, game_clock):
-    bee_y = SCREEN_HEIGHT // 2
-    bee_velocity = 0
-    bee_x = SCREEN_WIDTH // 4 # Keep bee horizontally fixed
+def draw_flappy_world(surface, flower_pool, flower_atlas, flower_draw_offset=0, scroll_x=0):
+    """Draws the sky and every active flower, shifted right by flower_draw_offset.
+    scroll_x is how far the world has moved left so far, for the parallax background."""
+    if USE_PARALLAX_BACKGROUND:
+        get_parallax_background(surface.get_size()).draw(surface, scroll_x)
+    else:
+        surface.fill(LIGHT_BLUE)
+    for i in flower_pool.active_indices():
+        stem_x = int(flower_pool.x[i]) + flower_draw_offset
+        stem_center_x = stem_x + STEM_WIDTH // 2
+        gap_top_y = int(flower_pool.gap_top[i])
+        gap_bottom_y = gap_top_y + FLOWER_GAP
+        p_color_index = int(flower_pool.color[i])
+        pygame.draw.rect(surface, FLOWER_STEM_COLOR, (stem_x, 0, STEM_WIDTH, gap_top_y))
+        pygame.draw.rect(surface, FLOWER_STEM_COLOR, (stem_x, gap_bottom_y, STEM_WIDTH, SCREEN_HEIGHT - gap_bottom_y))
+        if USE_FLOWER_ATLAS:
+            head_sprite, (head_origin_x, head_origin_y) = flower_atlas[p_color_index]
+            surface.blit(head_sprite, (stem_center_x - head_origin_x, gap_top_y - head_origin_y))
+            surface.blit(head_sprite, (stem_center_x - head_origin_x, gap_bottom_y - head_origin_y))
+        else:
+            petal_color = FLOWER_PETAL_COLORS[p_color_index]
+            draw_flower_head(surface, stem_center_x, gap_top_y, petal_color)
+            draw_flower_head(surface, stem_center_x, gap_bottom_y, petal_color)
+
+class FlappyRun:
+    """State and rules of one Flappy game, advanced one fixed simulation tick at a time.
+
+    Input, timing and drawing stay in run_flappy_game, so a run can also be stepped
+    without a window (see replay_session). All randomness comes from rng.
+    """
+
+    def __init__(self, rng, spawn_interval_ticks=FLAPPY_SPAWN_INTERVAL_TICKS, collision_shapes=None):
+        self.rng = rng
+        self.spawn_interval_ticks = spawn_interval_ticks
+        self.bee_x = SCREEN_WIDTH // 4 # Keep bee horizontally fixed
+        self.bee_y = SCREEN_HEIGHT // 2
+        self.prev_bee_y = self.bee_y
+        self.bee_velocity = 0
+        self.bee_height = int(pet_body_height * FLAPPY_BEE_SCALE) # Body rect height for the boundary test
+        self.flower_pool = FlowerPool(flower_pool_capacity(spawn_interval_ticks)) # Recycled in place, see FlowerPool
+        self.collision_shapes = collision_shapes or get_flappy_collision_shapes(FLAPPY_BEE_SCALE)
+        self.tick = 0
+        self.score = 0
+        self.active = True
+        self.petal_color_index = 0 # To cycle through petal colors
+        self.random_fact = "" # Selected when the game ends
+
+    def step(self, jump):
+        """Advances one simulation tick; jump applies a jump first. Returns True on the tick the game ends."""
+        flower_pool = self.flower_pool
+        collision_shapes = self.collision_shapes
+        flower_extent_left, flower_extent_right = collision_shapes.flower_extent
+        self.tick += 1
+        self.prev_bee_y = self.bee_y
+
+        if self.tick % self.spawn_interval_ticks == 0:
+            # Create new flowers
+            gap_top_y = self.rng.randint(FLOWER_HEAD_RADIUS + 50, SCREEN_HEIGHT - FLOWER_HEAD_RADIUS - 50 - FLOWER_GAP)
+            flower_pool.spawn(SCREEN_WIDTH + (STEM_WIDTH//2), gap_top_y, self.petal_color_index)
+            self.petal_color_index = (self.petal_color_index + 1) % len(FLOWER_PETAL_COLORS)
+
+        if jump:
+            self.bee_velocity = JUMP_STRENGTH
+        self.bee_velocity += GRAVITY
+        self.bee_y += self.bee_velocity
+        bee_rect_top = int(self.bee_y) - self.bee_height // 2 # Top and bottom of the bee's body rect
+        bee_rect_bottom = bee_rect_top + self.bee_height
+
+        collision = False # Flag for collision detection
+        flower_pool.move(-OBSTACLE_SPEED) # One bulk update for every flower
+        self.score += flower_pool.score_passed(self.bee_x)
+        # Broad phase: only flowers overlapping the bee's column
+        bee_left, bee_top, bee_right = collision_shapes.bee_bounds(self.bee_x, int(self.bee_y))
+        for i in flower_pool.indices_overlapping(bee_left, bee_right, flower_extent_left, flower_extent_right):
+            # Narrow phase: pixel masks for heads, per-column extents for stems
+            gap_top_y = int(flower_pool.gap_top[i])
+            if collision_shapes.bee_hits_flower(bee_left, bee_top, int(flower_pool.x[i]), gap_top_y, gap_top_y + FLOWER_GAP):
+                collision = True
+
+        flower_pool.expire_offscreen(-FLOWER_HEAD_RADIUS)
+
+        # Check boundary collision
+        if bee_rect_top <= 0 or bee_rect_bottom >= SCREEN_HEIGHT:
+            collision = True
+
+        # --- Handle Game Over ---
+        if collision:
+            self.active = False
+            self.prev_bee_y = self.bee_y # Draw the final state, not an in-between one
+            self.random_fact = self.rng.choice(BEE_FACTS) # Select random fact ONCE when game ends
+            return True
+        return False
+
+def flappy_exit(flappy_run):
+    if session_recorder is not None:
+        session_recorder.flappy_end(flappy_run)
+    return flappy_run.score
+
+def run_flappy_game(surface, game_clock, spawn_interval_ticks=FLAPPY_SPAWN_INTERVAL_TICKS):
+    flappy_run = FlappyRun(game_rng, spawn_interval_ticks)
+    if session_recorder is not None:
+        session_recorder.flappy_start(flappy_run)
 
-    flowers = [] # List to store flower rects [top_stem_rect, bottom_stem_rect, scored, petal_color_index]
-    obstacle_timer = pygame.USEREVENT + 1
-    pygame.time.set_timer(obstacle_timer, OBSTACLE_FREQUENCY)
+    # Fixed-timestep state: real frame time is banked in the accumulator and spent in
+    # whole simulation ticks; drawing interpolates between the last two ticks.
+    accumulator = 0.0
+    frame_time = 0
+    jump_pending = False # A jump pressed this frame is applied on the next simulation tick
 
-    score = 0
-    game_active = True
     game_over_message_shown = False
-    petal_color_index = 0 # To cycle through petal colors
-    random_fact = "" # Variable to store the selected fact
+    flower_atlas = build_flower_atlas() # Pre-rendered flower heads, one per petal color
 
     while True: # Loop until player exits game over screen
+        frame_profiler.begin_frame("flappy")
+        allocation_tracker.begin_frame("flappy")
+        game_active = flappy_run.active
         # --- Event Handling (Flappy) ---
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if frame_profiler.csv_rows is not None:
+                    frame_profiler.save_csv()
+                allocation_tracker.stop()
                 pygame.quit()
                 sys.exit()
+            if handle_profiler_event(event):
+                continue
+            handle_window_event(event)
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE and game_active:
-                    bee_velocity = JUMP_STRENGTH # Jump!
+                    jump_pending = True # Jump!
                 if event.key == pygame.K_SPACE and not game_active:
-                    return score # Exit mini-game and return score
+                    return flappy_exit(flappy_run) # Exit mini-game and return score
             if event.type == pygame.MOUSEBUTTONDOWN and not game_active:
-                 return score # Exit mini-game and return score
-            if event.type == obstacle_timer and game_active:
-                # Create new flowers
-                gap_top_y = random.randint(FLOWER_HEAD_RADIUS + 50, SCREEN_HEIGHT - FLOWER_HEAD_RADIUS - 50 - FLOWER_GAP)
-                gap_bottom_y = gap_top_y + FLOWER_GAP
-                top_stem = pygame.Rect(SCREEN_WIDTH + (STEM_WIDTH//2), 0, STEM_WIDTH, gap_top_y)
-                bottom_stem = pygame.Rect(SCREEN_WIDTH + (STEM_WIDTH//2), gap_bottom_y, STEM_WIDTH, SCREEN_HEIGHT - gap_bottom_y)
-                flowers.append([top_stem, bottom_stem, False, petal_color_index])
-                petal_color_index = (petal_color_index + 1) % len(FLOWER_PETAL_COLORS)
+                 return flappy_exit(flappy_run) # Exit mini-game and return score
+        frame_profiler.mark("events")
 
         # --- Game Logic (Flappy) ---
-        bee_rect = pygame.Rect(0,0,0,0) # Initialize bee_rect
         if game_active:
-            bee_velocity += GRAVITY
-            bee_y += bee_velocity
-            temp_bee_rect = pygame.Rect(0, 0, int(pet_body_width * FLAPPY_BEE_SCALE), int(pet_body_height * FLAPPY_BEE_SCALE))
-            temp_bee_rect.center = (bee_x, int(bee_y))
-            bee_rect = temp_bee_rect # Assign the calculated rect
-
-            flowers_to_remove = []
-            collision = False # Flag for collision detection
-            for i, flower_pair in enumerate(flowers):
-                flower_pair[0].x -= OBSTACLE_SPEED
-                flower_pair[1].x -= OBSTACLE_SPEED
-                if not flower_pair[2] and flower_pair[0].centerx < bee_x:
-                    score += 1
-                    flower_pair[2] = True
-                # Check collision with stems
-                if bee_rect.colliderect(flower_pair[0]) or bee_rect.colliderect(flower_pair[1]):
-                    collision = True
-                # Check collision with flower heads (circles) - More accurate
-                top_flower_center_x = flower_pair[0].centerx
-                top_flower_center_y = flower_pair[0].bottom
-                bottom_flower_center_x = flower_pair[1].centerx
-                bottom_flower_center_y = flower_pair[1].top
-                # Simple circle collision check (distance between centers <= sum of radii)
-                if math.hypot(bee_rect.centerx - top_flower_center_x, bee_rect.centery - top_flower_center_y) <= (bee_rect.width / 2 + FLOWER_HEAD_RADIUS):
-                    collision = True
-                if math.hypot(bee_rect.centerx - bottom_flower_center_x, bee_rect.centery - bottom_flower_center_y) <= (bee_rect.width / 2 + FLOWER_HEAD_RADIUS):
-                    collision = True
-
-                if flower_pair[0].right < -FLOWER_HEAD_RADIUS:
-                    flowers_to_remove.append(flower_pair)
-
-            for flower_pair in flowers_to_remove:
-                flowers.remove(flower_pair)
-
-            # Check boundary collision
-            if bee_rect.top <= 0 or bee_rect.bottom >= SCREEN_HEIGHT:
-                collision = True
-
-            # --- Handle Game Over ---
-            if collision:
-                game_active = False
-                # Select random fact ONCE when game ends
-                if not game_over_message_shown: # Ensure fact is chosen only once
-                    random_fact = random.choice(BEE_FACTS)
-                    print(f"Game Over! Final Score: {score}")
-                    game_over_message_shown = True # Mark game over message as shown
-
+            accumulator += frame_time
+        while flappy_run.active and accumulator >= FLAPPY_TICK_MS:
+            accumulator -= FLAPPY_TICK_MS
+            if jump_pending and session_recorder is not None:
+                session_recorder.jump(flappy_run.tick + 1)
+            if flappy_run.step(jump_pending):
+                print(f"Game Over! Final Score: {flappy_run.score}")
+            jump_pending = False
+        frame_profiler.mark("logic")
+        game_active = flappy_run.active
+        score = flappy_run.score
+        random_fact = flappy_run.random_fact
+        if not game_active:
+            game_over_message_shown = True
 
         # --- Drawing (Flappy) ---
-        surface.fill(LIGHT_BLUE)
-        num_petals = 6
-        for top_stem, bottom_stem, _, p_color_index in flowers:
-            petal_color = FLOWER_PETAL_COLORS[p_color_index]
-            pygame.draw.rect(surface, FLOWER_STEM_COLOR, top_stem)
-            pygame.draw.rect(surface, FLOWER_STEM_COLOR, bottom_stem)
-            top_flower_center_x = top_stem.centerx
-            top_flower_center_y = top_stem.bottom
-            for i in range(num_petals):
-                angle = (360 / num_petals) * i
-                rad_angle = math.radians(angle)
-                petal_x = top_flower_center_x + (FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.cos(rad_angle)
-                petal_y = top_flower_center_y + (FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.sin(rad_angle)
-                pygame.draw.circle(surface, petal_color, (int(petal_x), int(petal_y)), PETAL_RADIUS)
-            pygame.draw.circle(surface, FLOWER_CENTER_COLOR, (top_flower_center_x, top_flower_center_y), PETAL_RADIUS)
-            bottom_flower_center_x = bottom_stem.centerx
-            bottom_flower_center_y = bottom_stem.top
-            for i in range(num_petals):
-                angle = (360 / num_petals) * i
-                rad_angle = math.radians(angle)
-                petal_x = bottom_flower_center_x + (FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.cos(rad_angle)
-                petal_y = bottom_flower_center_y + (FLOWER_HEAD_RADIUS - PETAL_RADIUS) * math.sin(rad_angle)
-                pygame.draw.circle(surface, petal_color, (int(petal_x), int(petal_y)), PETAL_RADIUS)
-            pygame.draw.circle(surface, FLOWER_CENTER_COLOR, (bottom_flower_center_x, bottom_flower_center_y), PETAL_RADIUS)
+        # Interpolate between the previous and current tick by the unspent fraction of a tick
+        interpolation_alpha = accumulator / FLAPPY_TICK_MS if game_active else 1.0
+        draw_bee_y = flappy_run.prev_bee_y + (flappy_run.bee_y - flappy_run.prev_bee_y) * interpolation_alpha
+        flower_draw_offset = int(OBSTACLE_SPEED * (1 - interpolation_alpha)) # Flowers are still this far right of their current x
+        scroll_x = flappy_run.tick * OBSTACLE_SPEED - flower_draw_offset # Distance the world has moved, as drawn
+
+        draw_flappy_world(surface, flappy_run.flower_pool, flower_atlas, flower_draw_offset, scroll_x)
 
         # Draw the bee only if game is active or just ended (to avoid drawing over game over text immediately)
         if game_active or not game_over_message_shown:
-             draw_bee(surface, bee_x, int(bee_y), (0,0), scale=FLAPPY_BEE_SCALE) # Use (0,0) for mouse pos as it's not needed here
+             draw_bee(surface, flappy_run.bee_x, int(draw_bee_y), (0,0), scale=FLAPPY_BEE_SCALE) # Use (0,0) for mouse pos as it's not needed here
+        frame_profiler.mark("world")
 
-        # Use font_game_score for the score display (Keeping this white for contrast with flowers)
-        draw_text(f"Score: {score}", font_game_score, WHITE, surface, SCREEN_WIDTH // 2, 50, center=True)
+        # Use the game score font for the score display (Keeping this white for contrast with flowers)
+        draw_number_text("Score: ", score, get_font("game_score"), WHITE, surface, SCREEN_WIDTH // 2, 50, center=True)
 
         # Game Over Message
         if not game_active:
             # Draw standard game over text using the loaded fonts
             # Keep "Game Over!" red for emphasis
-            draw_text("Game Over!", font_large, RED, surface, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60, center=True)
+            draw_text("Game Over!", get_font("large"), RED, surface, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60, center=True)
             # Change score text to BLACK
-            draw_text(f"Final Score: {score}", font_medium, BLACK, surface, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20, center=True) # <<< MODIFIED
+            draw_text(f"Final Score: {score}", get_font("medium"), BLACK, surface, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20, center=True) # <<< MODIFIED
 
             # --- Draw the Random Bee Fact ---
             line_y = SCREEN_HEIGHT // 2 + 20 # Adjusted Starting Y for fact text
             if random_fact: # Only draw if a fact was selected
                 # Simple text wrapping
                 fact_rect = pygame.Rect(20, line_y, SCREEN_WIDTH - 40, 100) # Area for fact text
-                words = random_fact.split(' ')
-                lines = []
-                current_line = ""
-                for word in words:
-                    test_line = current_line + word + " "
-                    # Use font_small for rendering test
-                    test_surf = font_small.render(test_line, True, BLACK) # <<< MODIFIED (Test render color doesn't matter much, but keep consistent)
-                    if test_surf.get_width() < fact_rect.width:
-                        current_line = test_line
-                    else:
-                        lines.append(current_line)
-                        current_line = word + " "
-                lines.append(current_line) # Add the last line
-
-                # Draw the wrapped lines using font_small and BLACK color
-                for line in lines:
-                    draw_text(line.strip(), font_small, BLACK, surface, fact_rect.centerx, line_y, center=True) # <<< MODIFIED
-                    line_y += font_small.get_height() + 2 # Move down for next line (using original spacing from v3)
-
-            # Draw exit instruction below the fact using font_small and BLACK color
-            draw_text("Click or Space to Exit", font_small, BLACK, surface, SCREEN_WIDTH // 2, line_y + 10, center=True) # <<< MODIFIED
+                lines = wrap_text_lines(random_fact, get_font("small"), fact_rect.width) # Layout is cached after the first frame
 
-        pygame.display.flip()
-        game_clock.tick(60)
+                # Draw the wrapped lines using the small font and BLACK color
+                for line in lines:
+                    draw_text(line.strip(), get_font("small"), BLACK, surface, fact_rect.centerx, line_y, center=True) # <<< MODIFIED
+                    line_y += get_font("small").get_height() + 2 # Move down for next line (using original spacing from v3)
+
+            # Draw exit instruction below the fact using the small font and BLACK color
+            draw_text("Click or Space to Exit", get_font("small"), BLACK, surface, SCREEN_WIDTH // 2, line_y + 10, center=True) # <<< MODIFIED
+        frame_profiler.mark("text")
+
+        draw_profiler_overlay(surface)
+        frame_profiler.mark("overlay")
+        present_full_frame()
+        frame_profiler.mark("present")
+        frame_time = min(game_clock.tick(FLAPPY_RENDER_FPS), FLAPPY_MAX_FRAME_MS)
+        frame_profiler.mark("idle")
+        frame_profiler.end_frame()
+        allocation_tracker.end_frame()
 # --- End Modified Function ---
 
 
-# --- Main Game Loop ---
-running = True
-# Keep track of the bee rects drawn in the current frame for collision
-current_frame_bee_rects = []
-
-while running:
-    current_time = pygame.time.get_ticks()
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_pressed = pygame.mouse.get_pressed() # Get mouse button states
-
-    # Reset bee rects for the new frame
-    current_frame_bee_rects = []
-
-    # --- Event Handling (Main Pet Mode) ---
-    if game_mode == MODE_PET:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # Room Navigation
-                if bathroom_btn_rect.collidepoint(event.pos):
-                    current_room_name = "Bathroom"
-                elif honey_storage_btn_rect.collidepoint(event.pos):
-                    current_room_name = "Pollen Storage" # Corrected room name
-                elif nest_btn_rect.collidepoint(event.pos):
-                    current_room_name = "Nest"
-
-                # Check for room-specific button clicks (excluding Clean button)
-                if current_room_name == "Nest" and play_btn_rect.collidepoint(event.pos):
-                    print("Starting Flappy Game...")
-                    game_mode = MODE_FLAPPY
-                # elif current_room_name == "Bathroom": # No button click for cleaning
-                #     pass
-                elif current_room_name == "Pollen Storage" and feed_btn_rect.collidepoint(event.pos): # Corrected room name
-                    pet_hunger_level = max_level # Fill honey bar completely
-                    print(f"Fed! Honey: {int(pet_hunger_level)}")
-
-
-    # --- Game Logic (Main Pet Mode) ---
-    if game_mode == MODE_PET:
-        # Decrease stats over time
-        if current_time - last_stat_decrease_time > stat_decrease_interval:
-            pet_cleanliness_level = max(0, pet_cleanliness_level - 2)
-            pet_hunger_level = max(0, pet_hunger_level - 4)
-            deficit = (max_level - pet_cleanliness_level) + (max_level - pet_hunger_level)
-            happiness_decrease = max(1, deficit // 20)
-            pet_happy_level = max(0, pet_happy_level - happiness_decrease)
-            last_stat_decrease_time = current_time
-
-        # --- Cursor Visibility ---
-        if current_room_name == "Bathroom":
-            if not show_custom_cursor:
-                 pygame.mouse.set_visible(False)
-                 show_custom_cursor = True
+# --- Save State ---
+# The pet is saved to a small versioned binary file:
+#   magic, version, cleanliness, hunger, happiness, bee level, xp, room index,
+#   wall-clock time of the last stat decrease (version 2), CRC32 of the rest
+# On load the stats are fast-forwarded over the time the game was closed.
+# Version 1 saves (no time) still load, without the catch-up.
+# Saves are written by a background thread (write to a temp file, then os.replace) so a
+# save never stalls a frame, and bursts of changes are coalesced into one write per interval.
+SAVE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "buzzbuddy_save.bin")
+SAVE_MAGIC = b"BZBD"
+SAVE_VERSION = 2
+SAVE_HEADER = struct.Struct("<4sH") # magic, version
+SAVE_FORMATS = {1: struct.Struct("<4sHfffHIB"), 2: struct.Struct("<4sHfffHIBd")}
+SAVE_CHECKSUM = struct.Struct("<I")
+AUTOSAVE_INTERVAL = 2.0 # Seconds; at most one write per interval
+USE_OFFLINE_DECAY = True # Set to False to freeze the stats while the game is closed
+
+def get_save_snapshot():
+    """The saved part of the pet state, as a tuple (used to detect changes)."""
+    return (pet_cleanliness_level, pet_hunger_level, pet_happy_level, bee_level, xp_current, current_room_name)
+
+def pack_save_state(snapshot, last_decrease_wall_time=0.0):
+    cleanliness, hunger, happiness, level, xp, room_name = snapshot
+    payload = SAVE_FORMATS[SAVE_VERSION].pack(SAVE_MAGIC, SAVE_VERSION, cleanliness, hunger, happiness,
+                                              level, int(xp), ROOMS.index(room_name), last_decrease_wall_time)
+    return payload + SAVE_CHECKSUM.pack(zlib.crc32(payload))
+
+def unpack_save_state(data):
+    """Returns the saved state as a dict. Raises ValueError if the data is not a valid save.
+    "last_decrease_time" is None for a version 1 save."""
+    magic, version = SAVE_HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC or version not in SAVE_FORMATS:
+        raise ValueError(f"not a BuzzBuddy save (version {version})")
+    save_format = SAVE_FORMATS[version]
+    if len(data) != save_format.size + SAVE_CHECKSUM.size:
+        raise ValueError(f"unexpected save size {len(data)}")
+    payload = data[:save_format.size]
+    if SAVE_CHECKSUM.unpack(data[save_format.size:])[0] != zlib.crc32(payload):
+        raise ValueError("checksum mismatch")
+    fields = save_format.unpack(payload)
+    cleanliness, hunger, happiness, level, xp, room_index = fields[2:8]
+    return {
+        "cleanliness": cleanliness, "hunger": hunger, "happiness": happiness,
+        "bee_level": min(max(1, level), max_bee_level), "xp": xp,
+        "room": ROOMS[room_index] if room_index < len(ROOMS) else current_room_name,
+        "last_decrease_time": fields[8] if version >= 2 else None,
+    }
+
+def write_save_file(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as save_file:
+        save_file.write(data)
+        save_file.flush()
+        os.fsync(save_file.fileno())
+    os.replace(temp_path, path) # Atomic: the old save stays intact until the new one is complete
+
+def load_save_state(path=SAVE_FILE):
+    """Reads the save file. Returns the state dict, or None if there is no usable save."""
+    try:
+        with open(path, "rb") as save_file:
+            return unpack_save_state(save_file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error loading save '{path}': {e}")
+        print("Starting a new pet instead.")
+        return None
+
+def apply_save_state(state):
+    global pet_cleanliness_level, pet_hunger_level, pet_happy_level
+    global bee_level, xp_current, xp_next_level, current_room_name
+    pet_cleanliness_level = state["cleanliness"]
+    pet_hunger_level = state["hunger"]
+    pet_happy_level = state["happiness"]
+    bee_level = state["bee_level"]
+    xp_current = state["xp"]
+    xp_next_level = xp_levels.get(bee_level, float('inf'))
+    current_room_name = state["room"]
+
+class AutosaveWorker:
+    """Writes save data on a background thread, at most once per interval.
+
+    request() only swaps in the newest data, so any number of requests during an
+    interval end up as a single write of the latest state.
+    """
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.pending = None
+        self.stopping = False
+        self.last_write_time = -interval
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def request(self, data):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+                if self.pending is None: # Stopping with nothing left to write
+                    return
+                # Wait out the rest of the interval; newer requests replace the pending data
+                remaining = self.last_write_time + self.interval - time.monotonic()
+                while remaining > 0 and not self.stopping:
+                    self.condition.wait(remaining)
+                    remaining = self.last_write_time + self.interval - time.monotonic()
+                data = self.pending
+                self.pending = None
+            try:
+                write_save_file(self.path, data)
+            except OSError as e:
+                print(f"Error writing save '{self.path}': {e}")
+            self.last_write_time = time.monotonic()
+
+    def stop(self):
+        """Writes any pending data right away and stops the thread."""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join(timeout=5)
+
+# The save is loaded and the worker started by main(), before the first frame
+autosave_worker = None
+last_saved_snapshot = None
+
+def start_save_state():
+    """Loads the save file (if any) and starts the autosave worker."""
+    global autosave_worker, last_saved_snapshot
+    load_start = time.perf_counter()
+    saved_state = load_save_state()
+    if saved_state is not None:
+        apply_save_state(saved_state)
+        print(f"Loaded save: Level {bee_level}, Clean={int(pet_cleanliness_level)}, Honey={int(pet_hunger_level)}, Happy={int(pet_happy_level)}")
+        if USE_OFFLINE_DECAY and saved_state["last_decrease_time"] is not None:
+            # Catch up on the decreases that fell due while the game was closed
+            away_ms = max(0, int((time.time() - saved_state["last_decrease_time"]) * 1000))
+            decreases = fast_forward_pet(away_ms)
+            if decreases:
+                print(f"Away for {format_duration(away_ms)}: {decreases} stat decreases, Clean={int(pet_cleanliness_level)}, Honey={int(pet_hunger_level)}, Happy={int(pet_happy_level)}")
+    autosave_worker = AutosaveWorker(SAVE_FILE, AUTOSAVE_INTERVAL)
+    atexit.register(autosave_worker.stop) # Also covers sys.exit() from inside the mini-game
+    last_saved_snapshot = get_save_snapshot()
+    record_startup_phase("save load", load_start)
+
+def request_autosave():
+    """Queues a save if the pet state changed since the last one."""
+    global last_saved_snapshot
+    if autosave_worker is None:
+        return
+    snapshot = get_save_snapshot()
+    if snapshot != last_saved_snapshot:
+        last_saved_snapshot = snapshot
+        # Every decrease changes the snapshot, so the saved time of the last one stays current
+        last_decrease_wall_time = time.time() - (pygame.time.get_ticks() - last_stat_decrease_time) / 1000
+        autosave_worker.request(pack_save_state(snapshot, last_decrease_wall_time))
+
+# --- Session Recording ---
+# buzz_replay.SessionRecorder logs the seed, the starting pet state and every tick's
+# input; replay_session plays such a log back through the game's rules without
+# drawing and checks every Flappy score and the final pet state. All gameplay
+# randomness comes from game_rng, seeded at startup, so the input is all it needs.
+game_rng = random.Random() # All gameplay randomness (flower gaps, bee facts)
+session_recorder = None # A SessionRecorder while recording
+
+def pack_current_state():
+    return pack_save_state(get_save_snapshot())
+
+def start_recording(path, seed):
+    global session_recorder
+    session_recorder = SessionRecorder(path, seed, last_stat_decrease_time, pack_current_state, write_save_file)
+    atexit.register(session_recorder.close) # Also covers sys.exit() from inside the mini-game
+    print(f"Recording session to {path} (seed {seed})")
+
+def advance_flappy_run(flappy_run, tick):
+    """Steps without jumping until the run reaches tick (or ends)."""
+    while flappy_run.active and flappy_run.tick < tick:
+        flappy_run.step(False)
+
+def replay_session(path):
+    """Replays a recorded session without drawing, as fast as possible, and checks
+    every Flappy score and the final pet state against the recording.
+    Returns a list of mismatch descriptions (empty if the replay matched)."""
+    global game_mode, last_stat_decrease_time
+    with open(path, "rb") as replay_file:
+        recording = read_recording(replay_file.read())
+    last_stat_decrease_time = recording.last_stat_decrease_time
+    apply_save_state(unpack_save_state(recording.start_state))
+    game_rng.seed(recording.seed)
+    game_mode = MODE_PET
+
+    mismatches = []
+    flappy_run = None
+    frames = 0
+    replay_start = time.perf_counter()
+    for record_type, *values in recording.records:
+        if record_type == RECORD_FRAME:
+            current_time, mouse_pos, clicks = values
+            for click_pos in clicks:
+                handle_pet_click(click_pos)
+            if game_mode == MODE_PET: # Same order as the main loop
+                update_pet_stats(current_time)
+                update_pet_cleaning(mouse_pos)
+            frames += 1
+        elif record_type == RECORD_FLAPPY_START:
+            (spawn_interval_ticks,) = values
+            if spawn_interval_ticks is None: # Version 1 recordings always used the normal interval
+                spawn_interval_ticks = FLAPPY_SPAWN_INTERVAL_TICKS
+            flappy_run = FlappyRun(game_rng, spawn_interval_ticks)
+        elif record_type == RECORD_JUMP:
+            (tick,) = values
+            advance_flappy_run(flappy_run, tick - 1)
+            if flappy_run.active:
+                flappy_run.step(True)
+        elif record_type == RECORD_FLAPPY_END:
+            tick, score, finished = values
+            advance_flappy_run(flappy_run, tick)
+            if (flappy_run.tick, flappy_run.score) != (tick, score) or (finished and flappy_run.active):
+                mismatches.append(f"Flappy game: recorded score {score} at tick {tick}, replay scored {flappy_run.score} at tick {flappy_run.tick}")
+            if finished:
+                finish_flappy_game(flappy_run.score)
+            flappy_run = None
+        elif record_type == RECORD_END:
+            (final_state,) = values
+            recorded_state = unpack_save_state(final_state)
+            replayed_state = unpack_save_state(pack_current_state())
+            if recorded_state != replayed_state: # Both store no decrease time, older recordings hold version 1 states
+                mismatches.append(f"Final state: recorded {recorded_state}, replay {replayed_state}")
+    elapsed = time.perf_counter() - replay_start
+    print(f"Replayed {frames} frames in {elapsed * 1000:.1f} ms: " + ("OK" if not mismatches else "MISMATCH"))
+    for mismatch in mismatches:
+        print("  " + mismatch)
+    return mismatches
+
+# --- Idle Scheduling ---
+# In pet mode nothing on screen changes unless an event arrives (mouse, keys, window)
+# or a stat decays, so instead of redrawing at 60 FPS the loop sleeps in
+# pygame.event.wait until one of those happens. The only animation that runs
+# without input is hover cleaning, which keeps the loop awake while it lasts.
+# While the F3 profiler overlay is shown, the loop still wakes every
+# PROFILER_OVERLAY_REFRESH_MS so its numbers keep updating.
+USE_IDLE_WAIT = True # Set to False to always redraw at 60 FPS
+
+def wait_for_pet_event(timeout_ms):
+    """Sleeps until an event arrives or timeout_ms passes. Returns the event that
+    woke it, or None on a timeout; the caller handles it ahead of the queue."""
+    event = pygame.event.wait(max(1, int(timeout_ms)))
+    return event if event.type != pygame.NOEVENT else None
+
+# --- Particles ---
+# Bubbles while brushing, pollen from the Make button and confetti on a level up.
+# Particles live in parallel NumPy arrays (position, velocity, gravity, age,
+# lifetime, look), slots [0, count) alive, and are moved with a few whole-array
+# operations per frame. Dead particles are dropped by compacting the survivors
+# to the front of the arrays. Up to PARTICLE_SPRITE_LIMIT particles are drawn as
+# fading sprites with one Surface.blits call; above that they are written straight
+# into the screen's pixels through pygame.surfarray as small opaque dots, which
+# keeps tens of thousands of them within a 60 FPS frame.
+USE_PARTICLES = True # Set to False to turn the effects off (for benchmarks)
+PARTICLE_CAPACITY = 50000 # New particles are dropped while this many are alive
+PARTICLE_SPRITE_LIMIT = 2000
+PARTICLE_FADE_STEPS = 4 # Sprite alpha levels over a particle's life
+PARTICLE_MAX_STEP_MS = 50 # Longer frames move particles as if only this much time passed
+PARTICLE_DOT_OFFSETS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)] # Pixels of a dot in the surfarray path
+# Looks: (shape, color, radius); a sprite is built per look and fade step
+PARTICLE_LOOKS = [
+    ("bubble", (110, 170, 230), 4),
+    ("dot", (255, 245, 170), 2),
+    ("dot", (215, 105, 0), 2),
+    ("square", PETAL_COLOR_1, 3),
+    ("square", PETAL_COLOR_3, 3),
+    ("square", BEE_YELLOW, 3),
+    ("square", XP_BAR_COLOR, 3),
+]
+# Emitters: looks used, launch speed range (px/s), launch angle range (degrees, -90 is up),
+# gravity (px/s^2, negative rises) and lifetime range (s)
+PARTICLE_EMITTERS = {
+    "bubbles": {"looks": [0], "speed": (15, 60), "angle": (-160, -20), "gravity": -60, "lifetime": (0.5, 1.2)},
+    "pollen": {"looks": [1, 2], "speed": (60, 180), "angle": (-170, -10), "gravity": 300, "lifetime": (0.6, 1.2)},
+    "confetti": {"looks": [3, 4, 5, 6], "speed": (120, 360), "angle": (-180, 0), "gravity": 320, "lifetime": (1.2, 2.2)},
+}
+BUBBLES_PER_FRAME = 2 # While hover cleaning
+POLLEN_BURST = 60 # Per Make click
+CONFETTI_BURST = 400 # Per level up, shared by the bees
+
+def build_particle_sprite(shape, color, radius, alpha):
+    size = radius * 2 + 1
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    if shape == "bubble": # Whitish inside, the color as the rim
+        pygame.draw.circle(sprite, (*WHITE, alpha * 2 // 3), (radius, radius), radius)
+        pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius, 1)
+    elif shape == "dot":
+        pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius)
+    else:
+        sprite.fill((*color, alpha))
+    return sprite.convert_alpha()
+
+class ParticleSystem:
+    """Particles in parallel arrays with a fixed capacity; slots [0, count) are alive."""
+
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32) # px/s
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32) # px/s^2
+        self.age = np.zeros(capacity, dtype=np.float32) # s
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.look = np.zeros(capacity, dtype=np.int16) # Index into PARTICLE_LOOKS
+        self.arrays = [self.x, self.y, self.vx, self.vy, self.gravity, self.age, self.lifetime, self.look]
+        self.look_radius = np.array([radius for _, _, radius in PARTICLE_LOOKS], dtype=np.int32)
+        self.rng = np.random.default_rng(seed) # Never the game's random numbers, so replays don't depend on effects
+        self.sprites = None # look * PARTICLE_FADE_STEPS + fade step -> sprite, built on the first draw
+        self.last_update_time = None
+        self.drawn_rect = None # Area the particles covered when last drawn
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def emit(self, emitter, x, y, count, spread=0):
+        """Launches count particles of an emitter from around (x, y)."""
+        settings = PARTICLE_EMITTERS[emitter]
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        rng = self.rng
+        new = slice(self.count, self.count + count)
+        angle = np.radians(rng.uniform(*settings["angle"], count))
+        speed = rng.uniform(*settings["speed"], count)
+        self.x[new] = x + rng.uniform(-spread, spread, count)
+        self.y[new] = y + rng.uniform(-spread, spread, count)
+        self.vx[new] = np.cos(angle) * speed
+        self.vy[new] = np.sin(angle) * speed
+        self.gravity[new] = settings["gravity"]
+        self.age[new] = 0
+        self.lifetime[new] = rng.uniform(*settings["lifetime"], count)
+        self.look[new] = rng.choice(settings["looks"], count)
+        self.count += count
+
+    def update(self, current_time):
+        """Moves every particle by the time since the last update and drops the dead ones."""
+        dt = min(current_time - self.last_update_time, PARTICLE_MAX_STEP_MS) / 1000 if self.last_update_time is not None else 0
+        self.last_update_time = current_time
+        if not self.count or dt <= 0:
+            return
+        live = slice(0, self.count)
+        self.vy[live] += self.gravity[live] * dt
+        self.x[live] += self.vx[live] * dt
+        self.y[live] += self.vy[live] * dt
+        self.age[live] += dt
+        alive = (self.age[live] < self.lifetime[live]) & (self.y[live] < SCREEN_HEIGHT + 10) & (self.y[live] > -SCREEN_HEIGHT)
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            for array in self.arrays:
+                array[:keep.size] = array[keep]
+            self.count = keep.size
+
+    def draw(self, surface):
+        """Draws the live particles and marks where they are and were last frame as dirty."""
+        if self.drawn_rect is not None:
+            mark_dirty(self.drawn_rect)
+            self.drawn_rect = None
+        if not self.count:
+            return
+        live = slice(0, self.count)
+        xs = self.x[live].astype(np.int32)
+        ys = self.y[live].astype(np.int32)
+        looks = self.look[live]
+        if self.count <= PARTICLE_SPRITE_LIMIT or surface.get_bytesize() != 4:
+            self.draw_sprites(surface, xs, ys, looks)
         else:
-            if show_custom_cursor:
-                 pygame.mouse.set_visible(True)
-                 show_custom_cursor = False
-        # --- End Cursor Visibility ---
-
-        # --- Cleaning Logic --- (MODIFIED FOR HOVER)
-        is_hover_cleaning = False # Renamed variable for clarity
-        if current_room_name == "Bathroom": # Only check when in the bathroom
-            brush_rect.center = mouse_pos # Update brush rect position to follow mouse
-            # Need to draw bees first before checking collision here
-            # We will check collision *after* drawing the bees
-
-        # --- Drawing (Main Pet Mode) ---
-        screen.fill(HONEYCOMB_FILL) # Fill background first
-
-        # Draw Honeycomb Background
-        hex_height = math.sqrt(3) * HEX_RADIUS
-        hex_width = 2 * HEX_RADIUS
-        vert_spacing = hex_height
-        horiz_spacing = hex_width * 3/4
-        current_y = -hex_height / 2
-        row_index = 0
-        while current_y < SCREEN_HEIGHT + hex_height:
-            if row_index % 2 != 0: current_x = -horiz_spacing / 2
-            else: current_x = -horiz_spacing
-            while current_x < SCREEN_WIDTH + horiz_spacing:
-                draw_hexagon(screen, HONEYCOMB_FILL, HONEYCOMB_OUTLINE,
-                             current_x, current_y, HEX_RADIUS)
-                current_x += horiz_spacing
-            current_y += vert_spacing
-            row_index += 1
-
-        # Draw Status Bars
-        draw_generic_bar(screen, cleanliness_bar_rect, LIGHT_BLUE, pet_cleanliness_level, max_level, "Clean")
-        draw_generic_bar(screen, honey_bar_rect, GREEN, pet_hunger_level, max_level, "Honey")
-        draw_generic_bar(screen, happy_bar_rect, YELLOW, pet_happy_level, max_level, "Happy")
-
-        # Draw Titles using loaded fonts
-        draw_text("Hive", font_large, BLACK, screen, SCREEN_WIDTH // 2, title_y, center=True) # Using "Hive" title from v3
-        draw_text(current_room_name, font_small, BLACK, screen, SCREEN_WIDTH // 2, room_name_y, center=True)
-
-        # --- Draw Bee(s) ---
-        # Store the rects returned by draw_bee
-        current_frame_bee_rects = [] # Clear rects before drawing
-        if bee_level == 1:
-            bee_rect = draw_bee(screen, pet_center_x, pet_center_y, mouse_pos)
-            current_frame_bee_rects.append(bee_rect) # Store rect
-        elif bee_level == 2:
-            bee_rect1 = draw_bee(screen, pet_center_x - bee_spacing_offset, pet_center_y, mouse_pos)
-            bee_rect2 = draw_bee(screen, pet_center_x + bee_spacing_offset, pet_center_y, mouse_pos)
-            current_frame_bee_rects.extend([bee_rect1, bee_rect2]) # Store rects
-        elif bee_level >= 3: # Draw 3 bees for level 3 and potentially beyond
-            bee_rect1 = draw_bee(screen, pet_center_x - bee_spacing_offset, pet_center_y, mouse_pos)
-            bee_rect2 = draw_bee(screen, pet_center_x, pet_center_y, mouse_pos)
-            bee_rect3 = draw_bee(screen, pet_center_x + bee_spacing_offset, pet_center_y, mouse_pos)
-            current_frame_bee_rects.extend([bee_rect1, bee_rect2, bee_rect3]) # Store rects
-
-        # --- Perform Cleaning Logic AFTER drawing bees ---
-        if current_room_name == "Bathroom":
-            is_hover_cleaning = False
-            brush_rect.center = mouse_pos # Ensure brush rect is updated
-            for bee_rect in current_frame_bee_rects: # Check collision with bees drawn THIS frame
+            self.draw_pixels(surface, xs, ys, looks)
+        max_radius = int(self.look_radius.max())
+        left, top = int(xs.min()) - max_radius, int(ys.min()) - max_radius
+        self.drawn_rect = pygame.Rect(left, top, int(xs.max()) + max_radius + 1 - left,
+                                      int(ys.max()) + max_radius + 1 - top).clip(surface.get_rect())
+        mark_dirty(self.drawn_rect)
+
+    def draw_sprites(self, surface, xs, ys, looks):
+        if self.sprites is None:
+            self.sprites = [build_particle_sprite(shape, color, radius, 255 * (PARTICLE_FADE_STEPS - step) // PARTICLE_FADE_STEPS)
+                            for shape, color, radius in PARTICLE_LOOKS for step in range(PARTICLE_FADE_STEPS)]
+        live = slice(0, self.count)
+        fade_step = np.minimum(self.age[live] / self.lifetime[live] * PARTICLE_FADE_STEPS, PARTICLE_FADE_STEPS - 1).astype(np.int32)
+        radius = self.look_radius[looks]
+        sprites = self.sprites
+        positions = np.column_stack((xs - radius, ys - radius)).tolist()
+        surface.blits(zip([sprites[i] for i in (looks * PARTICLE_FADE_STEPS + fade_step).tolist()], positions), doreturn=False)
+
+    def draw_pixels(self, surface, xs, ys, looks):
+        width, height = surface.get_size()
+        on_screen = (xs >= 1) & (xs < width - 1) & (ys >= 1) & (ys < height - 1) # Every dot pixel is inside
+        xs, ys = xs[on_screen], ys[on_screen]
+        pixels = pygame.surfarray.pixels2d(surface)
+        look_pixels = np.array([surface.map_rgb(color) for _, color, _ in PARTICLE_LOOKS], dtype=pixels.dtype)
+        colors = look_pixels[looks[on_screen]]
+        for offset_x, offset_y in PARTICLE_DOT_OFFSETS:
+            pixels[xs + offset_x, ys + offset_y] = colors
+        del pixels # Unlocks the surface
+
+particle_system = ParticleSystem()
+
+def emit_particles(emitter, x, y, count, spread=0):
+    if USE_PARTICLES:
+        particle_system.emit(emitter, x, y, count, spread)
+
+# --- Pet Logic ---
+# Pet-mode state changes, kept apart from drawing so a recorded session can be
+# replayed without a window (see replay_session).
+PET_BEE_CENTERS = { # Bee level -> centers of the bees shown; 3 bees for level 3 and potentially beyond
+    1: ((pet_center_x, pet_center_y),),
+    2: ((pet_center_x - bee_spacing_offset, pet_center_y), (pet_center_x + bee_spacing_offset, pet_center_y)),
+    3: ((pet_center_x - bee_spacing_offset, pet_center_y), (pet_center_x, pet_center_y),
+        (pet_center_x + bee_spacing_offset, pet_center_y)),
+}
+pet_bee_rects = {} # Bee level -> body rects, built on first use
+
+def get_pet_bee_centers():
+    """Centers of the bees shown for the current bee level."""
+    return PET_BEE_CENTERS[min(bee_level, 3)]
+
+def get_pet_bee_rects():
+    """Body rects of the bees for the current bee level, where draw_bee draws them. Don't modify them."""
+    bee_rects = pet_bee_rects.get(min(bee_level, 3))
+    if bee_rects is None:
+        scaled_body_width, scaled_body_height, _, _ = get_bee_dimensions()
+        bee_rects = []
+        for center in get_pet_bee_centers():
+            body_rect = pygame.Rect(0, 0, scaled_body_width, scaled_body_height)
+            body_rect.center = center
+            bee_rects.append(body_rect)
+        bee_rects = pet_bee_rects[min(bee_level, 3)] = tuple(bee_rects)
+    return bee_rects
+
+def handle_pet_click(pos):
+    global current_room_name, game_mode, pet_hunger_level
+    # Room Navigation
+    for button in nav_buttons:
+        if button.hit(pos):
+            current_room_name = button.target_room
+            break
+
+    # Check for room-specific button clicks (excluding Clean button); they only hit in their room
+    if play_button.hit(pos):
+        print("Starting Flappy Game...")
+        game_mode = MODE_FLAPPY
+    elif feed_button.hit(pos):
+        pet_hunger_level = max_level # Fill honey bar completely
+        emit_particles("pollen", feed_button.rect.centerx, feed_button.rect.top, POLLEN_BURST, spread=20)
+        print(f"Fed! Honey: {int(pet_hunger_level)}")
+
+def update_pet_stats(current_time):
+    """Decreases the stats once every stat_decrease_interval ms."""
+    global pet_cleanliness_level, pet_hunger_level, pet_happy_level, last_stat_decrease_time
+    if current_time - last_stat_decrease_time > stat_decrease_interval:
+        pet_cleanliness_level = max(0, pet_cleanliness_level - cleanliness_decrease)
+        pet_hunger_level = max(0, pet_hunger_level - hunger_decrease)
+        deficit = (max_level - pet_cleanliness_level) + (max_level - pet_hunger_level)
+        happiness_decrease = max(1, deficit // happiness_deficit_step)
+        pet_happy_level = max(0, pet_happy_level - happiness_decrease)
+        last_stat_decrease_time = current_time
+
+def update_pet_cleaning(mouse_pos):
+    """Hover cleaning in the Bathroom. Returns True while the brush is over a bee."""
+    global pet_cleanliness_level
+    # --- Cleaning Logic --- (MODIFIED FOR HOVER)
+    is_hover_cleaning = False # Renamed variable for clarity
+    if current_room_name == "Bathroom": # Only check when in the bathroom
+        brush_rect.center = mouse_pos # Update brush rect position to follow mouse
+        colony = get_bee_colony()
+        if colony is not None:
+            is_hover_cleaning = colony.any_under(brush_rect) # Only checks bees in the grid cells under the brush
+        else:
+            for bee_rect in get_pet_bee_rects(): # Check collision with the bees on screen
                 if brush_rect.colliderect(bee_rect): # Check if brush cursor is over a bee
                     is_hover_cleaning = True
                     break # Stop checking once one bee is hit
 
-            if is_hover_cleaning: # Increase cleanliness if hovering over a bee
-                # Increase cleanliness gradually, ensure it doesn't exceed max
-                clean_increase_rate = 0.5 # Slower rate for hover
-                pet_cleanliness_level = min(max_level, pet_cleanliness_level + clean_increase_rate)
-                # Optional: Add a small sound effect here?
-        # --- End Cleaning Logic ---
-
-
-        # --- Draw XP Bar ---
-        if bee_level < max_bee_level:
-             draw_generic_bar(screen, xp_bar_rect, XP_BAR_COLOR, xp_current, xp_next_level)
-        else:
-             draw_generic_bar(screen, xp_bar_rect, XP_BAR_COLOR, xp_current, xp_next_level) # Will show MAX LEVEL text
-
-
-        # Draw room-specific buttons (excluding Clean button)
-        if current_room_name == "Nest":
-            pygame.draw.rect(screen, YELLOW, play_btn_rect)
-            pygame.draw.rect(screen, BLACK, play_btn_rect, 2)
-            screen.blit(play_text_surf, play_text_rect)
-        elif current_room_name == "Bathroom":
-             pass # No button to draw in the bathroom anymore
-        elif current_room_name == "Pollen Storage": # Corrected room name
-             pygame.draw.rect(screen, GREEN, feed_btn_rect) # Use Honey color
-             pygame.draw.rect(screen, BLACK, feed_btn_rect, 2)
-             screen.blit(feed_text_surf, feed_text_rect)
-
-        # Draw Room Navigation Buttons
-        nav_button_color = GRAY
-        active_nav_button_color = BUTTON_COLOR_ACTIVE
-        pygame.draw.rect(screen, active_nav_button_color if current_room_name == "Bathroom" else nav_button_color, bathroom_btn_rect)
-        pygame.draw.rect(screen, active_nav_button_color if current_room_name == "Pollen Storage" else nav_button_color, honey_storage_btn_rect) # Corrected room name
-        pygame.draw.rect(screen, active_nav_button_color if current_room_name == "Nest" else nav_button_color, nest_btn_rect)
-        # Blit the pre-rendered text surfaces
-        screen.blit(bathroom_text_surf, bathroom_text_rect)
-        screen.blit(honey_storage_text_surf, honey_storage_text_rect)
-        screen.blit(nest_text_surf, nest_text_rect)
-        pygame.draw.rect(screen, BLACK, bathroom_btn_rect, 2)
-        pygame.draw.rect(screen, BLACK, honey_storage_btn_rect, 2)
-        pygame.draw.rect(screen, BLACK, nest_btn_rect, 2)
-
-        # --- Draw Custom Cursor (Brush) ---
-        if show_custom_cursor:
-            brush_rect.center = mouse_pos # Ensure rect is centered on mouse
-            screen.blit(brush_image, brush_rect)
-        # --- End Custom Cursor Drawing ---
-
-        pygame.display.flip()
+        if is_hover_cleaning: # Increase cleanliness if hovering over a bee
+            # Increase cleanliness gradually, ensure it doesn't exceed max
+            clean_increase_rate = 0.5 # Slower rate for hover
+            pet_cleanliness_level = min(max_level, pet_cleanliness_level + clean_increase_rate)
+            emit_particles("bubbles", brush_rect.centerx, brush_rect.bottom, BUBBLES_PER_FRAME, spread=10)
+    # --- End Cleaning Logic ---
+    return is_hover_cleaning
+
+def finish_flappy_game(final_score):
+    """Applies a finished Flappy game to the pet and returns to the Nest."""
+    global xp_current, bee_level, xp_next_level, pet_happy_level, game_mode, current_room_name
+    # --- XP Gain and Level Up Logic ---
+    if final_score > 0:
+        xp_gain = final_score * 1 # 1 XP per point scored
+        print(f"Gained {xp_gain} XP!")
+        xp_current += xp_gain
+
+        # Check for level up only if not already max level
+        while bee_level < max_bee_level and xp_current >= xp_next_level:
+            xp_current -= xp_next_level # Subtract cost of level up
+            bee_level += 1
+            xp_next_level = xp_levels.get(bee_level, float('inf')) # Get XP needed for the *new* next level
+            print(f"*** LEVEL UP! Reached Bee Level {bee_level}! ***")
+            bee_centers = get_pet_bee_centers() # Confetti over the new set of bees
+            for bee_center_x, bee_center_y in bee_centers:
+                emit_particles("confetti", bee_center_x, bee_center_y, CONFETTI_BURST // len(bee_centers), spread=15)
+            if bee_level == max_bee_level:
+                print("*** Max Bee Level Reached! ***")
+                xp_current = 0 # Optional: Reset XP at max level
+                break # Exit the while loop if max level is reached
+
+    # Update happy stat
+    happy_gain = final_score * 0.5
+    pet_happy_level = min(max_level, pet_happy_level + happy_gain)
+
+    print(f"Returned to Nest. Happy +{happy_gain}")
+    print(f"Current XP: {int(xp_current)}/{int(xp_next_level) if xp_next_level != float('inf') else 'MAX'}")
+    print(f"New Stats: Clean={int(pet_cleanliness_level)}, Honey={int(pet_hunger_level)}, Happy={int(pet_happy_level)}")
+
+    game_mode = MODE_PET
+    current_room_name = "Nest" # Return to Nest after game
+
+# --- Stat Decay Fast-Forward ---
+# update_pet_stats applies one decrease per stat_decrease_interval while the game
+# runs. To catch up after the game was closed, or to jump a pet ahead for testing,
+# decay_stats computes the stats after any number of decreases without stepping
+# through them. Cleanliness and honey fall linearly until they clamp at 0, so the
+# decreases split into at most three segments in which the deficit grows linearly,
+# and each segment's sum of deficit // happiness_deficit_step is a floor sum
+# (O(log n)). Happiness itself never rises, so clamping it only at the end is exact.
+def floor_sum(n, m, a, b):
+    """Sum of (a * i + b) // m for i in range(n), for integers n, a, b >= 0 and m > 0."""
+    total = 0
+    while True:
+        if a >= m:
+            total += n * (n - 1) // 2 * (a // m)
+            a %= m
+        if b >= m:
+            total += n * (b // m)
+            b %= m
+        y_max = a * n + b
+        if y_max < m:
+            return total
+        n, b, m, a = y_max // m, y_max % m, a, m
+
+def sum_happiness_decreases(base_deficit, slope, first, end):
+    """Sum of max(1, (base_deficit + slope * k) // happiness_deficit_step) for k in range(first, end)."""
+    if end <= first:
+        return 0
+    # Exact rational arithmetic; levels are floats (e.g. 0.5 steps from cleaning)
+    deficit = fractions.Fraction(base_deficit)
+    numerator, denominator = deficit.numerator, deficit.denominator
+    # Decreases before k_full take the minimum of 1
+    if slope > 0:
+        k_full = min(max(first, math.ceil((happiness_deficit_step - deficit) / slope)), end)
+    else:
+        k_full = first if deficit >= happiness_deficit_step else end
+    total = k_full - first
+    if end > k_full:
+        total += floor_sum(end - k_full, happiness_deficit_step * denominator, slope * denominator,
+                           numerator + slope * denominator * k_full)
+    return total
+
+def decay_stats(cleanliness, hunger, happiness, decreases):
+    """The (cleanliness, hunger, happiness) reached from these levels after this many
+    update_pet_stats decreases, computed without looping over them."""
+    if decreases <= 0:
+        return cleanliness, hunger, happiness
+    # Cleanliness after decrease k is cleanliness - k * cleanliness_decrease until it hits 0 at k = clean_zero_at
+    clean_zero_at = max(1, math.ceil(cleanliness / cleanliness_decrease))
+    hunger_zero_at = max(1, math.ceil(hunger / hunger_decrease))
+    boundaries = sorted({1, min(clean_zero_at, decreases + 1), min(hunger_zero_at, decreases + 1), decreases + 1})
+    total_decrease = 0
+    for first, end in zip(boundaries, boundaries[1:]):
+        # Within a segment, deficit after decrease k = base_deficit + slope * k
+        base_deficit = 2 * max_level
+        slope = 0
+        if first < clean_zero_at:
+            base_deficit -= cleanliness
+            slope += cleanliness_decrease
+        if first < hunger_zero_at:
+            base_deficit -= hunger
+            slope += hunger_decrease
+        total_decrease += sum_happiness_decreases(base_deficit, slope, first, end)
+    return (max(0, cleanliness - decreases * cleanliness_decrease),
+            max(0, hunger - decreases * hunger_decrease),
+            max(0, happiness - total_decrease))
+
+def catch_up_pet_stats(current_time):
+    """Applies every decrease due by current_time (ms) at once. Same result as calling
+    update_pet_stats every millisecond up to current_time. Returns the number applied."""
+    global pet_cleanliness_level, pet_hunger_level, pet_happy_level, last_stat_decrease_time
+    decrease_period = stat_decrease_interval + 1 # update_pet_stats fires once more than the interval has passed
+    decreases = max(0, (current_time - last_stat_decrease_time) // decrease_period)
+    pet_cleanliness_level, pet_hunger_level, pet_happy_level = decay_stats(
+        pet_cleanliness_level, pet_hunger_level, pet_happy_level, decreases)
+    last_stat_decrease_time += decreases * decrease_period
+    return decreases
+
+def fast_forward_pet(elapsed_ms):
+    """Moves the pet's stats elapsed_ms ahead in time, e.g. fast_forward_pet(7 * DAY_MS)
+    for a week. Returns the number of stat decreases applied."""
+    global last_stat_decrease_time
+    last_stat_decrease_time -= elapsed_ms
+    return catch_up_pet_stats(pygame.time.get_ticks())
+
+DURATION_UNITS_MS = {"ms": 1, "s": 1000, "m": 60 * 1000, "h": 60 * 60 * 1000, "d": 24 * 60 * 60 * 1000, "w": 7 * 24 * 60 * 60 * 1000}
+DAY_MS = DURATION_UNITS_MS["d"]
+
+def parse_duration(text):
+    """'1w', '3d12h', '90m' or '45s' -> milliseconds."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h|d|w)", text.strip().lower())
+    if not parts or "".join(number + unit for number, unit in parts) != text.strip().lower():
+        raise argparse.ArgumentTypeError(f"invalid duration '{text}' (e.g. 1w, 3d12h, 90m)")
+    return int(sum(float(number) * DURATION_UNITS_MS[unit] for number, unit in parts))
+
+def format_duration(ms):
+    """Milliseconds -> e.g. '3d 4h 5m 6s'."""
+    seconds = ms // 1000
+    parts = [(seconds // 86400, "d"), (seconds // 3600 % 24, "h"), (seconds // 60 % 60, "m"), (seconds % 60, "s")]
+    return " ".join(f"{value}{unit}" for value, unit in parts if value) or "0s"
+
+# --- Pet Scene ---
+def draw_pet_scene(surface, mouse_pos):
+    """Draws the current room (background, bars, bees and buttons, not the brush)."""
+    # Draw Honeycomb Background (blits the cached surface unless the cache is toggled off)
+    draw_background(surface)
+    frame_profiler.mark("background")
+
+    # Draw Status Bars and Titles (cached widgets, re-rendered only when they change)
+    for widget in scene_top_widgets:
+        widget.draw(surface)
+    frame_profiler.mark("bars")
+
+    # --- Draw Bee(s) ---
+    # Hit tests use get_pet_bee_rects, or the colony's spatial hash in colony mode
+    colony = get_bee_colony()
+    if colony is not None:
+        colony.draw(surface)
+    else:
+        for bee_center_x, bee_center_y in get_pet_bee_centers():
+            draw_bee(surface, bee_center_x, bee_center_y, mouse_pos)
+    frame_profiler.mark("bees")
+
+    # --- Draw XP Bar ---
+    xp_bar.draw(surface) # Shows MAX LEVEL text at the top level
+
+    # Draw room-specific buttons (each is only shown in its room) and Room Navigation Buttons
+    for button in scene_buttons:
+        button.draw(surface)
+    frame_profiler.mark("buttons")
+
+# --- Frame Profiler ---
+# buzz_profiler.FrameProfiler times the phases of each frame, marked lap-style:
+# frame_profiler.mark("bars") charges the time since the previous mark to "bars".
+# F3 shows/hides an overlay with rolling p50/p95/p99 per phase, F4 starts/stops
+# recording every frame to a CSV file.
+PROFILER_OVERLAY_KEY = pygame.K_F3
+PROFILER_CSV_KEY = pygame.K_F4
+
+frame_profiler = FrameProfiler(lambda: get_font("overlay"))
+
+def draw_profiler_overlay(surface):
+    overlay_rect = frame_profiler.draw_overlay(surface)
+    if overlay_rect is not None:
+        mark_dirty(overlay_rect)
+
+# --- Allocation Tracker ---
+# buzz_alloc.AllocationTracker counts what each frame allocates from this file, by
+# source line, plus the GC objects per frame, the peak traced memory and every GC
+# run. F5 (or --track-allocations) starts tracking; F5 again, or quitting, prints
+# the report. Tracing slows every allocation, so ignore F3's timings meanwhile.
+ALLOC_TRACKER_KEY = pygame.K_F5
+
+allocation_tracker = AllocationTracker(__file__)
+
+def handle_profiler_event(event):
+    """Handles the profiler hotkeys. Returns True if the event was one of them."""
+    if event.type != pygame.KEYDOWN:
+        return False
+    if event.key == PROFILER_OVERLAY_KEY:
+        frame_profiler.toggle_overlay()
+        request_full_redraw() # Clear the overlay or draw it over a fresh screen
+        return True
+    if event.key == PROFILER_CSV_KEY:
+        frame_profiler.toggle_recording()
+        return True
+    if event.key == ALLOC_TRACKER_KEY:
+        allocation_tracker.toggle()
+        return True
+    return False
+
+def open_scaled_window(args):
+    """Opens the window for --window/--fullscreen; the game draws into an offscreen logical frame."""
+    global screen, window_scale_filter, SPRITE_DETAIL
+    if args.fullscreen:
+        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        try:
+            window_size = tuple(int(part) for part in args.window.lower().split("x"))
+        except ValueError:
+            window_size = ()
+        if len(window_size) != 2 or min(window_size) <= 0:
+            raise SystemExit(f"--window expects WIDTHxHEIGHT, e.g. 800x1200, not '{args.window}'")
+        pygame.display.set_mode(window_size, pygame.RESIZABLE)
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    window_scale_filter = args.scaling
+    update_present_rect()
+    if args.hidpi:
+        SPRITE_DETAIL = max(1, math.ceil(present_rect.width / SCREEN_WIDTH))
 
-    # --- Run Flappy Game Mode ---
-    elif game_mode == MODE_FLAPPY:
-        # --- Ensure default cursor is visible before starting game ---
-        if show_custom_cursor:
-            pygame.mouse.set_visible(True)
-            show_custom_cursor = False
-        # ---
-
-        final_score = run_flappy_game(screen, clock) # Call the modified function
-
-        # --- XP Gain and Level Up Logic ---
-        if final_score > 0:
-            xp_gain = final_score * 1 # 1 XP per point scored
-            print(f"Gained {xp_gain} XP!")
-            xp_current += xp_gain
-
-            # Check for level up only if not already max level
-            while bee_level < max_bee_level and xp_current >= xp_next_level:
-                xp_current -= xp_next_level # Subtract cost of level up
-                bee_level += 1
-                xp_next_level = xp_levels.get(bee_level, float('inf')) # Get XP needed for the *new* next level
-                print(f"*** LEVEL UP! Reached Bee Level {bee_level}! ***")
-                if bee_level == max_bee_level:
-                    print("*** Max Bee Level Reached! ***")
-                    xp_current = 0 # Optional: Reset XP at max level
-                    break # Exit the while loop if max level is reached
-
-        # Update happy stat
-        happy_gain = final_score * 0.5
-        pet_happy_level = min(max_level, pet_happy_level + happy_gain)
-
-        print(f"Returned to Nest. Happy +{happy_gain}")
-        print(f"Current XP: {int(xp_current)}/{int(xp_next_level) if xp_next_level != float('inf') else 'MAX'}")
-        print(f"New Stats: Clean={int(pet_cleanliness_level)}, Honey={int(pet_hunger_level)}, Happy={int(pet_happy_level)}")
-
-        game_mode = MODE_PET
-        current_room_name = "Nest" # Return to Nest after game
-
-    clock.tick(60)
-
-# --- Cleanup ---
-pygame.quit()
-sys.exit()
+# --- Main Game Loop ---
+def main(argv=None):
+    """Sets up Pygame and the window, loads the save and runs the game until the window is closed.
+    With --replay, replays a recorded session headlessly instead and returns 1 if it didn't match."""
+    global screen, clock, startup_start_time, show_custom_cursor
+    global last_drawn_room_name, last_brush_rect
+    parser = argparse.ArgumentParser(description="BuzzBuddy virtual pet")
+    parser.add_argument("--record", metavar="PATH", help="record this session's input to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="replay a recorded session without a window and verify it")
+    parser.add_argument("--seed", type=int, help="seed for the game's random numbers (default: random)")
+    parser.add_argument("--swarm", action="store_true", help="play Flappy with four times as many flowers")
+    parser.add_argument("--window", metavar="WIDTHxHEIGHT", help="resizable window of this size, the game scaled to fit")
+    parser.add_argument("--fullscreen", action="store_true", help="fullscreen, the game scaled to fit")
+    parser.add_argument("--scaling", choices=SCALE_FILTERS, default="smooth", help="filter used when scaling (default: smooth)")
+    parser.add_argument("--hidpi", action="store_true", help="draw sprites at the window's scale and smooth them down")
+    parser.add_argument("--fast-forward", metavar="DURATION", type=parse_duration,
+                        help="jump the pet's stats ahead in time after loading, e.g. 1w, 3d12h, 90m (for testing)")
+    parser.add_argument("--track-allocations", action="store_true",
+                        help="count each frame's allocations by source line from the start (see F5)")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # Headless; the display is only needed for sprite masks
+        pygame.init()
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        mismatches = replay_session(args.replay)
+        pygame.quit()
+        return 1 if mismatches else 0
+
+    startup_start_time = time.perf_counter()
+
+    phase_start = time.perf_counter()
+    pygame.init()
+    record_startup_phase("pygame init", phase_start)
+    phase_start = time.perf_counter()
+    if args.window or args.fullscreen:
+        open_scaled_window(args)
+    else:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("BuzzBuddy Pet")
+    clock = pygame.time.Clock()
+    record_startup_phase("display", phase_start)
+    load_asset_pack()
+    start_save_state()
+    if args.fast_forward:
+        decreases = fast_forward_pet(args.fast_forward)
+        print(f"Fast-forwarded {format_duration(args.fast_forward)}: {decreases} stat decreases, Clean={int(pet_cleanliness_level)}, Honey={int(pet_hunger_level)}, Happy={int(pet_happy_level)}")
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    game_rng.seed(seed)
+    particle_system.seed(seed)
+    if args.record:
+        start_recording(args.record, seed)
+    if args.track_allocations:
+        allocation_tracker.start()
+    flappy_spawn_interval_ticks = FLAPPY_SWARM_SPAWN_INTERVAL_TICKS if args.swarm else FLAPPY_SPAWN_INTERVAL_TICKS
+
+    running = True
+    is_hover_cleaning = False
+    pending_event = None # Event that woke the idle wait, handled before the queued ones
+
+    while running:
+        frame_profiler.begin_frame("pet")
+        allocation_tracker.begin_frame("pet")
+        current_time = pygame.time.get_ticks()
+        mouse_pos = get_mouse_pos()
+
+        # --- Event Handling (Main Pet Mode) ---
+        if game_mode == MODE_PET:
+            frame_clicks = [] # Click positions, for the session recorder
+            events = pygame.event.get()
+            if pending_event is not None:
+                events.insert(0, pending_event)
+                pending_event = None
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                handle_window_event(event)
+                handle_profiler_event(event)
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    click_pos = window_to_logical(event.pos)
+                    frame_clicks.append(click_pos)
+                    handle_pet_click(click_pos)
+            if session_recorder is not None:
+                session_recorder.pet_frame(current_time, mouse_pos, frame_clicks)
+            frame_profiler.mark("events")
+
+        # --- Game Logic (Main Pet Mode) ---
+        if game_mode == MODE_PET:
+            update_pet_stats(current_time) # Decrease stats over time
+
+            # --- Cursor Visibility ---
+            if current_room_name == "Bathroom":
+                if not show_custom_cursor:
+                     pygame.mouse.set_visible(False)
+                     show_custom_cursor = True
+            else:
+                if show_custom_cursor:
+                     pygame.mouse.set_visible(True)
+                     show_custom_cursor = False
+            # --- End Cursor Visibility ---
+
+            frame_profiler.mark("logic")
+
+            # --- Drawing (Main Pet Mode) ---
+            # Room switches change most of the screen, so they always get a full flip
+            if current_room_name != last_drawn_room_name:
+                request_full_redraw()
+                last_drawn_room_name = current_room_name
+
+            draw_pet_scene(screen, mouse_pos)
+
+            # Cleaning is applied after drawing, so the bar shows it from the next frame
+            is_hover_cleaning = update_pet_cleaning(mouse_pos)
+
+            request_autosave() # Only queues a write if a saved stat or the room changed
+            frame_profiler.mark("cleaning")
+
+            # Particles go over the scene but under the brush
+            particle_system.update(current_time)
+            particle_system.draw(screen)
+            frame_profiler.mark("particles")
+
+            # --- Draw Custom Cursor (Brush) ---
+            if show_custom_cursor:
+                brush_rect.center = mouse_pos # Ensure rect is centered on mouse
+                screen.blit(get_brush_image(), brush_rect)
+                if brush_rect != last_brush_rect: # Repaint where the brush was and where it is now
+                    mark_dirty(last_brush_rect)
+                    mark_dirty(brush_rect)
+                    last_brush_rect = brush_rect.copy()
+            # --- End Custom Cursor Drawing ---
+            frame_profiler.mark("cursor")
+
+            draw_profiler_overlay(screen)
+            frame_profiler.mark("overlay")
+            present_frame()
+            frame_profiler.mark("present")
+            if not startup_reported:
+                report_startup_timings() # First frame is on screen
+
+        # --- Run Flappy Game Mode ---
+        elif game_mode == MODE_FLAPPY:
+            # --- Ensure default cursor is visible before starting game ---
+            if show_custom_cursor:
+                pygame.mouse.set_visible(True)
+                show_custom_cursor = False
+            # ---
+
+            final_score = run_flappy_game(screen, clock, flappy_spawn_interval_ticks) # Call the modified function
+            frame_profiler.cancel_frame() # The rest of this pass is not a pet frame
+            allocation_tracker.cancel_frame()
+
+            finish_flappy_game(final_score)
+            request_full_redraw() # The mini-game drew over the whole window
+            request_autosave()
+
+        # --- Idle Wait (Pet Mode) ---
+        if (USE_IDLE_WAIT and game_mode == MODE_PET and not (is_hover_cleaning and pet_cleanliness_level < max_level)
+                and not particle_system.count): # Keep animating while particles are alive
+            # Wake for input/window events, or just after the next stat decrease is due
+            next_stat_decrease_time = last_stat_decrease_time + stat_decrease_interval + 1
+            wait_ms = next_stat_decrease_time - pygame.time.get_ticks()
+            if frame_profiler.show_overlay:
+                wait_ms = min(wait_ms, PROFILER_OVERLAY_REFRESH_MS)
+            pending_event = wait_for_pet_event(wait_ms)
+
+        clock.tick(60)
+        frame_profiler.mark("idle")
+        frame_profiler.end_frame()
+        allocation_tracker.end_frame()
+
+    # --- Cleanup ---
+    if frame_profiler.csv_rows is not None:
+        frame_profiler.save_csv()
+    allocation_tracker.stop()
+    if session_recorder is not None:
+        session_recorder.close()
+    pygame.quit()
+
+if __name__ == "__main__":
+    sys.exit(main())
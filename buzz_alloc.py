@@ -0,0 +1,160 @@
+"""Per-frame allocation tracking for BuzzBuddy.
+
+Counts the memory blocks each frame allocates from one source file, by source
+line, with tracemalloc: a snapshot at the start and end of every frame, compared
+per line. Only blocks still alive at the end of the frame show up, and tuples,
+lists and floats parked on CPython's free lists count as alive, so a line that
+churns them shows about one block per frame. What causes hitches is the GC
+objects count: container objects created minus freed during the frame. The
+cyclic GC runs every 700 of those, so a frame that nets zero never triggers a
+collection. The per-frame peak of traced memory and every GC run (with its
+pause) are recorded too:
+
+    tracker = AllocationTracker(__file__)
+    tracker.start()
+    tracker.begin_frame("pet")
+    ...
+    tracker.end_frame()
+    tracker.stop() # Prints the report
+
+The tracker's own code lives in this file, so its snapshots never count.
+"""
+import gc
+import linecache
+import time
+import tracemalloc
+
+from buzz_profiler import percentile
+
+ALLOC_REPORT_SITES = 10 # Call sites listed per mode in the report
+
+
+class AllocationTracker:
+    """Tracks the allocations made by the code in source_file (the game's own file)."""
+
+    def __init__(self, source_file):
+        self.enabled = False
+        self.source_file = source_file
+        self.mode = ""
+        self.frame_start_lines = None # Line totals at the start of the frame; None when no frame is tracked
+        self.frame_start_memory = 0
+        self.gc_count_base = 0 # Generation 0 count when the frame started or the last collection ended
+        self.frame_gc_objects = 0
+        self.filters = [tracemalloc.Filter(True, source_file)] # Same name as the code objects of that file
+        self.frames = {} # mode -> tracked frame count
+        self.sites = {} # (mode, lineno) -> [blocks, bytes] allocated in tracked frames
+        self.peaks = {} # mode -> list of per-frame peak bytes above the frame's starting memory
+        self.gc_objects = {} # mode -> GC objects created minus freed in tracked frames
+        self.gc_runs = {} # mode -> list of (generation, pause in ms)
+        self.gc_start = 0
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.frame_start_lines = None
+        self.frames, self.sites, self.peaks, self.gc_objects, self.gc_runs = {}, {}, {}, {}, {}
+        tracemalloc.start()
+        gc.callbacks.append(self.on_gc)
+        print("Allocation tracker: tracking frames (press F5 again for the report)")
+
+    def stop(self):
+        """Stops tracking and prints the report."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.frame_start_lines = None
+        gc.callbacks.remove(self.on_gc)
+        tracemalloc.stop()
+        self.print_report()
+
+    def toggle(self):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+            self.frame_gc_objects += gc.get_count()[0] - self.gc_count_base
+        else:
+            self.gc_count_base = gc.get_count()[0]
+            if self.frame_start_lines is not None:
+                self.gc_runs.setdefault(self.mode, []).append((info["generation"], (time.perf_counter() - self.gc_start) * 1000))
+
+    def line_totals(self):
+        """Returns ({lineno: blocks}, {lineno: bytes}) of the traced memory allocated by source_file.
+
+        Dicts of ints are invisible to the cyclic GC, and the snapshot's own objects
+        are created and freed with the GC paused, so tracking neither triggers
+        collections nor shows up in the GC objects count."""
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+        blocks, sizes = {}, {}
+        stat = None # Frames that allocated nothing have no statistics
+        for stat in snapshot.statistics("lineno"):
+            lineno = stat.traceback[0].lineno
+            blocks[lineno] = stat.count
+            sizes[lineno] = stat.size
+        del snapshot, stat
+        if gc_was_enabled:
+            gc.enable()
+        return blocks, sizes
+
+    def begin_frame(self, mode):
+        if not self.enabled:
+            return
+        self.mode = mode
+        self.frame_start_lines = self.line_totals()
+        self.frame_start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.frame_gc_objects = 0
+        self.gc_count_base = gc.get_count()[0]
+
+    def cancel_frame(self):
+        """Drops the frame being tracked (e.g. one interrupted by the mini-game)."""
+        self.frame_start_lines = None
+
+    def end_frame(self):
+        if self.frame_start_lines is None:
+            return
+        gc_objects = self.frame_gc_objects + gc.get_count()[0] - self.gc_count_base
+        peak = tracemalloc.get_traced_memory()[1] - self.frame_start_memory
+        (start_blocks, start_sizes), self.frame_start_lines = self.frame_start_lines, None
+        blocks, sizes = self.line_totals()
+        for lineno, count in blocks.items():
+            if count > start_blocks.get(lineno, 0):
+                site = self.sites.setdefault((self.mode, lineno), [0, 0])
+                site[0] += count - start_blocks.get(lineno, 0)
+                site[1] += max(0, sizes[lineno] - start_sizes.get(lineno, 0))
+        self.frames[self.mode] = self.frames.get(self.mode, 0) + 1
+        self.peaks.setdefault(self.mode, []).append(peak)
+        self.gc_objects[self.mode] = self.gc_objects.get(self.mode, 0) + gc_objects
+
+    def report_lines(self):
+        lines = []
+        for mode, frames in self.frames.items():
+            sites = sorted(((blocks, size, lineno) for (site_mode, lineno), (blocks, size) in self.sites.items()
+                            if site_mode == mode), reverse=True)
+            total_blocks = sum(site[0] for site in sites)
+            total_bytes = sum(site[1] for site in sites)
+            peaks = sorted(self.peaks[mode])
+            gc_runs = self.gc_runs.get(mode, [])
+            lines.append(f"{mode}: {frames} frames, per frame {total_blocks / frames:.2f} blocks ({total_bytes / frames:.0f} B), "
+                         f"{self.gc_objects[mode] / frames:.2f} GC objects, "
+                         f"peak above start p50 {percentile(peaks, 0.50) / 1024:.1f} KB, max {peaks[-1] / 1024:.1f} KB, "
+                         f"{len(gc_runs)} GC runs" + (f" (max pause {max(pause for _, pause in gc_runs):.2f} ms)" if gc_runs else ""))
+            for blocks, size, lineno in sites[:ALLOC_REPORT_SITES]:
+                source = linecache.getline(self.source_file, lineno).strip()
+                lines.append(f"  line {lineno:>5}: {blocks / frames:7.2f} blocks {size / frames:8.0f} B  {source[:60]}")
+        return lines
+
+    def print_report(self):
+        if not self.frames:
+            print("Allocation tracker: no frames tracked")
+            return
+        print("Allocation tracker: blocks still alive at the end of the frame that allocated them")
+        for line in self.report_lines():
+            print(line)
@@ -0,0 +1,111 @@
+"""BuzzBuddy asset packs.
+
+buzz_bake.py pre-renders the fixed UI strings (whole, per font size) and the
+brush, bee and flower sprites into one file. The game memory-maps it and wraps
+the pixel data as surfaces without decoding anything:
+
+    pack = AssetPack(path)
+    font = pack.get_font("small", font_path)
+    surface, origin = pack.get_sprite("brush")
+
+The header holds CRC32s of the TTF the pack was baked from and of the settings
+and drawing code the sprites come from, which the game checks before using it.
+  header: magic, version, TTF CRC32, recipe CRC32, index offset, index size
+  pixel data: 8-bit coverage masks (text) and RGBA sprites, each 16-byte aligned
+  index: JSON, names -> offsets, sizes and metrics
+"""
+import json
+import mmap
+import struct
+
+import numpy as np
+import pygame
+
+ASSET_PACK_MAGIC = b"BZAP"
+ASSET_PACK_VERSION = 2
+ASSET_PACK_HEADER = struct.Struct("<4sHIIII")
+
+
+class BakedFont:
+    """Stands in for a pygame Font (render, size, get_linesize, get_height). Strings
+    baked into the asset pack come from there; anything else is rendered by the real
+    font at font_path, loaded the first time such a string is drawn."""
+
+    def __init__(self, name, entry, pack, font_path):
+        self.name = name
+        self.font_path = font_path
+        self.height, self.linesize = entry["metrics"]
+        self.texts = {text: pack.get_mask(*info) for text, info in entry["texts"].items()}
+        self.size_in_pack = entry["size"]
+        self.source_font = None
+
+    def get_source_font(self):
+        if self.source_font is None:
+            self.source_font = pygame.font.Font(self.font_path, self.size_in_pack)
+        return self.source_font
+
+    def size(self, text):
+        mask = self.texts.get(text)
+        if mask is None:
+            return self.get_source_font().size(text)
+        height, width = mask.shape
+        return (width, height)
+
+    def render(self, text, antialias, color, background=None):
+        mask = self.texts.get(text)
+        if mask is None or background is not None:
+            return self.get_source_font().render(text, antialias, color, background)
+        # Same result as FreeType's blended rendering: the text color everywhere, coverage as alpha
+        height, width = mask.shape
+        text_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        text_surf.fill((*color[:3], 0))
+        alpha = pygame.surfarray.pixels_alpha(text_surf)
+        alpha[:] = mask.T
+        del alpha # Unlocks the surface
+        return text_surf
+
+    def get_linesize(self):
+        return self.linesize
+
+    def get_height(self):
+        return self.height
+
+
+class AssetPack:
+    """A memory-mapped asset pack. Raises ValueError if the file is not a valid pack."""
+
+    def __init__(self, path):
+        with open(path, "rb") as pack_file:
+            self.data = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.ttf_crc, self.recipe_crc, index_offset, index_size = ASSET_PACK_HEADER.unpack_from(self.data)
+        if magic != ASSET_PACK_MAGIC or version != ASSET_PACK_VERSION:
+            raise ValueError(f"not a BuzzBuddy asset pack (version {version})")
+        self.index = json.loads(bytes(self.data[index_offset:index_offset + index_size]))
+        self.sprites = {}
+
+    def get_mask(self, offset, width, height):
+        """A (height, width) uint8 view of a coverage mask in the mapped file."""
+        return np.frombuffer(self.data, np.uint8, width * height, offset).reshape(height, width)
+
+    def get_font(self, name, font_path):
+        """A BakedFont for a FONT_SIZES name, or None if the pack doesn't have it.
+        font_path is the TTF the pack was baked from, for text that isn't baked."""
+        entry = self.index["fonts"].get(name)
+        return BakedFont(name, entry, self, font_path) if entry is not None else None
+
+    def get_sprite(self, key):
+        """Returns (surface, origin) for a baked sprite, or None if the pack doesn't have it."""
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            entry = self.index["sprites"].get(key)
+            if entry is None:
+                return None
+            width, height = entry["size"]
+            pixels = pygame.image.frombuffer(self.data[entry["offset"]:entry["offset"] + width * height * 4], (width, height), "RGBA")
+            if entry["colorkey"] is not None: # Opaque, colorkeyed like build_flower_atlas makes them
+                surface = pixels.convert()
+                surface.set_colorkey(entry["colorkey"], pygame.RLEACCEL)
+            else:
+                surface = pixels.convert_alpha() # Copies the pixels into the display format, nothing to decode
+            sprite = self.sprites[key] = (surface, tuple(entry["origin"]))
+        return sprite
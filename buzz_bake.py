@@ -0,0 +1,141 @@
+"""Bakes BuzzBuddy's fonts and sprites into an asset pack.
+
+Renders everything the game would otherwise rasterize at startup into one
+file next to the game (buzzbuddy_assets.pack), which the game memory-maps:
+
+    python buzz_bake.py            # bake (or re-bake) the pack
+    python buzz_bake.py --check    # exit with 1 if the pack is missing or out of date
+
+For each font size in FONT_SIZES the pack holds the fixed UI strings from
+BAKED_TEXTS, rendered whole; the game renders any other text with the TTF.
+Sprites are the brush, the bee at each scale
+the game draws and the flower heads, exactly as the game renders them.
+
+The pack records the CRC32 of the TTF and of the settings and drawing code the
+sprites come from, and the game ignores it once either changes, so re-bake
+after changing the font, sizes, colors or drawing code.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+
+import pygame
+
+import BuzzBuddy_vrs3 as game
+from buzz_assets import ASSET_PACK_HEADER, ASSET_PACK_MAGIC, ASSET_PACK_VERSION, AssetPack
+
+ALIGN = 16 # Pixel data offsets are aligned to this many bytes
+
+
+class PackWriter:
+    def __init__(self):
+        self.data = bytearray(ASSET_PACK_HEADER.size)
+
+    def add(self, pixels):
+        """Appends pixel bytes and returns their offset."""
+        self.data += bytes(-len(self.data) % ALIGN)
+        offset = len(self.data)
+        self.data += pixels
+        return offset
+
+    def add_mask(self, text_surf):
+        """Appends the alpha (coverage) of a white text surface. Returns [offset, width, height]."""
+        mask = pygame.surfarray.array_alpha(text_surf).T # (height, width), row by row
+        return [self.add(mask.tobytes()), text_surf.get_width(), text_surf.get_height()]
+
+    def add_sprite(self, sprite, origin):
+        colorkey = sprite.get_colorkey()
+        return {
+            "offset": self.add(pygame.image.tobytes(sprite, "RGBA")),
+            "size": list(sprite.get_size()),
+            "origin": list(origin),
+            "colorkey": list(colorkey[:3]) if colorkey is not None else None,
+        }
+
+
+def bake_font(writer, name):
+    size = game.FONT_SIZES[name][0]
+    font = pygame.font.Font(game.get_font_path(), size)
+    texts = {text: writer.add_mask(font.render(text, True, game.WHITE)) for text in game.BAKED_TEXTS[name]}
+    return {"size": size, "metrics": [font.get_height(), font.get_linesize()], "texts": texts}
+
+
+def bake(path):
+    """Writes the asset pack to path and returns its size in bytes."""
+    font_path = game.get_font_path()
+    if not os.path.exists(font_path):
+        raise SystemExit(f"Font '{game.FONT_NAME}' not found next to the game, nothing to bake")
+    writer = PackWriter()
+    index = {"fonts": {}, "sprites": {}}
+    for name in game.FONT_SIZES:
+        index["fonts"][name] = bake_font(writer, name)
+    index["sprites"]["brush"] = writer.add_sprite(game.get_brush_image(), (0, 0))
+    for scale in game.get_baked_bee_scales():
+        index["sprites"][f"bee:{scale}"] = writer.add_sprite(*game.get_bee_sprite(scale, detail=1))
+    for color_index, (sprite, origin) in enumerate(game.build_flower_atlas(detail=1)):
+        index["sprites"][f"flower:{color_index}"] = writer.add_sprite(sprite, origin)
+
+    index_bytes = json.dumps(index, separators=(",", ":")).encode()
+    index_offset = len(writer.data)
+    writer.data += index_bytes
+    ASSET_PACK_HEADER.pack_into(writer.data, 0, ASSET_PACK_MAGIC, ASSET_PACK_VERSION,
+                                game.get_ttf_crc(), game.get_asset_recipe_crc(), index_offset, len(index_bytes))
+    game.write_save_file(path, bytes(writer.data)) # Temp file + rename, so the game never maps a half-written pack
+    return len(writer.data)
+
+
+def check(path):
+    """Returns None if the pack is up to date, otherwise why not."""
+    if not os.path.exists(path):
+        return "missing"
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError) as e:
+        return f"unreadable ({e})"
+    if pack.ttf_crc != game.get_ttf_crc():
+        return "the font file changed"
+    if pack.recipe_crc != game.get_asset_recipe_crc():
+        return "sizes, colors or drawing code changed"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake BuzzBuddy's fonts and sprites into an asset pack.")
+    parser.add_argument("--out", default=game.ASSET_PACK_FILE, help="pack file to write")
+    parser.add_argument("--check", action="store_true", help="only check whether the pack is up to date")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    pygame.display.set_mode((1, 1)) # Sprites are converted to the display format
+    if args.check:
+        problem = check(args.out)
+        print(f"{args.out}: " + (f"out of date, {problem}" if problem else "up to date"))
+        pygame.quit()
+        return 1 if problem else 0
+
+    bake_start = time.perf_counter()
+    size = bake(args.out)
+    bake_ms = (time.perf_counter() - bake_start) * 1000
+    print(f"Baked {args.out} ({size / 1024:.0f} KiB) in {bake_ms:.0f} ms")
+
+    # What a cold start saves: mapping the pack and wrapping every asset vs. rendering them
+    load_start = time.perf_counter()
+    game.load_asset_pack(args.out)
+    for name in game.FONT_SIZES:
+        game.asset_pack.get_font(name, game.get_font_path())
+    for key in game.asset_pack.index["sprites"]:
+        game.asset_pack.get_sprite(key)
+    load_ms = (time.perf_counter() - load_start) * 1000
+    print(f"Loading every asset from the pack takes {load_ms:.1f} ms (baking renders them in {bake_ms:.0f} ms)")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Headless rendering benchmarks for BuzzBuddy.
+
+Runs the game's drawing code under SDL's dummy video driver (no window needed)
+and reports the median time per call of each benchmark. Results can be written
+as JSON and compared against stored baselines, so a rendering change can be
+shown to make things faster or slower.
+
+    python buzz_bench.py                                  # run everything, print a table
+    python buzz_bench.py --filter pet_frame               # only benchmarks whose name contains this
+    python buzz_bench.py --json results.json              # also write the results as JSON
+    python buzz_bench.py --compare bench_baseline.json    # exit with 1 if anything regressed
+    python buzz_bench.py --save-baseline bench_baseline.json
+
+A benchmark regresses when its median is more than its tolerance (a fraction,
+e.g. 0.35 = 35%) slower than the baseline. Baselines depend on the machine, so
+none is checked in: save your own (bench_baseline.json is git-ignored) before
+comparing.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import BuzzBuddy_vrs3 as game
+
+DEFAULT_TOLERANCE = 0.35
+DEFAULT_ROUNDS = 7
+DEFAULT_ROUND_TIME = 0.05 # Seconds; calls per round are doubled until a round takes this long
+
+# --- Benchmarks ---
+# Each setup function gets the display surface and returns the function to time.
+# Drawing happens on the display surface, like in the game; every benchmark runs
+# once before timing, so caches (sprites, text, background) start warm.
+
+def setup_draw_bee(scale):
+    def setup(surface):
+        mouse_pos = (game.pet_center_x + 40, game.pet_center_y - 30)
+        def run():
+            game.draw_bee(surface, game.pet_center_x, game.pet_center_y, mouse_pos, scale=scale)
+        return run
+    return setup
+
+def setup_draw_hexagon(surface):
+    def run():
+        game.draw_hexagon(surface, game.HONEYCOMB_FILL, game.HONEYCOMB_OUTLINE,
+                          game.SCREEN_WIDTH // 2, game.SCREEN_HEIGHT // 2, game.HEX_RADIUS)
+    return run
+
+def setup_draw_honeycomb(surface):
+    def run():
+        game.draw_honeycomb(surface)
+    return run
+
+def setup_draw_background(surface):
+    def run():
+        game.draw_background(surface)
+    return run
+
+def setup_draw_generic_bar(surface):
+    levels = [10, 40, 75, 100] # Changing levels, so the bar is not served from any cache
+    state = {"i": 0}
+    def run():
+        state["i"] += 1
+        level = levels[state["i"] % len(levels)]
+        game.draw_generic_bar(surface, game.honey_bar_rect, game.GREEN, level, game.max_level, "Honey")
+    return run
+
+def setup_draw_text(surface):
+    font = game.get_font("medium")
+    def run():
+        game.draw_text("Bathroom", font, game.BLACK, surface, game.SCREEN_WIDTH // 2, 300, center=True)
+    return run
+
+def setup_pet_frame(room):
+    def setup(surface):
+        game.current_room_name = room
+        game.request_full_redraw()
+        mouse_pos = (game.pet_center_x, game.pet_center_y)
+        def run():
+            game.draw_pet_scene(surface, mouse_pos)
+            if room == "Bathroom": # The brush follows the mouse here
+                game.brush_rect.center = mouse_pos
+                surface.blit(game.get_brush_image(), game.brush_rect)
+            game.present_frame()
+        return run
+    return setup
+
+def setup_flappy_frame(num_flowers):
+    def setup(surface):
+        rng = random.Random(num_flowers)
+        flower_pool = game.FlowerPool(max(1, num_flowers))
+        for i in range(num_flowers): # Spread evenly across the screen, oldest on the left
+            gap_top_y = rng.randint(game.FLOWER_HEAD_RADIUS + 50, game.SCREEN_HEIGHT - game.FLOWER_HEAD_RADIUS - 50 - game.FLOWER_GAP)
+            flower_pool.spawn(i * game.SCREEN_WIDTH // num_flowers, gap_top_y, i % len(game.FLOWER_PETAL_COLORS))
+        flower_atlas = game.build_flower_atlas()
+        score_font = game.get_font("game_score")
+        state = {"scroll_x": 0}
+        def run():
+            state["scroll_x"] += game.OBSTACLE_SPEED # The world moves like in the game, so the background scrolls
+            game.draw_flappy_world(surface, flower_pool, flower_atlas, 1, state["scroll_x"])
+            game.draw_bee(surface, game.SCREEN_WIDTH // 4, game.SCREEN_HEIGHT // 2, (0, 0), scale=game.FLAPPY_BEE_SCALE)
+            game.draw_number_text("Score: ", 12, score_font, game.WHITE, surface, game.SCREEN_WIDTH // 2, 50, center=True)
+            pygame.display.flip()
+        return run
+    return setup
+
+def setup_flappy_background(surface):
+    state = {"scroll_x": 0}
+    def run():
+        state["scroll_x"] += game.OBSTACLE_SPEED
+        if game.USE_PARALLAX_BACKGROUND:
+            game.get_parallax_background(surface.get_size()).draw(surface, state["scroll_x"])
+        else:
+            surface.fill(game.LIGHT_BLUE)
+    return run
+
+def setup_particles(count):
+    def setup(surface):
+        particles = game.ParticleSystem(capacity=count, seed=0)
+        state = {"time": 0}
+        def run():
+            # A steady population: top up what died, then one frame of update and draw
+            particles.emit("confetti", game.SCREEN_WIDTH // 2, game.SCREEN_HEIGHT // 2, count - particles.count, spread=150)
+            state["time"] += 16
+            particles.update(state["time"])
+            particles.draw(surface)
+        return run
+    return setup
+
+def setup_colony_draw(surface):
+    colony = game.get_bee_colony()
+    def run():
+        colony.draw(surface)
+    return run
+
+def setup_colony_brush(surface):
+    colony = game.get_bee_colony()
+    brush = game.brush_rect.copy()
+    positions = [tuple(center) for center in colony.centers[::max(1, colony.size // 64)].tolist()] # Brush over a spread of bees
+    state = {"i": 0}
+    def run():
+        state["i"] += 1
+        brush.center = positions[state["i"] % len(positions)]
+        colony.any_under(brush)
+    return run
+
+def setup_scaled_present(size):
+    def setup(surface):
+        # Scale the frame into an offscreen stand-in for the window's present area
+        game.screen = surface
+        game.present_rect = pygame.Rect((0, 0), size)
+        game.present_surface = pygame.Surface(size).convert()
+        game.draw_background(surface)
+        def run():
+            game.scale_frame_to_window()
+        return run
+    return setup
+
+# (name, setup, game settings overridden while the benchmark runs)
+BENCHMARKS = [
+    ("draw_bee[1.0]", setup_draw_bee(1.0), {}),
+    (f"draw_bee[{game.FLAPPY_BEE_SCALE}]", setup_draw_bee(game.FLAPPY_BEE_SCALE), {}),
+    ("draw_bee[1.0]_uncached", setup_draw_bee(1.0), {"USE_BEE_SPRITE_CACHE": False}),
+    ("draw_hexagon", setup_draw_hexagon, {}),
+    ("draw_honeycomb", setup_draw_honeycomb, {}),
+    ("draw_background", setup_draw_background, {}),
+    ("draw_generic_bar", setup_draw_generic_bar, {}),
+    ("draw_text", setup_draw_text, {}),
+    ("draw_text_uncached", setup_draw_text, {"USE_TEXT_CACHE": False}),
+    ("pet_frame[Nest]", setup_pet_frame("Nest"), {}),
+    ("pet_frame[Bathroom]", setup_pet_frame("Bathroom"), {}),
+    ("pet_frame[Pollen Storage]", setup_pet_frame("Pollen Storage"), {}),
+    ("pet_frame[Nest]_uncached_widgets", setup_pet_frame("Nest"), {"USE_WIDGET_CACHE": False}),
+    ("flappy_frame[0]", setup_flappy_frame(0), {}),
+    ("flappy_frame[5]", setup_flappy_frame(5), {}),
+    ("flappy_frame[20]", setup_flappy_frame(20), {}),
+    ("flappy_frame[5]_flat", setup_flappy_frame(5), {"USE_PARALLAX_BACKGROUND": False}),
+    ("flappy_background", setup_flappy_background, {}),
+    ("flappy_background_flat", setup_flappy_background, {"USE_PARALLAX_BACKGROUND": False}),
+    ("particles[1000]", setup_particles(1000), {}), # Fading sprites
+    ("particles[20000]", setup_particles(20000), {}), # surfarray dots
+    ("particles[50000]", setup_particles(50000), {}),
+    ("colony_draw[1000]", setup_colony_draw, {"COLONY_SIZE": 1000}),
+    ("colony_brush[1000]", setup_colony_brush, {"COLONY_SIZE": 1000}),
+    ("colony_brush[5000]", setup_colony_brush, {"COLONY_SIZE": 5000}),
+    ("pet_frame[Bathroom, colony 1000]", setup_pet_frame("Bathroom"), {"COLONY_SIZE": 1000}),
+    # The scaled present for --window; screen/present_* are set by the setup and restored afterwards
+    ("scaled_present[800x1200, smooth]", setup_scaled_present((800, 1200)),
+     {"window_scale_filter": "smooth", "screen": None, "present_rect": None, "present_surface": None}),
+    ("scaled_present[800x1200, nearest]", setup_scaled_present((800, 1200)),
+     {"window_scale_filter": "nearest", "screen": None, "present_rect": None, "present_surface": None}),
+    ("scaled_present[1440x2160, smooth]", setup_scaled_present((1440, 2160)),
+     {"window_scale_filter": "smooth", "screen": None, "present_rect": None, "present_surface": None}),
+]
+
+# --- Timing ---
+def time_calls(run, number):
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        run()
+    return time.perf_counter_ns() - start
+
+def measure(run, rounds=DEFAULT_ROUNDS, round_time=DEFAULT_ROUND_TIME):
+    """Times run() and returns its per-call stats in microseconds."""
+    run() # Warm up caches
+    number = 1
+    while time_calls(run, number) < round_time * 1e9 and number < 1 << 20:
+        number *= 2
+    samples = [time_calls(run, number) / number / 1000 for _ in range(rounds)]
+    median = statistics.median(samples)
+    return {
+        "us_per_call": round(median, 3),
+        "min_us": round(min(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if rounds > 1 else 0.0,
+        "calls_per_s": round(1e6 / median, 1),
+        "calls_per_round": number,
+        "rounds": rounds,
+    }
+
+def run_benchmarks(name_filter="", rounds=DEFAULT_ROUNDS, round_time=DEFAULT_ROUND_TIME):
+    os.chdir(os.path.dirname(os.path.abspath(game.__file__))) # The game loads its font from its own folder
+    pygame.init()
+    surface = pygame.display.set_mode((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+    results = {}
+    for name, setup, overrides in BENCHMARKS:
+        if name_filter not in name:
+            continue
+        saved = {key: getattr(game, key) for key in overrides}
+        saved["current_room_name"] = game.current_room_name
+        try:
+            for key, value in overrides.items():
+                setattr(game, key, value)
+            results[name] = measure(setup(surface), rounds, round_time)
+        finally:
+            for key, value in saved.items():
+                setattr(game, key, value)
+        print(f"{name:<34} {results[name]['us_per_call']:>10.1f} us  ({results[name]['calls_per_s']:,.0f}/s)")
+    pygame.quit()
+    return results
+
+# --- Baselines ---
+def describe_environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "video_driver": os.environ.get("SDL_VIDEODRIVER", ""),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def make_baseline(results, tolerance=DEFAULT_TOLERANCE):
+    return {
+        "environment": describe_environment(),
+        "default_tolerance": tolerance,
+        "benchmarks": {name: {"us_per_call": stats["us_per_call"]} for name, stats in results.items()},
+    }
+
+def compare_to_baseline(results, baseline):
+    """Returns [(name, status, current_us, baseline_us, change)]; status is
+    "regression", "improvement", "ok" or "new" (not in the baseline)."""
+    default_tolerance = baseline.get("default_tolerance", DEFAULT_TOLERANCE)
+    comparison = []
+    for name, stats in results.items():
+        entry = baseline["benchmarks"].get(name)
+        if entry is None:
+            comparison.append((name, "new", stats["us_per_call"], None, None))
+            continue
+        tolerance = entry.get("tolerance", default_tolerance)
+        change = stats["us_per_call"] / entry["us_per_call"] - 1
+        if change > tolerance:
+            status = "regression"
+        elif change < -tolerance:
+            status = "improvement"
+        else:
+            status = "ok"
+        comparison.append((name, status, stats["us_per_call"], entry["us_per_call"], change))
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless BuzzBuddy rendering benchmarks.")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--round-time", type=float, default=DEFAULT_ROUND_TIME, help="seconds per timed round")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline file, exit 1 on a regression")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="default tolerance for --save-baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, args.rounds, args.round_time)
+    report = {"environment": describe_environment(), "results": results}
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparison = compare_to_baseline(results, baseline)
+        report["comparison"] = [
+            {"name": name, "status": status, "us_per_call": current, "baseline_us": base, "change": None if change is None else round(change, 4)}
+            for name, status, current, base, change in comparison
+        ]
+        print()
+        for name, status, current, base, change in comparison:
+            if base is None:
+                print(f"{name:<34} {'new':>11}")
+            else:
+                print(f"{name:<34} {change:+10.1%}  {status}")
+        regressions = [name for name, status, _, _, _ in comparison if status == "regression"]
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            exit_code = 1
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(make_baseline(results, args.tolerance), f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.save_baseline}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
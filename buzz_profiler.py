@@ -0,0 +1,170 @@
+"""Frame phase timing for BuzzBuddy.
+
+Times named phases of each frame with perf_counter_ns. Phases are marked lap-style:
+profiler.mark("bars") charges the time since the previous mark to "bars", so a
+phase is whatever ran between two marks:
+
+    profiler = FrameProfiler(lambda: get_font("overlay"))
+    profiler.begin_frame("pet")
+    ...
+    profiler.mark("bars")
+    ...
+    profiler.end_frame()
+
+The overlay shows rolling p50/p95/p99 per phase, and recording writes every frame
+to a CSV file. While both are off every call returns after a single attribute check.
+BuzzBuddy_vrs3.py toggles them with F3 and F4.
+"""
+import collections
+import csv
+import math
+import os
+import time
+
+import pygame
+
+PROFILER_WINDOW = 300 # Frames kept per phase for the rolling percentiles
+PROFILER_OVERLAY_REFRESH_MS = 500 # How often the overlay text is re-rendered
+PROFILER_CSV_DIR = os.path.dirname(os.path.abspath(__file__))
+OVERLAY_TEXT_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """get_overlay_font returns the overlay's font; it is only called once the overlay
+    is first shown, so a hidden overlay loads nothing."""
+
+    def __init__(self, get_overlay_font, window=PROFILER_WINDOW):
+        self.get_overlay_font = get_overlay_font
+        self.enabled = False # True while the overlay is shown or a CSV is being recorded
+        self.show_overlay = False
+        self.window = window
+        self.history = {} # (mode, phase) -> deque of recent times in ms; phase "frame" is the whole frame
+        self.phase_order = {} # mode -> phase names in the order they were first marked
+        self.current = {} # phase -> ns spent in the frame being timed
+        self.mode = ""
+        self.frame_start = None # None when no frame is being timed
+        self.last_mark = 0
+        self.frame_index = 0
+        self.csv_rows = None # List of per-frame rows while recording
+        self.csv_columns = []
+        self.overlay_surf = None
+        self.overlay_built_at = 0
+
+    def update_enabled(self):
+        self.enabled = self.show_overlay or self.csv_rows is not None
+        self.frame_start = None # A frame already under way is only partly timed, skip it
+
+    def begin_frame(self, mode):
+        if not self.enabled:
+            return
+        self.mode = mode
+        self.current = {}
+        self.frame_start = self.last_mark = time.perf_counter_ns()
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last_mark
+        self.last_mark = now
+
+    def cancel_frame(self):
+        """Drops the frame being timed (e.g. one interrupted by the mini-game)."""
+        self.frame_start = None
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        frame_ns = time.perf_counter_ns() - self.frame_start
+        self.frame_start = None
+        self.current["frame"] = frame_ns
+        order = self.phase_order.setdefault(self.mode, [])
+        for phase, ns in self.current.items():
+            key = (self.mode, phase)
+            history = self.history.get(key)
+            if history is None:
+                history = self.history[key] = collections.deque(maxlen=self.window)
+                if phase != "frame":
+                    order.append(phase)
+            history.append(ns / 1e6)
+        if self.csv_rows is not None:
+            row = {"frame": self.frame_index, "mode": self.mode}
+            for phase, ns in self.current.items():
+                column = phase + "_ms"
+                if phase != "frame" and column not in self.csv_columns:
+                    self.csv_columns.append(column)
+                row[column] = round(ns / 1e6, 4)
+            self.csv_rows.append(row)
+        self.frame_index += 1
+
+    def stats(self, mode):
+        """Returns [(phase, p50, p95, p99), ...] in ms for a mode, the whole frame last."""
+        result = []
+        for phase in self.phase_order.get(mode, []) + ["frame"]:
+            history = self.history.get((mode, phase))
+            if history:
+                values = sorted(history)
+                result.append((phase, percentile(values, 0.50), percentile(values, 0.95), percentile(values, 0.99)))
+        return result
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.overlay_surf = None
+        self.update_enabled()
+
+    def draw_overlay(self, surface):
+        """Draws the stats for the current mode in the top-left corner. Returns the
+        rect drawn over, or None while the overlay is hidden."""
+        if not self.show_overlay:
+            return None
+        now = pygame.time.get_ticks()
+        if self.overlay_surf is None or now - self.overlay_built_at >= PROFILER_OVERLAY_REFRESH_MS:
+            font = self.get_overlay_font()
+            lines = [f"{self.mode or '-'} (ms)   p50   p95   p99" + ("   REC" if self.csv_rows is not None else "")]
+            for phase, p50, p95, p99 in self.stats(self.mode):
+                lines.append(f"{phase:<10} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+            line_height = font.get_linesize()
+            line_surfs = [font.render(line, True, OVERLAY_TEXT_COLOR) for line in lines]
+            width = max(line_surf.get_width() for line_surf in line_surfs) + 8
+            self.overlay_surf = pygame.Surface((width, line_height * len(lines) + 8), pygame.SRCALPHA)
+            self.overlay_surf.fill(OVERLAY_BACKGROUND)
+            for i, line_surf in enumerate(line_surfs):
+                self.overlay_surf.blit(line_surf, (4, 4 + i * line_height))
+            self.overlay_built_at = now
+        return surface.blit(self.overlay_surf, (0, 0))
+
+    def toggle_recording(self):
+        if self.csv_rows is None:
+            self.csv_rows = []
+            self.csv_columns = []
+            print("Profiler: recording frames (press F4 again to save)")
+        else:
+            self.save_csv()
+        self.overlay_surf = None
+        self.update_enabled()
+
+    def save_csv(self):
+        """Writes the recorded frames to a CSV file next to the game and stops recording.
+        Returns the file's path, or None if nothing was written."""
+        rows, self.csv_rows = self.csv_rows, None
+        self.update_enabled()
+        if not rows:
+            return None
+        path = os.path.join(PROFILER_CSV_DIR, time.strftime("buzzbuddy_profile_%Y%m%d_%H%M%S.csv"))
+        try:
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=["frame", "mode"] + self.csv_columns + ["frame_ms"], restval="")
+                writer.writeheader()
+                writer.writerows(rows)
+        except OSError as e:
+            print(f"Error writing profile '{path}': {e}")
+            return None
+        print(f"Profiler: saved {len(rows)} frames to {path}")
+        return path
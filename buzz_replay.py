@@ -0,0 +1,144 @@
+"""BuzzBuddy session recordings.
+
+A session can be recorded to a compact binary log and replayed later without a
+window, as fast as the CPU allows, to reproduce a bug or as an end-to-end test.
+All gameplay randomness in the game comes from one seeded random.Random, so the
+log only needs the seed, the starting pet state and the input of every
+simulation tick:
+  pet mode: one record per frame (time in ms, mouse position, click positions)
+  Flappy: the spawn interval it was played with (--swarm), the ticks a jump was
+  applied on, and the tick and score it ended on
+It ends with the final pet state, which the replay has to reach exactly.
+
+This module writes and parses the log; replay_session in BuzzBuddy_vrs3.py feeds
+the records back through the game's rules:
+
+    recording = read_recording(data)
+    for record in recording.records:
+        ...
+"""
+import struct
+from collections import namedtuple
+
+REPLAY_MAGIC = b"BZRP"
+REPLAY_VERSION = 2 # Version 1 recordings (no spawn interval, always the normal one) still replay
+REPLAY_HEADER = struct.Struct("<4sHIi") # magic, version, seed, last stat decrease time (ms, negative after a catch-up)
+REPLAY_STATE = struct.Struct("<H") # Length of the packed pet state (pack_save_state) that follows
+REPLAY_FRAME = struct.Struct("<BIhhB") # record type, time (ms), mouse x, mouse y, click count
+REPLAY_CLICK = struct.Struct("<hh") # x, y (follow their frame)
+REPLAY_JUMP = struct.Struct("<BI") # record type, tick
+REPLAY_FLAPPY_START = struct.Struct("<BH") # record type, spawn interval (ticks)
+REPLAY_FLAPPY_END = struct.Struct("<BIIB") # record type, tick, score, finished (0 if the window was closed)
+REPLAY_MARKER = struct.Struct("<B") # record type only (end of session, Flappy start in version 1)
+RECORD_FRAME, RECORD_FLAPPY_START, RECORD_JUMP, RECORD_FLAPPY_END, RECORD_END = range(1, 6)
+
+Recording = namedtuple("Recording", ["version", "seed", "last_stat_decrease_time", "start_state", "records"])
+
+
+class SessionRecorder:
+    """Collects the session log in memory and writes it when the game closes.
+
+    get_state returns the packed pet state, at the start and at the end of the
+    session; write_file(path, data) stores the finished log."""
+
+    def __init__(self, path, seed, last_stat_decrease_time, get_state, write_file):
+        self.path = path
+        self.get_state = get_state
+        self.write_file = write_file
+        self.data = bytearray(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, last_stat_decrease_time))
+        self.write_state()
+        self.flappy_run = None # The Flappy game in progress, if any
+        self.closed = False
+
+    def write_state(self):
+        state = self.get_state()
+        self.data += REPLAY_STATE.pack(len(state)) + state
+
+    def pet_frame(self, current_time, mouse_pos, clicks):
+        self.data += REPLAY_FRAME.pack(RECORD_FRAME, current_time, mouse_pos[0], mouse_pos[1], len(clicks))
+        for click_x, click_y in clicks:
+            self.data += REPLAY_CLICK.pack(click_x, click_y)
+
+    def flappy_start(self, flappy_run):
+        self.flappy_run = flappy_run
+        self.data += REPLAY_FLAPPY_START.pack(RECORD_FLAPPY_START, flappy_run.spawn_interval_ticks)
+
+    def jump(self, tick):
+        self.data += REPLAY_JUMP.pack(RECORD_JUMP, tick)
+
+    def flappy_end(self, flappy_run, finished=True):
+        self.flappy_run = None
+        self.data += REPLAY_FLAPPY_END.pack(RECORD_FLAPPY_END, flappy_run.tick, flappy_run.score, int(finished))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.flappy_run is not None: # Window closed during the mini-game
+            self.flappy_end(self.flappy_run, finished=False)
+        self.data += REPLAY_MARKER.pack(RECORD_END)
+        self.write_state()
+        try:
+            self.write_file(self.path, bytes(self.data))
+        except OSError as e:
+            print(f"Error writing recording '{self.path}': {e}")
+            return
+        print(f"Recorded session to {self.path} ({len(self.data)} bytes)")
+
+
+def read_replay_state(data, offset):
+    (length,) = REPLAY_STATE.unpack_from(data, offset)
+    offset += REPLAY_STATE.size
+    return data[offset:offset + length], offset + length
+
+
+def read_recording(data):
+    """Parses a session log. Raises ValueError if it is not one.
+
+    The records come as tuples, in the order they were recorded:
+        (RECORD_FRAME, time, mouse position, [click positions])
+        (RECORD_FLAPPY_START, spawn interval in ticks, or None in version 1 logs)
+        (RECORD_JUMP, tick)
+        (RECORD_FLAPPY_END, tick, score, finished)
+        (RECORD_END, packed final state)
+    """
+    magic, version, seed, last_stat_decrease_time = REPLAY_HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC or version not in (1, REPLAY_VERSION):
+        raise ValueError(f"not a BuzzBuddy recording (version {version})")
+    start_state, offset = read_replay_state(data, REPLAY_HEADER.size)
+    return Recording(version, seed, last_stat_decrease_time, start_state, iter_records(data, offset, version))
+
+
+def iter_records(data, offset, version):
+    while True:
+        record_type = data[offset]
+        if record_type == RECORD_FRAME:
+            _, current_time, mouse_x, mouse_y, click_count = REPLAY_FRAME.unpack_from(data, offset)
+            offset += REPLAY_FRAME.size
+            clicks = []
+            for _ in range(click_count):
+                clicks.append(REPLAY_CLICK.unpack_from(data, offset))
+                offset += REPLAY_CLICK.size
+            yield RECORD_FRAME, current_time, (mouse_x, mouse_y), clicks
+        elif record_type == RECORD_FLAPPY_START:
+            if version == 1:
+                spawn_interval_ticks = None
+                offset += REPLAY_MARKER.size
+            else:
+                _, spawn_interval_ticks = REPLAY_FLAPPY_START.unpack_from(data, offset)
+                offset += REPLAY_FLAPPY_START.size
+            yield RECORD_FLAPPY_START, spawn_interval_ticks
+        elif record_type == RECORD_JUMP:
+            _, tick = REPLAY_JUMP.unpack_from(data, offset)
+            offset += REPLAY_JUMP.size
+            yield RECORD_JUMP, tick
+        elif record_type == RECORD_FLAPPY_END:
+            _, tick, score, finished = REPLAY_FLAPPY_END.unpack_from(data, offset)
+            offset += REPLAY_FLAPPY_END.size
+            yield RECORD_FLAPPY_END, tick, score, finished
+        elif record_type == RECORD_END:
+            final_state, offset = read_replay_state(data, offset + REPLAY_MARKER.size)
+            yield RECORD_END, final_state
+            return
+        else:
+            raise ValueError(f"unknown record type {record_type} at byte {offset}")
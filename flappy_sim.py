@@ -0,0 +1,296 @@
+"""Headless Flappy Bee simulation.
+
+Steps many independent Flappy games at once with NumPy arrays, using the same
+rules as run_flappy_game in BuzzBuddy_vrs3.py (one step == one simulation tick),
+but without pygame or a window. Useful for difficulty tuning and bot testing.
+
+    sim = FlappySim(10000, seeds=range(10000))
+    scores = sim.run(simple_bot, max_ticks=3600)
+
+The interactive game tests collisions against pixel masks of the drawn bee and
+flower heads, and by default so does the sim: it builds its collision tables
+from the game's sprites on first use (this imports pygame, but opens no window).
+collision="approx" instead uses the game's old shapes, the bee's body rect and
+circles around the bee and the flower heads, which needs no pygame but misses
+and adds hits near the edges.
+"""
+import math
+import os
+import random
+from collections import namedtuple
+
+import numpy as np
+
+# --- Rules ---
+# Defaults mirror the Flappy constants in BuzzBuddy_vrs3.py:
+#   bee_width/bee_height = pet body size * FLAPPY_BEE_SCALE (80x60 * 0.6)
+#   bee_x = SCREEN_WIDTH // 4
+#   spawn_interval = FLAPPY_SPAWN_INTERVAL_TICKS (OBSTACLE_FREQUENCY in 60 Hz ticks)
+#   gap_margin = the extra 50 px kept between a flower head and the screen edge
+FlappyRules = namedtuple("FlappyRules", [
+    "screen_width", "screen_height", "bee_x", "bee_width", "bee_height",
+    "stem_width", "flower_head_radius", "flower_gap", "gap_margin",
+    "obstacle_speed", "spawn_interval", "gravity", "jump_strength",
+])
+DEFAULT_RULES = FlappyRules(
+    screen_width=400, screen_height=600, bee_x=100, bee_width=48, bee_height=36,
+    stem_width=15, flower_head_radius=35, flower_gap=180, gap_margin=50,
+    obstacle_speed=3, spawn_interval=90, gravity=0.25, jump_strength=-6,
+)
+
+# --- Collision Tables ---
+# Lookup tables built from the game's pixel masks, so the vectorized step can test
+# every game with plain array indexing.
+#   column_top/column_bottom: first/last set row of each bee mask column (-1 if empty)
+#   head_hits[dx - head_dx_min, dy - head_dy_min]: does a flower head centered at
+#       (dx, dy) from the bee center overlap the bee
+#   flower_extent: horizontal span of a flower relative to its stem x
+CollisionTables = namedtuple("CollisionTables", [
+    "bee_origin_x", "bee_origin_y", "column_top", "column_bottom",
+    "flower_extent", "head_dx_min", "head_dy_min", "head_hits",
+])
+
+
+def collision_tables_from_shapes(shapes):
+    """Builds CollisionTables from a BuzzBuddy_vrs3.FlappyCollisionShapes (pygame masks)."""
+    bee_width, bee_height = shapes.bee_mask.get_size()
+    head_width, head_height = shapes.head_mask.get_size()
+    bee_origin_x, bee_origin_y = shapes.bee_origin
+    head_origin_x, head_origin_y = shapes.head_origin
+
+    # Every mask offset at which the two masks can overlap at all
+    head_hits = np.zeros((bee_width + head_width - 1, bee_height + head_height - 1), dtype=bool)
+    for offset_x in range(-head_width + 1, bee_width):
+        for offset_y in range(-head_height + 1, bee_height):
+            if shapes.bee_mask.overlap(shapes.head_mask, (offset_x, offset_y)):
+                head_hits[offset_x + head_width - 1, offset_y + head_height - 1] = True
+
+    return CollisionTables(
+        bee_origin_x=bee_origin_x, bee_origin_y=bee_origin_y,
+        column_top=np.array(shapes.column_top), column_bottom=np.array(shapes.column_bottom),
+        flower_extent=tuple(shapes.flower_extent),
+        # Head center relative to bee center for mask offset (-head_width + 1, -head_height + 1)
+        head_dx_min=-head_width + 1 + head_origin_x - bee_origin_x,
+        head_dy_min=-head_height + 1 + head_origin_y - bee_origin_y,
+        head_hits=head_hits,
+    )
+
+
+game_collision_tables = None # Built from the game's sprites by load_collision_tables
+
+def load_collision_tables():
+    """Pixel-mask collision tables from the game's sprites (needs pygame, no window).
+    Opens a dummy display for the conversion if none is up, and closes it again."""
+    global game_collision_tables
+    if game_collision_tables is None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        import BuzzBuddy_vrs3 as game
+        open_display = pygame.display.get_surface() is None
+        if open_display:
+            pygame.init()
+            pygame.display.set_mode((1, 1))
+        game_collision_tables = collision_tables_from_shapes(game.get_flappy_collision_shapes())
+        if open_display:
+            pygame.quit()
+    return game_collision_tables
+
+
+class FlappySim:
+    """Steps num_games Flappy games in lockstep.
+
+    Flowers spawn on the same ticks in every game, so their x positions are shared
+    and only the gap position (and whether it was scored) is stored per game.
+
+    With seeds, each game draws its gaps from its own random.Random(seed), which
+    gives the same gaps as the interactive game seeded the same way. Without seeds
+    all gaps come from one NumPy generator, which is faster for big sweeps.
+
+    collision is "mask" (the game's pixel masks), "approx" (the old rect/circle
+    shapes) or CollisionTables to use as they are.
+    """
+
+    def __init__(self, num_games, seeds=None, rules=DEFAULT_RULES, rng=None, collision="mask"):
+        self.num_games = num_games
+        self.rules = rules
+        if collision == "mask":
+            collision = load_collision_tables()
+        elif collision == "approx":
+            collision = None
+        elif not isinstance(collision, CollisionTables):
+            raise ValueError(f"Unknown collision {collision!r}")
+        self.collision = collision # CollisionTables, or None for the approximate rect/circle shapes
+        self.tick = 0
+
+        # Bee state, one entry per game
+        self.bee_y = np.full(num_games, float(rules.screen_height // 2))
+        self.bee_velocity = np.zeros(num_games)
+        self.alive = np.ones(num_games, dtype=bool)
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.death_tick = np.full(num_games, -1, dtype=np.int64)
+
+        # Flower slots, recycled in spawn order. A flower lives from the right edge
+        # until it has fully scrolled off the left edge.
+        travel = rules.screen_width + rules.stem_width // 2 + rules.stem_width + rules.flower_head_radius
+        lifetime = math.ceil(travel / rules.obstacle_speed) + 1
+        capacity = lifetime // rules.spawn_interval + 2
+        self.flower_x = np.zeros(capacity, dtype=np.int64) # Shared by all games
+        self.flower_active = np.zeros(capacity, dtype=bool)
+        self.gap_top = np.zeros((num_games, capacity), dtype=np.int64)
+        self.scored = np.zeros((num_games, capacity), dtype=bool)
+        self.next_slot = 0
+
+        # Gap sources
+        self.gap_low = rules.flower_head_radius + rules.gap_margin
+        self.gap_high = rules.screen_height - rules.flower_head_radius - rules.gap_margin - rules.flower_gap
+        if seeds is not None:
+            self.gap_rngs = [random.Random(seed) for seed in seeds]
+            if len(self.gap_rngs) != num_games:
+                raise ValueError("Need exactly one seed per game")
+        else:
+            self.gap_rngs = None
+            self.np_rng = rng if rng is not None else np.random.default_rng()
+
+    def spawn_flower(self):
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % len(self.flower_x)
+        self.flower_x[slot] = self.rules.screen_width + self.rules.stem_width // 2
+        self.flower_active[slot] = True
+        if self.gap_rngs is not None:
+            self.gap_top[:, slot] = [gap_rng.randint(self.gap_low, self.gap_high) for gap_rng in self.gap_rngs]
+        else:
+            self.gap_top[:, slot] = self.np_rng.integers(self.gap_low, self.gap_high + 1, self.num_games)
+        self.scored[:, slot] = False
+
+    def step(self, jump=None):
+        """Advances every game by one tick. jump is a bool array (one per game) or None."""
+        rules = self.rules
+        alive = self.alive
+        self.tick += 1
+
+        # Flowers spawn before the physics step, like in the interactive game
+        if self.tick % rules.spawn_interval == 0:
+            self.spawn_flower()
+
+        if jump is not None:
+            self.bee_velocity[jump & alive] = rules.jump_strength
+        self.bee_velocity[alive] += rules.gravity
+        self.bee_y[alive] += self.bee_velocity[alive]
+
+        # Bee rect, as pygame.Rect(center=(bee_x, int(bee_y))) would place it
+        bee_center_y = np.trunc(self.bee_y).astype(np.int64)
+        bee_top = bee_center_y - rules.bee_height // 2
+        bee_bottom = bee_top + rules.bee_height
+        bee_left = rules.bee_x - rules.bee_width // 2
+        bee_right = bee_left + rules.bee_width
+        bee_center_x = bee_left + rules.bee_width // 2
+
+        # Boundary collision
+        collision = (bee_top <= 0) | (bee_bottom >= rules.screen_height)
+
+        head_reach_sq = (rules.bee_width / 2 + rules.flower_head_radius) ** 2
+        for slot in np.flatnonzero(self.flower_active):
+            flower_x = self.flower_x[slot] - rules.obstacle_speed
+            self.flower_x[slot] = flower_x
+            stem_center_x = flower_x + rules.stem_width // 2
+            gap_top = self.gap_top[:, slot]
+            gap_bottom = gap_top + rules.flower_gap
+
+            if stem_center_x < rules.bee_x:
+                newly_scored = alive & ~self.scored[:, slot]
+                self.score += newly_scored
+                self.scored[:, slot] |= newly_scored
+
+            if self.collision is not None:
+                collision |= self.mask_collision(flower_x, bee_center_y, gap_top, gap_bottom)
+            else:
+                # Stems (same strict overlap test as Rect.colliderect)
+                if bee_left < flower_x + rules.stem_width and flower_x < bee_right:
+                    collision |= (bee_top < gap_top) & (bee_bottom > 0)
+                    collision |= (bee_top < rules.screen_height) & (bee_bottom > gap_bottom)
+
+                # Flower heads (circle test around the bee)
+                head_dx_sq = (bee_center_x - stem_center_x) ** 2
+                if head_dx_sq <= head_reach_sq:
+                    collision |= head_dx_sq + (bee_center_y - gap_top) ** 2 <= head_reach_sq
+                    collision |= head_dx_sq + (bee_center_y - gap_bottom) ** 2 <= head_reach_sq
+
+            if flower_x + rules.stem_width < -rules.flower_head_radius:
+                self.flower_active[slot] = False
+
+        newly_dead = alive & collision
+        self.death_tick[newly_dead] = self.tick
+        self.alive &= ~collision
+
+    def mask_collision(self, flower_x, bee_center_y, gap_top, gap_bottom):
+        """Pixel-accurate hits against one flower for every game, using the collision tables."""
+        tables = self.collision
+        hit = np.zeros(self.num_games, dtype=bool)
+        column_count = len(tables.column_top)
+        bee_mask_left = self.rules.bee_x - tables.bee_origin_x
+        # Broad phase: flower x is the same in every game
+        if flower_x + tables.flower_extent[0] >= bee_mask_left + column_count or flower_x + tables.flower_extent[1] <= bee_mask_left:
+            return hit
+        bee_mask_top = bee_center_y - tables.bee_origin_y
+
+        # Stems: the extreme bee pixels in the columns the stem covers
+        first_column = max(0, flower_x - bee_mask_left)
+        last_column = min(column_count, flower_x + self.rules.stem_width - bee_mask_left)
+        column_top = tables.column_top[first_column:last_column]
+        column_top = column_top[column_top >= 0]
+        if len(column_top):
+            hit |= bee_mask_top + column_top.min() < gap_top
+            hit |= bee_mask_top + tables.column_bottom[first_column:last_column].max() >= gap_bottom
+
+        # Heads: table lookup by head center relative to the bee center
+        dx_index = flower_x + self.rules.stem_width // 2 - self.rules.bee_x - tables.head_dx_min
+        if 0 <= dx_index < tables.head_hits.shape[0]:
+            dy_count = tables.head_hits.shape[1]
+            for head_center_y in (gap_top, gap_bottom):
+                dy_index = head_center_y - bee_center_y - tables.head_dy_min
+                in_range = (dy_index >= 0) & (dy_index < dy_count)
+                hit |= in_range & tables.head_hits[dx_index, np.clip(dy_index, 0, dy_count - 1)]
+        return hit
+
+    def run(self, policy=None, max_ticks=3600):
+        """Steps until every game is over or max_ticks is reached. policy(sim) returns
+        the jump array for the next step (None means never jump). Returns the scores."""
+        while self.tick < max_ticks and self.alive.any():
+            self.step(policy(self) if policy is not None else None)
+        return self.score
+
+    def next_gap_top(self):
+        """Gap top of the nearest flower the bee hasn't passed yet, per game (-1 if none)."""
+        rules = self.rules
+        best_x = None
+        best_slot = -1
+        for slot in np.flatnonzero(self.flower_active):
+            flower_right = self.flower_x[slot] + rules.stem_width + rules.flower_head_radius
+            if flower_right >= rules.bee_x - rules.bee_width // 2 and (best_x is None or self.flower_x[slot] < best_x):
+                best_x = self.flower_x[slot]
+                best_slot = slot
+        if best_slot < 0:
+            return np.full(self.num_games, -1, dtype=np.int64)
+        return self.gap_top[:, best_slot]
+
+
+# --- Bots ---
+def simple_bot(sim):
+    """Jumps when falling below the middle of the next gap (or the screen middle)."""
+    rules = sim.rules
+    gap_top = sim.next_gap_top()
+    target_y = np.where(gap_top >= 0, gap_top + rules.flower_gap * 0.7, rules.screen_height / 2)
+    return (sim.bee_y > target_y) & (sim.bee_velocity > 0)
+
+
+if __name__ == "__main__":
+    import time
+
+    num_games = 10000
+    sim = FlappySim(num_games, rng=np.random.default_rng(0))
+    start = time.perf_counter()
+    scores = sim.run(simple_bot, max_ticks=3600)
+    elapsed = time.perf_counter() - start
+    game_steps = int(sim.death_tick.clip(min=0).sum() + sim.alive.sum() * sim.tick)
+    print(f"{num_games} games, {sim.tick} ticks, {elapsed:.2f}s")
+    print(f"{game_steps / elapsed:,.0f} game steps/s, mean score {scores.mean():.1f}, max {scores.max()}")
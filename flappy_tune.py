@@ -0,0 +1,210 @@
+"""Difficulty tuning sweeps for the Flappy mini-game.
+
+Runs simple_bot against the headless FlappySim for every combination of the
+given Flappy constants, spread over worker processes, and writes one row of
+score statistics per configuration to a CSV file:
+
+    python flappy_tune.py --flower-gap 150,180,210 --gravity 0.2,0.25,0.3 --games 5000
+    python flappy_tune.py --obstacle-speed 2:5 --jump-strength -7,-6,-5 --out speed.csv --resume
+
+Values are comma-separated lists, or start:stop[:step] ranges (stop included),
+and may be negative.
+Constants that aren't given keep the game's values. --obstacle-frequency is in
+milliseconds like OBSTACLE_FREQUENCY in BuzzBuddy_vrs3.py.
+
+Each configuration is split into chunks of --chunk-games games, so work spreads
+evenly over the workers even for a small grid. Rows are appended as soon as a
+configuration finishes, and --resume skips configurations already in the CSV,
+so an interrupted sweep picks up where it stopped. Games are seeded from --seed
+and the configuration, so a resumed or repeated sweep gives the same numbers.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+
+from flappy_sim import DEFAULT_RULES, FlappySim, load_collision_tables, simple_bot
+
+TICK_RATE = 60 # Simulation ticks per second (FLAPPY_TICK_RATE)
+DEFAULT_MAX_TICKS = 60 * TICK_RATE # Games still going after a minute count as survived
+
+# Tunable constant -> (FlappyRules field, parse function)
+TUNABLES = {
+    "flower_gap": ("flower_gap", int),
+    "obstacle_speed": ("obstacle_speed", int),
+    "obstacle_frequency": ("spawn_interval", lambda ms: max(1, round(float(ms) * TICK_RATE / 1000))),
+    "gravity": ("gravity", float),
+    "jump_strength": ("jump_strength", float),
+}
+PARAM_COLUMNS = ["flower_gap", "obstacle_speed", "spawn_interval", "gravity", "jump_strength"]
+RUN_COLUMNS = ["games", "max_ticks", "seed", "collision"]
+STAT_COLUMNS = [
+    "mean_score", "std_score", "p10", "p25", "p50", "p75", "p90", "p99", "max_score",
+    "scored_share", "survived_share", "mean_ticks", "cpu_seconds",
+]
+
+
+def parse_values(text, parse):
+    """'1,2,3' or 'start:stop[:step]' (stop included) -> list of parsed values."""
+    if ":" in text:
+        parts = [float(part) for part in text.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        count = int(round((stop - start) / step)) + 1
+        return [parse(round(start + i * step, 10)) for i in range(count)]
+    return [parse(value) for value in text.split(",")]
+
+
+def build_grid(args):
+    """Returns a list of FlappyRules field dicts, one per configuration."""
+    axes = []
+    for name, (field, parse) in TUNABLES.items():
+        text = getattr(args, name)
+        values = parse_values(text, parse) if text else [getattr(DEFAULT_RULES, field)]
+        axes.append([(field, value) for value in values])
+    return [dict(combination) for combination in product(*axes)]
+
+
+def config_key(params, games, max_ticks, seed, collision):
+    """Identifies a configuration row in the CSV (values as written by csv)."""
+    return tuple(str(value) for value in [params[column] for column in PARAM_COLUMNS] + [games, max_ticks, seed, collision])
+
+
+def run_chunk(params, games, max_ticks, seed, chunk_index, collision):
+    """Worker: plays one chunk of games for a configuration. Returns (scores, ticks played, seconds)."""
+    chunk_start = time.perf_counter()
+    rules = DEFAULT_RULES._replace(**params)
+    # Seed from the sweep seed, the configuration and the chunk, never from the worker
+    config_hash = zlib.crc32(repr(sorted(params.items())).encode())
+    rng = np.random.default_rng([seed, config_hash, chunk_index])
+    sim = FlappySim(games, rules=rules, rng=rng, collision=collision)
+    scores = sim.run(simple_bot, max_ticks=max_ticks)
+    ticks = np.where(sim.death_tick >= 0, sim.death_tick, sim.tick)
+    return scores.astype(np.int32), ticks.astype(np.int32), time.perf_counter() - chunk_start
+
+
+def summarize(scores, ticks, max_ticks):
+    percentiles = np.percentile(scores, [10, 25, 50, 75, 90, 99])
+    return {
+        "mean_score": round(float(scores.mean()), 3),
+        "std_score": round(float(scores.std()), 3),
+        **{f"p{p}": round(float(value), 2) for p, value in zip([10, 25, 50, 75, 90, 99], percentiles)},
+        "max_score": int(scores.max()),
+        "scored_share": round(float((scores > 0).mean()), 4),
+        "survived_share": round(float((ticks >= max_ticks).mean()), 4),
+        "mean_ticks": round(float(ticks.mean()), 1),
+    }
+
+
+def read_done_keys(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f: # Drop a row cut off by a hard kill, so appending stays valid CSV
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    with open(path, newline="") as f:
+        return {tuple(row[column] for column in PARAM_COLUMNS + RUN_COLUMNS) for row in csv.DictReader(f)}
+
+
+def join_tunable_values(argv):
+    """Rewrites '--jump-strength -7,-6' as '--jump-strength=-7,-6'. argparse
+    takes a value starting with '-' for an option, so negative lists and ranges
+    have to be attached to their option."""
+    options = {"--" + name.replace("_", "-") for name in TUNABLES}
+    joined = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in options and i + 1 < len(argv):
+            joined.append(argv[i] + "=" + argv[i + 1])
+            i += 2
+        else:
+            joined.append(argv[i])
+            i += 1
+    return joined
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Sweep Flappy difficulty constants with a bot.")
+    for name in TUNABLES:
+        parser.add_argument("--" + name.replace("_", "-"), metavar="VALUES",
+                            help="comma-separated values or start:stop[:step]")
+    parser.add_argument("--games", type=int, default=5000, help="games per configuration")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="ticks before a game counts as survived")
+    parser.add_argument("--chunk-games", type=int, default=1000, help="games per worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--approx-collisions", action="store_true",
+                        help="use the old rect/circle shapes instead of the game's pixel masks (no pygame needed)")
+    parser.add_argument("--out", default="flappy_tuning.csv", help="CSV file to write")
+    parser.add_argument("--resume", action="store_true", help="append to --out, skipping configurations already in it")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(join_tunable_values(argv))
+
+    collision_name = "approx" if args.approx_collisions else "mask"
+    grid = build_grid(args)
+    done = read_done_keys(args.out) if args.resume else set()
+    todo = [params for params in grid if config_key(params, args.games, args.max_ticks, args.seed, collision_name) not in done]
+    print(f"{len(grid)} configurations, {len(grid) - len(todo)} already done, {len(todo)} to run on {args.workers} workers")
+    if not todo:
+        return 0
+    collision = "approx" if args.approx_collisions else load_collision_tables() # Built once, not per worker
+
+    chunk_sizes = [args.chunk_games] * (args.games // args.chunk_games)
+    if args.games % args.chunk_games:
+        chunk_sizes.append(args.games % args.chunk_games)
+
+    write_header = not (args.resume and os.path.exists(args.out))
+    sweep_start = time.perf_counter()
+    with open(args.out, "a" if args.resume else "w", newline="") as out_file, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor:
+        writer = csv.DictWriter(out_file, fieldnames=PARAM_COLUMNS + RUN_COLUMNS + STAT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        futures = {}
+        pending = {} # config index -> [chunks left, score arrays, tick arrays, worker seconds]
+        for config_index, params in enumerate(todo):
+            pending[config_index] = [len(chunk_sizes), [], [], 0.0]
+            for chunk_index, chunk_games in enumerate(chunk_sizes):
+                future = executor.submit(run_chunk, params, chunk_games, args.max_ticks, args.seed, chunk_index, collision)
+                futures[future] = config_index
+        finished = 0
+        for future in as_completed(futures):
+            config_index = futures[future]
+            scores, ticks, seconds = future.result()
+            entry = pending[config_index]
+            entry[0] -= 1
+            entry[1].append(scores)
+            entry[2].append(ticks)
+            entry[3] += seconds
+            if entry[0]:
+                continue
+            # Last chunk of this configuration: write its row right away
+            params = todo[config_index]
+            all_scores = np.concatenate(entry[1])
+            row = {**params, "games": args.games, "max_ticks": args.max_ticks, "seed": args.seed, "collision": collision_name}
+            row.update(summarize(all_scores, np.concatenate(entry[2]), args.max_ticks))
+            row["cpu_seconds"] = round(entry[3], 2)
+            writer.writerow(row)
+            out_file.flush()
+            del pending[config_index]
+            finished += 1
+            print(f"[{finished}/{len(todo)}] " + " ".join(f"{column}={params[column]}" for column in PARAM_COLUMNS)
+                  + f": mean {row['mean_score']}, median {row['p50']}, max {row['max_score']}")
+    elapsed = time.perf_counter() - sweep_start
+    print(f"Wrote {finished} rows to {args.out} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Display-free BuzzBuddy pet engine.
+
+Keeps many pets in NumPy arrays (one slot per pet) and applies the same rules as
+the pet mode in BuzzBuddy_vrs3.py, without pygame or a window:
+
+    store = PetStore()
+    first_id = store.create(10000, now_ms=0)
+    store.tick(now_ms=60000)         # every stat decrease due by now, for all pets at once
+    store.feed(first_id)
+    store.add_game_score(first_id, 12)
+    store.get(first_id)
+
+Times are in milliseconds on any clock the caller keeps. A pet's stats decrease
+once every decrease_interval + 1 ms after it was created (update_pet_stats fires
+once more than the interval has passed), however late tick() is called: a late
+tick catches up on every decrease that fell due, so pets don't drift.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# --- Rules ---
+# Defaults mirror the pet constants in BuzzBuddy_vrs3.py:
+#   decrease_interval = stat_decrease_interval, *_decrease = cleanliness_decrease etc.
+#   clean_rate = cleanliness gained per frame of hover cleaning
+#   xp_per_point/happy_per_point = finish_flappy_game's gains per Flappy point
+PetRules = namedtuple("PetRules", [
+    "max_level", "decrease_interval", "cleanliness_decrease", "hunger_decrease",
+    "happiness_deficit_step", "clean_rate", "xp_levels", "max_bee_level",
+    "xp_per_point", "happy_per_point",
+])
+DEFAULT_RULES = PetRules(
+    max_level=100, decrease_interval=5000, cleanliness_decrease=2, hunger_decrease=4,
+    happiness_deficit_step=20, clean_rate=0.5, xp_levels={1: 50, 2: 100}, max_bee_level=3,
+    xp_per_point=1, happy_per_point=0.5,
+)
+
+INITIAL_CAPACITY = 1024
+
+
+class PetStore:
+    """Pets stored column-wise in growable arrays; pet ids are slot indices."""
+
+    def __init__(self, rules=DEFAULT_RULES, capacity=INITIAL_CAPACITY):
+        self.rules = rules
+        self.count = 0
+        self.cleanliness = np.zeros(capacity)
+        self.hunger = np.zeros(capacity)
+        self.happiness = np.zeros(capacity)
+        self.xp = np.zeros(capacity, dtype=np.int64)
+        self.bee_level = np.zeros(capacity, dtype=np.int8)
+        self.next_decrease_time = np.zeros(capacity, dtype=np.int64) # ms at which the next decrease is due
+        self.decreases_applied = 0
+
+    def grow(self, capacity):
+        for name in ("cleanliness", "hunger", "happiness", "xp", "bee_level", "next_decrease_time"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def create(self, count=1, now_ms=0):
+        """Adds count new pets (full stats, level 1). Returns the id of the first one."""
+        first_id = self.count
+        end = first_id + count
+        if end > len(self.cleanliness):
+            self.grow(max(end, len(self.cleanliness) * 2))
+        new = slice(first_id, end)
+        self.cleanliness[new] = self.hunger[new] = self.happiness[new] = self.rules.max_level
+        self.xp[new] = 0
+        self.bee_level[new] = 1
+        self.next_decrease_time[new] = now_ms + self.rules.decrease_interval + 1
+        self.count = end
+        return first_id
+
+    def tick(self, now_ms):
+        """Applies every stat decrease due by now_ms, batched over all pets. Returns how many were applied."""
+        rules = self.rules
+        period = rules.decrease_interval + 1
+        due = np.flatnonzero(self.next_decrease_time[:self.count] <= now_ms)
+        applied = 0
+        while due.size: # More than one round only after a tick came late by a whole period
+            # Pets created together fall due together; a slice avoids fancy-indexing copies
+            index = slice(0, self.count) if due.size == self.count else due
+            cleanliness = np.maximum(self.cleanliness[index] - rules.cleanliness_decrease, 0)
+            hunger = np.maximum(self.hunger[index] - rules.hunger_decrease, 0)
+            deficit = (rules.max_level - cleanliness) + (rules.max_level - hunger)
+            happiness_decrease = np.maximum(deficit // rules.happiness_deficit_step, 1)
+            self.cleanliness[index] = cleanliness
+            self.hunger[index] = hunger
+            self.happiness[index] = np.maximum(self.happiness[index] - happiness_decrease, 0)
+            self.next_decrease_time[index] += period
+            applied += due.size
+            due = due[self.next_decrease_time[due] <= now_ms]
+        self.decreases_applied += applied
+        return applied
+
+    def check_id(self, pet_id):
+        if not 0 <= pet_id < self.count:
+            raise KeyError(f"no pet {pet_id}")
+
+    def feed(self, pet_id):
+        """The Pollen Storage Make button: honey back to full."""
+        self.check_id(pet_id)
+        self.hunger[pet_id] = self.rules.max_level
+
+    def clean(self, pet_id, frames=1):
+        """frames frames of hover cleaning in the Bathroom."""
+        self.check_id(pet_id)
+        if frames < 0:
+            raise ValueError("frames must not be negative")
+        self.cleanliness[pet_id] = min(self.rules.max_level, self.cleanliness[pet_id] + self.rules.clean_rate * frames)
+
+    def add_game_score(self, pet_id, score):
+        """A finished Flappy game (finish_flappy_game): XP with level-ups, and happiness."""
+        self.check_id(pet_id)
+        rules = self.rules
+        bee_level = int(self.bee_level[pet_id])
+        xp = int(self.xp[pet_id])
+        if score > 0:
+            xp += score * rules.xp_per_point
+            xp_next_level = rules.xp_levels.get(bee_level, float('inf'))
+            while bee_level < rules.max_bee_level and xp >= xp_next_level:
+                xp -= xp_next_level
+                bee_level += 1
+                xp_next_level = rules.xp_levels.get(bee_level, float('inf'))
+                if bee_level == rules.max_bee_level:
+                    xp = 0
+                    break
+        self.xp[pet_id] = xp
+        self.bee_level[pet_id] = bee_level
+        self.happiness[pet_id] = min(rules.max_level, self.happiness[pet_id] + score * rules.happy_per_point)
+
+    def get(self, pet_id):
+        """The pet's state as a dict."""
+        self.check_id(pet_id)
+        return {
+            "id": pet_id,
+            "cleanliness": float(self.cleanliness[pet_id]),
+            "hunger": float(self.hunger[pet_id]),
+            "happiness": float(self.happiness[pet_id]),
+            "xp": int(self.xp[pet_id]),
+            "bee_level": int(self.bee_level[pet_id]),
+        }
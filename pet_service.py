@@ -0,0 +1,304 @@
+"""Headless BuzzBuddy pet service and load generator.
+
+Hosts many pets (pet_engine.PetStore) in one asyncio process. A single tick task
+applies the stat decreases for every pet in one batch per tick, instead of a
+timer per pet, and clients act on pets over a local socket:
+
+    python pet_service.py serve --port 8765
+    python pet_service.py load --port 8765 --pets 10000 --clients 32 --duration 10
+    python pet_service.py load --spawn --pets 10000    # starts its own server process
+
+The protocol is one text command per line, answered by one line of JSON:
+
+    create [COUNT]         -> {"ok": true, "first": ID, "count": COUNT}   at most 100000 per command
+    get ID                 -> {"ok": true, "pet": {...}}
+    feed ID                -> {"ok": true, "pet": {...}}   honey back to full
+    clean ID [FRAMES]      -> {"ok": true, "pet": {...}}   FRAMES frames of brushing (default 60)
+    score ID POINTS        -> {"ok": true, "pet": {...}}   a finished Flappy game
+    stats                  -> {"ok": true, "stats": {...}} pets, requests, tick times
+    errors                 -> {"ok": false, "error": "..."}
+
+The load generator keeps --clients connections busy with a mix of requests for
+--duration seconds and reports throughput, per-command latency percentiles and
+the server's tick times, optionally as JSON (--json), to size a shared backend.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+from pet_engine import PetStore
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TICK_INTERVAL = 0.1 # Seconds between batched ticks; decreases are applied at most this late
+DEFAULT_CLEAN_FRAMES = 60 # One second of brushing
+MAX_CREATE_COUNT = 100_000 # Pets per create command, so one request can't grab unbounded memory
+TICK_HISTORY = 1000 # Tick durations kept for the stats percentiles
+# Load generator request mix: command -> weight
+LOAD_MIX = {"get": 50, "clean": 25, "feed": 15, "score": 10}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+# --- Service ---
+class PetService:
+    def __init__(self, tick_interval=DEFAULT_TICK_INTERVAL):
+        self.store = PetStore()
+        self.tick_interval = tick_interval
+        self.start_time = time.monotonic()
+        self.requests = 0
+        self.connections = 0
+        self.tick_count = 0
+        self.tick_ms = collections.deque(maxlen=TICK_HISTORY)
+
+    def now_ms(self):
+        return int((time.monotonic() - self.start_time) * 1000)
+
+    async def run_ticks(self):
+        """The one scheduler for all pets: every tick_interval, apply whatever fell due."""
+        next_tick = time.monotonic()
+        while True:
+            tick_start = time.perf_counter()
+            self.store.tick(self.now_ms())
+            self.tick_ms.append((time.perf_counter() - tick_start) * 1000)
+            self.tick_count += 1
+            next_tick += self.tick_interval
+            await asyncio.sleep(max(0, next_tick - time.monotonic()))
+
+    def stats(self):
+        tick_ms = sorted(self.tick_ms)
+        return {
+            "pets": self.store.count,
+            "requests": self.requests,
+            "connections": self.connections,
+            "uptime_s": round(time.monotonic() - self.start_time, 1),
+            "ticks": self.tick_count,
+            "decreases_applied": self.store.decreases_applied,
+            "tick_ms_p50": round(percentile(tick_ms, 0.50), 3),
+            "tick_ms_p99": round(percentile(tick_ms, 0.99), 3),
+            "tick_ms_max": round(tick_ms[-1], 3) if tick_ms else 0.0,
+        }
+
+    def handle_command(self, line):
+        """Runs one protocol command and returns the reply dict."""
+        parts = line.split()
+        if not parts:
+            return {"ok": False, "error": "empty command"}
+        command, args = parts[0].lower(), parts[1:]
+        try:
+            numbers = [int(arg) for arg in args]
+        except ValueError:
+            return {"ok": False, "error": f"arguments must be integers: {line.strip()}"}
+        store = self.store
+        try:
+            if command == "create" and len(numbers) <= 1:
+                count = numbers[0] if numbers else 1
+                if count < 1:
+                    raise ValueError("count must be at least 1")
+                if count > MAX_CREATE_COUNT:
+                    raise ValueError(f"count must be at most {MAX_CREATE_COUNT}")
+                return {"ok": True, "first": store.create(count, self.now_ms()), "count": count}
+            if command == "get" and len(numbers) == 1:
+                pass
+            elif command == "feed" and len(numbers) == 1:
+                store.feed(numbers[0])
+            elif command == "clean" and len(numbers) in (1, 2):
+                store.clean(numbers[0], numbers[1] if len(numbers) == 2 else DEFAULT_CLEAN_FRAMES)
+            elif command == "score" and len(numbers) == 2:
+                store.add_game_score(numbers[0], max(0, numbers[1]))
+            elif command == "stats" and not numbers:
+                return {"ok": True, "stats": self.stats()}
+            else:
+                return {"ok": False, "error": f"unknown command or wrong arguments: {line.strip()}"}
+            return {"ok": True, "pet": store.get(numbers[0])}
+        except (KeyError, ValueError) as e:
+            return {"ok": False, "error": str(e).strip("'\"")}
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                reply = self.handle_command(line.decode(errors="replace"))
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+async def serve(host, port, unix_path, tick_interval, pets):
+    service = PetService(tick_interval)
+    if pets:
+        service.store.create(pets, service.now_ms())
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_client, unix_path)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(service.handle_client, host, port)
+        where = f"{host}:{port}"
+    print(f"Pet service listening on {where} with {service.store.count} pets, ticking every {tick_interval * 1000:.0f} ms", flush=True)
+    ticker = asyncio.create_task(service.run_ticks())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        ticker.cancel()
+
+
+# --- Load Generator ---
+async def open_connection(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(reader, writer, line):
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def run_client(host, port, unix_path, first_id, pets, deadline, seed, latencies, errors):
+    reader, writer = await open_connection(host, port, unix_path)
+    rng = random.Random(seed)
+    commands, weights = list(LOAD_MIX), list(LOAD_MIX.values())
+    try:
+        while time.perf_counter() < deadline:
+            command = rng.choices(commands, weights)[0]
+            pet_id = first_id + rng.randrange(pets)
+            if command == "clean":
+                line = f"clean {pet_id} {rng.randint(1, 120)}"
+            elif command == "score":
+                line = f"score {pet_id} {rng.randint(0, 30)}"
+            else:
+                line = f"{command} {pet_id}"
+            request_start = time.perf_counter()
+            reply = await request(reader, writer, line)
+            latencies[command].append((time.perf_counter() - request_start) * 1000)
+            if not reply["ok"]:
+                errors.append(reply["error"])
+    finally:
+        writer.close()
+
+
+def latency_summary(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+async def run_load(host, port, unix_path, pets, clients, duration, seed):
+    reader, writer = await open_connection(host, port, unix_path)
+    # Pets are created in chunks of MAX_CREATE_COUNT; ids stay consecutive on one connection
+    first_id = None
+    for chunk_start in range(0, pets, MAX_CREATE_COUNT):
+        created = await request(reader, writer, f"create {min(MAX_CREATE_COUNT, pets - chunk_start)}")
+        if first_id is None:
+            first_id = created["first"]
+    latencies = collections.defaultdict(list)
+    errors = []
+    load_start = time.perf_counter()
+    deadline = load_start + duration
+    await asyncio.gather(*(run_client(host, port, unix_path, first_id, pets, deadline, seed + i, latencies, errors)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - load_start
+    server_stats = (await request(reader, writer, "stats"))["stats"]
+    writer.close()
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "pets": pets, "clients": clients, "duration_s": round(elapsed, 2),
+        "requests": total, "requests_per_s": round(total / elapsed, 1), "errors": len(errors),
+        "latency": {"all": latency_summary([v for values in latencies.values() for v in values]),
+                    **{command: latency_summary(values) for command, values in sorted(latencies.items())}},
+        "server": server_stats,
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests from {report['clients']} clients over {report['pets']} pets "
+          f"in {report['duration_s']} s: {report['requests_per_s']:,.0f} req/s, {report['errors']} errors")
+    print(f"{'command':<8} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for command, summary in report["latency"].items():
+        print(f"{command:<8} {summary['count']:>8} {summary['p50_ms']:>8.3f} {summary['p95_ms']:>8.3f} "
+              f"{summary['p99_ms']:>8.3f} {summary['max_ms']:>8.3f}")
+    server = report["server"]
+    print(f"server: {server['pets']} pets, {server['ticks']} ticks, tick p50 {server['tick_ms_p50']} ms, "
+          f"p99 {server['tick_ms_p99']} ms, max {server['tick_ms_max']} ms, {server['decreases_applied']} decreases applied")
+
+
+def spawn_server(args):
+    """Starts `serve` in a child process and waits until it accepts connections."""
+    command = [sys.executable, os.path.abspath(__file__), "serve", "--tick-interval", str(args.tick_interval)]
+    command += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline() # The "listening" line
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless BuzzBuddy pet service and load generator.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    for mode, help_text in (("serve", "run the pet service"), ("load", "generate load against a pet service")):
+        sub = subparsers.add_parser(mode, help=help_text)
+        sub.add_argument("--host", default=DEFAULT_HOST)
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT)
+        sub.add_argument("--unix", metavar="PATH", help="use a Unix domain socket instead of TCP")
+        sub.add_argument("--tick-interval", type=float, default=DEFAULT_TICK_INTERVAL, help="seconds between batched ticks")
+        sub.add_argument("--pets", type=int, default=10000 if mode == "load" else 0,
+                         help="pets to create (serve: at startup, load: for the run)")
+        if mode == "load":
+            sub.add_argument("--clients", type=int, default=32, help="concurrent connections")
+            sub.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+            sub.add_argument("--seed", type=int, default=0)
+            sub.add_argument("--spawn", action="store_true", help="start a server process for the run")
+            sub.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.tick_interval, args.pets))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    server = spawn_server(args) if args.spawn else None
+    try:
+        report = asyncio.run(run_load(args.host, args.port, args.unix, args.pets, args.clients, args.duration, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
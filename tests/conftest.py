@@ -0,0 +1,20 @@
+"""Shared setup for the headless tests: SDL dummy drivers and the repo root on sys.path."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def screen():
+    """A dummy display the size of the game window, for tests that draw or convert surfaces."""
+    import pygame
+
+    import BuzzBuddy_vrs3 as game
+
+    pygame.init()
+    return pygame.display.set_mode((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
@@ -0,0 +1,34 @@
+"""Baked fonts from the asset pack."""
+import pygame
+import pytest
+
+import BuzzBuddy_vrs3 as game
+import buzz_bake
+from buzz_assets import AssetPack
+
+
+@pytest.fixture
+def pack(screen, tmp_path):
+    path = str(tmp_path / "assets.pack")
+    buzz_bake.bake(path)
+    return AssetPack(path)
+
+
+def same_pixels(a, b):
+    return a.get_size() == b.get_size() and pygame.image.tobytes(a, "RGBA") == pygame.image.tobytes(b, "RGBA")
+
+
+@pytest.mark.parametrize("text", ["Pollen Storage", "0/50 XP", "Current XP: 17/50"])
+def test_baked_font_matches_the_ttf(pack, text):
+    baked_font = pack.get_font("small", game.get_font_path())
+    font = pygame.font.Font(game.get_font_path(), game.FONT_SIZES["small"][0])
+    assert baked_font.size(text) == font.size(text)
+    assert same_pixels(baked_font.render(text, True, game.BLACK), font.render(text, True, game.BLACK))
+
+
+def test_only_unbaked_text_loads_the_ttf(pack):
+    baked_font = pack.get_font("small", game.get_font_path())
+    baked_font.render("Pollen Storage", True, game.BLACK)
+    assert baked_font.source_font is None
+    baked_font.render("0/50 XP", True, game.BLACK)
+    assert baked_font.source_font is not None
@@ -0,0 +1,27 @@
+"""AllocationTracker per-line counts."""
+from buzz_alloc import AllocationTracker
+
+kept = []
+
+
+def allocate_and_keep():
+    kept.append(bytearray(1000))
+
+
+def test_counts_blocks_kept_by_the_tracked_file(capsys):
+    tracker = AllocationTracker(__file__)
+    tracker.start()
+    tracker.begin_frame("idle") # Nothing allocated in this file
+    tracker.end_frame()
+    for _ in range(4):
+        tracker.begin_frame("pet")
+        allocate_and_keep()
+        tracker.end_frame()
+    report_lines = tracker.report_lines()
+    tracker.stop()
+    assert tracker.frames == {"idle": 1, "pet": 4}
+    keep_line = allocate_and_keep.__code__.co_firstlineno + 1
+    blocks, size = tracker.sites[("pet", keep_line)]
+    assert blocks >= 4 and size >= 4 * 1000 # Object and buffer can be separate blocks
+    assert any("kept.append(bytearray(1000))" in line for line in report_lines)
+    assert "Allocation tracker: blocks still alive" in capsys.readouterr().out
@@ -0,0 +1,26 @@
+"""FrameProfiler phase accounting."""
+from buzz_profiler import FrameProfiler, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, fraction) for fraction in (0.5, 0.95, 0.99)] == [50, 95, 99]
+    assert percentile([7], 0.5) == 7
+
+
+def test_frames_are_only_timed_while_enabled():
+    profiler = FrameProfiler(get_overlay_font=None)
+    profiler.begin_frame("pet")
+    profiler.mark("bars")
+    profiler.end_frame()
+    assert profiler.stats("pet") == []
+
+    profiler.toggle_recording()
+    for _ in range(3):
+        profiler.begin_frame("pet")
+        profiler.mark("bars")
+        profiler.mark("bees")
+        profiler.mark("bars") # A phase marked twice in a frame adds up
+        profiler.end_frame()
+    assert [phase for phase, *_ in profiler.stats("pet")] == ["bars", "bees", "frame"]
+    assert len(profiler.csv_rows) == 3 and set(profiler.csv_columns) == {"bars_ms", "bees_ms"}
@@ -0,0 +1,32 @@
+"""Colony spatial hash against a brute-force scan."""
+import random
+
+import pygame
+
+import BuzzBuddy_vrs3 as game
+
+
+def brute_force_bees_under(colony, rect):
+    return [bee for bee in range(colony.size)
+            if rect.colliderect(pygame.Rect(int(colony.left[bee]), int(colony.top[bee]),
+                                            int(colony.right[bee] - colony.left[bee]),
+                                            int(colony.bottom[bee] - colony.top[bee])))]
+
+
+def test_spatial_hash_matches_brute_force():
+    colony = game.BeeColony(500)
+    rng = random.Random(0)
+    for _ in range(300):
+        rect = pygame.Rect(rng.randrange(-40, game.SCREEN_WIDTH), rng.randrange(0, game.SCREEN_HEIGHT),
+                           rng.randrange(1, 80), rng.randrange(1, 80))
+        expected = brute_force_bees_under(colony, rect)
+        assert colony.bees_under(rect) == expected
+        assert colony.any_under(rect) == bool(expected)
+
+
+def test_small_colonies_and_far_queries():
+    for size in (1, 2, 7):
+        colony = game.BeeColony(size)
+        everything = pygame.Rect(-1000, -1000, 4000, 4000)
+        assert colony.bees_under(everything) == list(range(size))
+        assert not colony.any_under(pygame.Rect(-500, -500, 10, 10))
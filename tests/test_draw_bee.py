@@ -0,0 +1,16 @@
+"""draw_bee returns the bee's body rect."""
+import pygame
+import pytest
+
+import BuzzBuddy_vrs3 as game
+
+
+@pytest.mark.parametrize("use_sprite_cache", [True, False])
+@pytest.mark.parametrize("scale", [1.0, 0.6])
+def test_draw_bee_returns_body_rect(screen, monkeypatch, use_sprite_cache, scale):
+    monkeypatch.setattr(game, "USE_BEE_SPRITE_CACHE", use_sprite_cache)
+    surface = pygame.Surface(screen.get_size())
+    body_rect = game.draw_bee(surface, 200, 300, (0, 0), scale)
+    body_width, body_height, _, _ = game.get_bee_dimensions(scale)
+    assert body_rect.size == (body_width, body_height)
+    assert body_rect.center == (200, 300)
@@ -0,0 +1,20 @@
+"""FlappyRun rules."""
+import random
+
+import BuzzBuddy_vrs3 as game
+
+
+def test_spawned_flowers_cycle_petal_colors(screen):
+    flappy_run = game.FlappyRun(random.Random(0))
+    flower_pool = flappy_run.flower_pool
+    colors = [] # Petal color of each flower as it spawns (only two or three are on screen at once)
+    for _ in range(flappy_run.spawn_interval_ticks * 5):
+        flappy_run.bee_y = game.SCREEN_HEIGHT // 2 # Keep the bee clear of the screen edges
+        flappy_run.bee_velocity = 0
+        count = flower_pool.count
+        flappy_run.step(False)
+        if flower_pool.count > count:
+            newest = (flower_pool.start + flower_pool.count - 1) % flower_pool.capacity
+            colors.append(int(flower_pool.color[newest]))
+    color_count = len(game.FLOWER_PETAL_COLORS)
+    assert colors == [i % color_count for i in range(5)]
@@ -0,0 +1,15 @@
+"""FlappySim collision choice."""
+import pytest
+
+import flappy_sim
+
+
+def test_pixel_masks_are_the_default(screen):
+    sim = flappy_sim.FlappySim(4, seeds=range(4))
+    assert sim.collision is flappy_sim.load_collision_tables()
+
+
+def test_approximate_shapes_are_opt_in():
+    assert flappy_sim.FlappySim(4, seeds=range(4), collision="approx").collision is None
+    with pytest.raises(ValueError):
+        flappy_sim.FlappySim(4, seeds=range(4), collision=None)
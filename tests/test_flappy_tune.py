@@ -0,0 +1,20 @@
+"""flappy_tune command line parsing."""
+import pytest
+
+import flappy_tune
+
+
+def parse_args(argv):
+    return flappy_tune.build_parser().parse_args(flappy_tune.join_tunable_values(argv))
+
+
+@pytest.mark.parametrize("values", ["-7,-6,-5", "-7:-5"])
+def test_negative_jump_strengths(values):
+    grid = flappy_tune.build_grid(parse_args(["--jump-strength", values, "--games", "10"]))
+    assert [params["jump_strength"] for params in grid] == [-7.0, -6.0, -5.0]
+
+
+def test_documented_example_parses():
+    args = parse_args("--obstacle-speed 2:5 --jump-strength -7,-6,-5 --out speed.csv --resume".split())
+    assert args.out == "speed.csv" and args.resume
+    assert len(flappy_tune.build_grid(args)) == 4 * 3
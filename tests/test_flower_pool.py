@@ -0,0 +1,32 @@
+"""FlowerPool ring buffer."""
+import BuzzBuddy_vrs3 as game
+
+
+def test_spawn_and_expire_recycle_slots_in_order():
+    pool = game.FlowerPool(3)
+    for i in range(5): # Wraps around the ring twice
+        pool.spawn(100 + i, 200 + i, i % 2)
+        if pool.count == 3:
+            pool.expire_oldest()
+    assert pool.count == 2
+    assert [int(pool.x[slot]) for slot in pool.active_indices()] == [103, 104]
+    assert [int(pool.gap_top[slot]) for slot in pool.active_indices()] == [203, 204]
+    assert [int(pool.color[slot]) for slot in pool.active_indices()] == [1, 0]
+
+
+def test_move_score_and_expire_offscreen():
+    pool = game.FlowerPool(4)
+    for x in (0, 100, 200, 300):
+        pool.spawn(x, 250, 0)
+    pool.expire_oldest()
+    pool.spawn(400, 250, 0) # Now wrapped: slots 1, 2, 3, 0
+    pool.move(-150)
+    assert [int(pool.x[slot]) for slot in pool.active_indices()] == [-50, 50, 150, 250]
+
+    bee_x = 150 + game.STEM_WIDTH // 2 + 1 # Just past the third flower's stem center
+    assert pool.score_passed(bee_x) == 3
+    assert pool.score_passed(bee_x) == 0 # Each flower scores once
+    assert [bool(pool.scored[slot]) for slot in pool.active_indices()] == [True, True, True, False]
+
+    pool.expire_offscreen(0) # Only the first flower is entirely left of x = 0
+    assert [int(pool.x[slot]) for slot in pool.active_indices()] == [50, 150, 250]
@@ -0,0 +1,18 @@
+"""Pet mode idle wait."""
+import pygame
+
+import BuzzBuddy_vrs3 as game
+
+
+def test_wait_returns_the_waking_event_without_requeueing_it(screen):
+    pygame.event.clear()
+    for button in (1, 3):
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(10, 10)))
+    woke_on = game.wait_for_pet_event(100)
+    assert woke_on.type == pygame.MOUSEBUTTONDOWN and woke_on.button == 1
+    assert [event.button for event in pygame.event.get(pygame.MOUSEBUTTONDOWN)] == [3]
+
+
+def test_wait_times_out_with_none(screen):
+    pygame.event.clear()
+    assert game.wait_for_pet_event(1) is None
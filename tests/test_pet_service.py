@@ -0,0 +1,19 @@
+"""PetService protocol argument checks."""
+import pet_service
+
+
+def test_negative_clean_frames_are_rejected():
+    service = pet_service.PetService()
+    service.handle_command("create")
+    cleanliness = service.handle_command("get 0")["pet"]["cleanliness"]
+    reply = service.handle_command("clean 0 -1000")
+    assert not reply["ok"] and "negative" in reply["error"]
+    assert service.handle_command("get 0")["pet"]["cleanliness"] == cleanliness
+
+
+def test_create_count_is_bounded():
+    service = pet_service.PetService()
+    reply = service.handle_command(f"create {pet_service.MAX_CREATE_COUNT + 1}")
+    assert not reply["ok"]
+    assert service.store.count == 0
+    assert service.handle_command(f"create {pet_service.MAX_CREATE_COUNT}")["count"] == pet_service.MAX_CREATE_COUNT
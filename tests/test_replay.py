@@ -0,0 +1,88 @@
+"""Session recording and replay."""
+import BuzzBuddy_vrs3 as game
+import buzz_replay
+
+SEED = 7
+START_STATE = {"cleanliness": 50.0, "hunger": 80.0, "happiness": 90.0, "bee_level": 1, "xp": 0, "room": "Bathroom"}
+ON_BEE = (game.pet_center_x, game.pet_center_y)
+OFF_BEE = (5, 5)
+
+
+def record_session(path, spawn_interval_ticks=game.FLAPPY_SPAWN_INTERVAL_TICKS):
+    """Plays a short session the way the main loop does and returns its Flappy run."""
+    game.game_mode = game.MODE_PET
+    game.last_stat_decrease_time = 0
+    game.apply_save_state(START_STATE)
+    game.game_rng.seed(SEED)
+    recorder = buzz_replay.SessionRecorder(str(path), SEED, game.last_stat_decrease_time,
+                                           game.pack_current_state, game.write_save_file)
+
+    # Brush over the bee, then away from it, across a stat decrease
+    for frame in range(40):
+        current_time = frame * 200
+        mouse_pos = ON_BEE if frame < 20 else OFF_BEE
+        recorder.pet_frame(current_time, mouse_pos, [])
+        game.update_pet_stats(current_time)
+        game.update_pet_cleaning(mouse_pos)
+
+    # One Flappy game: flap for a while, then fall to the bottom
+    flappy_run = game.FlappyRun(game.game_rng, spawn_interval_ticks)
+    recorder.flappy_start(flappy_run)
+    while flappy_run.active:
+        jump = flappy_run.tick < 300 and flappy_run.bee_y > game.SCREEN_HEIGHT // 2
+        if jump:
+            recorder.jump(flappy_run.tick + 1)
+        flappy_run.step(jump)
+    recorder.flappy_end(flappy_run)
+    game.finish_flappy_game(flappy_run.score)
+    recorder.close()
+    return flappy_run
+
+
+def test_replay_matches_the_recording(screen, tmp_path):
+    record_session(tmp_path / "session.bzr")
+    assert game.replay_session(str(tmp_path / "session.bzr")) == []
+
+
+def test_swarm_games_replay_with_their_spawn_interval(screen, tmp_path):
+    record_session(tmp_path / "swarm.bzr", game.FLAPPY_SWARM_SPAWN_INTERVAL_TICKS)
+    assert game.replay_session(str(tmp_path / "swarm.bzr")) == []
+
+
+def test_replay_reports_a_changed_flappy_score(screen, tmp_path):
+    path = tmp_path / "session.bzr"
+    flappy_run = record_session(path)
+    data = path.read_bytes()
+    record = buzz_replay.REPLAY_FLAPPY_END.pack(buzz_replay.RECORD_FLAPPY_END, flappy_run.tick, flappy_run.score, 1)
+    changed = buzz_replay.REPLAY_FLAPPY_END.pack(buzz_replay.RECORD_FLAPPY_END, flappy_run.tick, flappy_run.score + 1, 1)
+    assert data.count(record) == 1
+    path.write_bytes(data.replace(record, changed))
+    mismatches = game.replay_session(str(path))
+    assert len(mismatches) == 1 and mismatches[0].startswith("Flappy game")
+
+
+def test_replay_reports_a_changed_final_state(screen, tmp_path):
+    path = tmp_path / "session.bzr"
+    record_session(path)
+    data = path.read_bytes()
+    # Move the brush off the bee in the first frame, so the replay cleans less
+    record = buzz_replay.REPLAY_FRAME.pack(buzz_replay.RECORD_FRAME, 0, *ON_BEE, 0)
+    changed = buzz_replay.REPLAY_FRAME.pack(buzz_replay.RECORD_FRAME, 0, *OFF_BEE, 0)
+    assert data.count(record) == 1
+    path.write_bytes(data.replace(record, changed))
+    mismatches = game.replay_session(str(path))
+    assert len(mismatches) == 1 and mismatches[0].startswith("Final state")
+
+
+def test_version_1_recordings_play_flappy_at_the_normal_interval(screen, tmp_path):
+    path = tmp_path / "session.bzr"
+    record_session(path)
+    data = bytearray(path.read_bytes())
+    # Version 1: a bare marker instead of the Flappy start record
+    start = buzz_replay.REPLAY_FLAPPY_START.pack(buzz_replay.RECORD_FLAPPY_START, game.FLAPPY_SPAWN_INTERVAL_TICKS)
+    assert data.count(start) == 1
+    data = data.replace(start, buzz_replay.REPLAY_MARKER.pack(buzz_replay.RECORD_FLAPPY_START))
+    magic, _, seed, last_stat_decrease_time = buzz_replay.REPLAY_HEADER.unpack_from(data)
+    buzz_replay.REPLAY_HEADER.pack_into(data, 0, magic, 1, seed, last_stat_decrease_time)
+    path.write_bytes(data)
+    assert game.replay_session(str(path)) == []
@@ -0,0 +1,43 @@
+"""Save file format."""
+import zlib
+
+import pytest
+
+import BuzzBuddy_vrs3 as game
+
+SNAPSHOT = (55.5, 40.0, 75.25, 2, 120, "Bathroom") # Levels that are exact as float32
+
+
+def test_pack_unpack_round_trip():
+    state = game.unpack_save_state(game.pack_save_state(SNAPSHOT))
+    assert (state["cleanliness"], state["hunger"], state["happiness"],
+            state["bee_level"], state["xp"], state["room"]) == SNAPSHOT
+
+
+def test_damaged_saves_are_rejected():
+    data = bytearray(game.pack_save_state(SNAPSHOT))
+    with pytest.raises(ValueError):
+        game.unpack_save_state(bytes(data[:-1]))
+    data[8] ^= 0xFF # Inside the cleanliness float
+    with pytest.raises(ValueError):
+        game.unpack_save_state(bytes(data))
+
+
+def test_load_save_state_falls_back_on_bad_files(tmp_path):
+    assert game.load_save_state(str(tmp_path / "missing.bin")) is None
+    bad_save = tmp_path / "bad.bin"
+    bad_save.write_bytes(b"not a save")
+    assert game.load_save_state(str(bad_save)) is None
+    good_save = tmp_path / "good.bin"
+    game.write_save_file(str(good_save), game.pack_save_state(SNAPSHOT))
+    assert game.load_save_state(str(good_save))["room"] == "Bathroom"
+
+
+def test_decrease_time_round_trip_and_version_1_saves():
+    state = game.unpack_save_state(game.pack_save_state(SNAPSHOT, 1234.5))
+    assert state["last_decrease_time"] == 1234.5
+    cleanliness, hunger, happiness, level, xp, room = SNAPSHOT
+    payload = game.SAVE_FORMATS[1].pack(game.SAVE_MAGIC, 1, cleanliness, hunger, happiness, level, xp, game.ROOMS.index(room))
+    state = game.unpack_save_state(payload + game.SAVE_CHECKSUM.pack(zlib.crc32(payload)))
+    assert state["last_decrease_time"] is None # Loads without the offline catch-up
+    assert state["room"] == room
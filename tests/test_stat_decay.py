@@ -0,0 +1,50 @@
+"""Closed-form stat decay against the step-by-step timer."""
+import random
+
+import pytest
+
+import BuzzBuddy_vrs3 as game
+
+
+def test_floor_sum_matches_a_loop():
+    rng = random.Random(0)
+    for _ in range(2000):
+        n, m, a, b = rng.randrange(0, 60), rng.randrange(1, 50), rng.randrange(0, 200), rng.randrange(0, 200)
+        assert game.floor_sum(n, m, a, b) == sum((a * i + b) // m for i in range(n))
+
+
+def step_decreases(cleanliness, hunger, happiness, decreases):
+    """update_pet_stats' rule, one decrease at a time."""
+    for _ in range(decreases):
+        cleanliness = max(0, cleanliness - game.cleanliness_decrease)
+        hunger = max(0, hunger - game.hunger_decrease)
+        deficit = (game.max_level - cleanliness) + (game.max_level - hunger)
+        happiness = max(0, happiness - max(1, deficit // game.happiness_deficit_step))
+    return cleanliness, hunger, happiness
+
+
+@pytest.mark.parametrize("levels", [(100, 100, 100), (37.5, 100, 80), (0, 3, 100), (100, 0.5, 12), (1.5, 99.5, 60.5)])
+def test_decay_stats_matches_stepping(levels):
+    for decreases in list(range(0, 60)) + [137, 1000]:
+        assert game.decay_stats(*levels, decreases) == step_decreases(*levels, decreases)
+
+
+def test_catch_up_matches_update_pet_stats_every_millisecond(monkeypatch):
+    monkeypatch.setattr(game, "stat_decrease_interval", 10) # Many decreases, through both clamps, in a short loop
+    for start_time, current_time in [(0, 0), (0, 10), (0, 11), (3, 2500), (40, 40 + 33 * 11 - 1)]:
+        levels = (60.5, 90.0, 100.0)
+        monkeypatch.setattr(game, "last_stat_decrease_time", start_time)
+        monkeypatch.setattr(game, "pet_cleanliness_level", levels[0])
+        monkeypatch.setattr(game, "pet_hunger_level", levels[1])
+        monkeypatch.setattr(game, "pet_happy_level", levels[2])
+        for now in range(start_time, current_time + 1):
+            game.update_pet_stats(now)
+        stepped = (game.pet_cleanliness_level, game.pet_hunger_level, game.pet_happy_level, game.last_stat_decrease_time)
+
+        monkeypatch.setattr(game, "last_stat_decrease_time", start_time)
+        monkeypatch.setattr(game, "pet_cleanliness_level", levels[0])
+        monkeypatch.setattr(game, "pet_hunger_level", levels[1])
+        monkeypatch.setattr(game, "pet_happy_level", levels[2])
+        game.catch_up_pet_stats(current_time)
+        assert (game.pet_cleanliness_level, game.pet_hunger_level, game.pet_happy_level,
+                game.last_stat_decrease_time) == stepped
@@ -0,0 +1,22 @@
+"""Cached text drawing."""
+import pygame
+
+import BuzzBuddy_vrs3 as game
+
+
+def test_number_text_matches_rendering_the_whole_string(screen):
+    font = game.get_font("game_score")
+    surface = pygame.Surface(screen.get_size())
+    rect = game.draw_number_text("Score: ", 17, font, game.WHITE, surface, 10, 10)
+    expected = font.render("Score: 17", True, game.WHITE)
+    assert rect.size == expected.get_size()
+    reference = pygame.Surface(screen.get_size())
+    reference.blit(expected, (10, 10))
+    assert pygame.image.tobytes(surface, "RGB") == pygame.image.tobytes(reference, "RGB")
+
+
+def test_wrapped_text_cache_is_bounded(screen):
+    font = game.get_font("small")
+    for i in range(game.TEXT_CACHE_SIZE + 20):
+        game.wrap_text_lines(f"fact number {i} about bees", font, 200)
+    assert len(game.wrapped_text_cache) == game.TEXT_CACHE_SIZE